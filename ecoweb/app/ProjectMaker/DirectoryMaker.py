@@ -5,6 +5,8 @@ from datetime import datetime
 import logging
 import json
 
+from app.services.audit_cache import canonicalize_url
+
 logging.basicConfig(filename='download_errors.log', level=logging.ERROR,
                     format='%(asctime)s %(levelname)s:%(message)s')
 
@@ -66,8 +68,8 @@ def download_resource(url, save_dir):
 
 def get_network_requests(collection_resource, url):
     """node_modules 관련 요청 제외"""
-    normalized_url = url.replace('http://', 'https://')
-    document = collection_resource.find_one({"url": normalized_url}, {"network_requests": 1, "_id": 0})
+    # 평가 결과는 정규화된 URL 로 저장됨 (app.services.audit_cache)
+    document = collection_resource.find_one({"url": canonicalize_url(url)}, {"network_requests": 1, "_id": 0})
     
     if document and 'network_requests' in document:
         # node_modules 관련 요청 필터링
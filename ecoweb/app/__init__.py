@@ -1,8 +1,14 @@
 from flask import Flask
 from config import Config
 from app.database import MongoDB
+from app.services.audit_jobs import AuditJobQueue
+from app.services.badge_index import BadgePercentileIndex
+from app.services.grade_thresholds import GradeThresholds
 
 db = MongoDB()
+audit_jobs = AuditJobQueue()
+badge_index = BadgePercentileIndex()
+grade_thresholds = GradeThresholds()
 
 def create_app(config_class=Config):
     app = Flask(__name__)
@@ -10,6 +16,12 @@ def create_app(config_class=Config):
     
     # MongoDB 초기화
     db.init_app(app)
+    # 백그라운드 평가 작업 큐 초기화
+    audit_jobs.init_app(app, db)
+    # /api/badge 백분위 인덱스 초기화
+    badge_index.init_app(app, db)
+    # 평가 결과로 계산한 등급 기준
+    grade_thresholds.init_app(app, db)
     
     # 라우트 등록
     from . import routes
@@ -1,5 +1,9 @@
+import threading
+
 from pymongo import MongoClient
+from pymongo.errors import PyMongoError
 from flask import current_app, g
+from app.services.db_indexes import ensure_indexes
 
 class MongoDB:
     def __init__(self, app=None):
@@ -9,6 +13,15 @@ class MongoDB:
     def init_app(self, app):
         self.client = MongoClient(app.config['MONGO_URI'])
         self.db = self.client[app.config['DB_NAME']]
+        # 자주 사용하는 조회용 인덱스 생성 (app.services.db_indexes)
+        # MongoDB 에 연결할 수 없어도 앱 시작이 막히지 않도록 백그라운드에서 생성
+        threading.Thread(target=self._ensure_indexes, name='ensure-indexes', daemon=True).start()
+
+    def _ensure_indexes(self):
+        try:
+            ensure_indexes(self.db)
+        except PyMongoError as e:
+            print(f"Warning: could not create MongoDB indexes: {str(e)}")
 
     def close(self):
         if self.client:
@@ -5,21 +5,17 @@ import os
 from pymongo import MongoClient
 from bson.json_util import dumps
 import re
+from app.services.lighthouse import run_lighthouse, remove_report
+from app.services.report_reader import read_report
+from app.services.audit_cache import canonicalize_url
 
 client = MongoClient('mongodb://localhost:27017/')
 db = client['ecoweb']
 collection_traffic = db['lighthouse_traffic']
 collection_resource = db['lighthouse_resource']
 
-def run_lighthouse(url):
-    command = f'lighthouse {url} --only-audits=network-requests,resource-summary,third-party-summary,script-treemap-data,total-byte-weight,unused-css-rules,unused-javascript,modern-image-formats,efficient-animated-content,duplicated-javascript,js-libraries --output json --output-path ./report.json --preset=desktop'
-    # Linux Headless version
-    # command = f'lighthouse {url} --only-audits=network-requests,resource-summary,third-party-summary,script-treemap-data,total-byte-weight,unused-css-rules,unused-javascript,modern-image-formats,efficient-animated-content,duplicated-javascript,js-libraries --output json --output-path ./report.json --preset=desktop --chrome-flags="--headless --no-sandbox"'
-    subprocess.run(command, shell=True)
-
-def process_report(url):
-    with open('report.json', 'r') as file:
-        report = json.load(file)
+def process_report(url, report_path):
+    report = read_report(report_path)
     
     # MongoDB에 저장할 데이터 추출
     network_requests = report['audits']['network-requests']['details']['items']
@@ -39,12 +35,19 @@ def process_report(url):
     collection_traffic.insert_one(traffic_data)
     collection_resource.insert_one(resource_data)
 
-def get_report_imagepath():  # 라이트하우스가 이미 실행되어 report.json 이 존재한다고 했을때, 이미지 파일들의 path를 리턴
-    json_file = open('report.json', 'r', encoding='utf-8')
-    report = json.load(json_file)
+def get_report_imagepath(report_path):  # 라이트하우스가 이미 실행되어 report_path 에 리포트가 존재한다고 했을때, 이미지 파일들의 path를 리턴
+    report = read_report(report_path)
+    return filter_image_urls(item['url'] for item in report['audits']['network-requests']['details']['items'])
+
+def get_resource_imagepath(collection_resource, url):  # 저장된 lighthouse_resource 문서에서 이미지 파일들의 path를 리턴
+    document = collection_resource.find_one({'url': canonicalize_url(url)}, {'network_requests.url': 1, '_id': 0})
+    if not document:
+        return []
+    return filter_image_urls(item.get('url', '') for item in document.get('network_requests', []))
+
+def filter_image_urls(file_urls):
     image_url_list = []
-    for item in report['audits']['network-requests']['details']['items']:
-        file_url = item['url']
+    for file_url in file_urls:
         file_url_split = re.split(r':|\/|\.', file_url)
         if file_url_split[-1] == 'jpg' or file_url_split[-1] == 'jpeg' or file_url_split[-1] == 'png':
             image_url_list.append(file_url)
@@ -60,8 +63,9 @@ def main():
         url = item["사이트링크"]
         print(f"Processing: {url}")
         
-        run_lighthouse(url)
-        view_data = process_report(url)
+        report_path = run_lighthouse(url)
+        view_data = process_report(url, report_path)
+        remove_report(report_path)
         
         # # 뷰에 데이터 전달 (예: JSON 파일로 저장)
         # with open(f'view_data_{url.replace("://", "_").replace("/", "_")}.json', 'w') as f:
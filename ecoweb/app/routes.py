@@ -1,17 +1,19 @@
 from threading import Thread
 import uuid
+import hashlib
 from flask import render_template, request, redirect, url_for
 from app.utils.grade import (grade_point)
 from app.services.screenshot import capture_screenshot
-from app.services.lighthouse import run_lighthouse
-from app.services.lighthouse import process_report
+from app.services.audit_cache import find_cached_view_data, canonicalize_url
 import json
 from flask import session
 from app.models import User, Institution
 from flask import flash
-from app import db
+from app import db, audit_jobs, badge_index, grade_thresholds
+from app.services.audit_jobs import DONE as AUDIT_DONE, FAILED as AUDIT_FAILED
+from pymongo.errors import DuplicateKeyError
 from werkzeug.security import generate_password_hash, check_password_hash  # check_password_hash 추가
-from datetime import datetime
+from datetime import datetime, timezone
 from flask import jsonify
 from flask import g
 from app.ProjectMaker.DirectoryMaker import directory_maker, directory_to_json
@@ -30,6 +32,7 @@ import shutil
 from flask import send_from_directory, current_app
 from app.ProjectMaker.code_optimizer import code_optimizer, getCodeSize_before, getCodeSize_after
 from app.services.emissions_calculator import estimate_emission_per_page
+from app.services.emission_uncertainty import emission_bands
 ZIP_FILE_PATH = "/"
 
 load_dotenv()
@@ -69,7 +72,10 @@ def init_routes(app):
             username = request.form['username']
             password = request.form['password']
             # hash 디코딩
-            login_user = db.db.users.find_one({'username': username})
+            login_user = db.db.users.find_one(
+                {'username': username},
+                {'password': 1, 'username': 1, 'department': 1, 'institution.name': 1}
+            )
 
             if login_user and check_password_hash(login_user['password'], password):
                 flash('로그인이 완료되었습니다!', 'success')
@@ -96,7 +102,7 @@ def init_routes(app):
     def signup():
         if request.method == 'POST':
             # 아아디 중복 확인
-            if db.db.users.find_one({'username': request.form['username']}):
+            if db.db.users.find_one({'username': request.form['username']}, {'_id': 1}):
                 flash('이미 존재하는 아이디입니다.', 'error')
                 return redirect(url_for('signup'))
 
@@ -125,6 +131,10 @@ def init_routes(app):
                 print("Inserted document ID:", result.inserted_id)  # 삽입된 문서 ID 출력
                 flash('회원가입이 완료되었습니다!', 'success')
                 return redirect(url_for('login'))
+            except DuplicateKeyError:
+                # 동시에 같은 아이디로 가입한 경우 (username unique 인덱스)
+                flash('이미 존재하는 아이디입니다.', 'error')
+                return redirect(url_for('signup'))
             except Exception as e:
                 print("Error creating user: {}".format(str(e)))
                 flash('회원가입 중 오류가 발생했습니다.', 'error')
@@ -145,25 +155,62 @@ def init_routes(app):
             return jsonify({'error': 'URL parameter is required'}), 400
 
         try:
-            # MongoDB에서 데이터 조회
-            data = db.db.lighthouse_resource.find_one({'url': url})
-            if not data:
+            # 메모리 인덱스에서 조회 (app.services.badge_index)
+            badge = badge_index.badge(url)
+            if badge is None:
                 return jsonify({'error': 'URL not found'}), 404
 
-            # 탄소 배출량 계산
-            kb_weight = data['total_byte_weight'] / 1024
-            carbon = round((kb_weight * 0.04) / 272.51, 3)
+            response = jsonify({
+                'carbon': badge['carbon'],
+                'percentage': badge['percentage']
+            })
+            # 브라우저/프록시가 ETag, Last-Modified 로 재검증할 수 있도록 (변경 없으면 304)
+            response.set_etag(badge['etag'])
+            if badge['audited_at']:
+                response.last_modified = badge['audited_at'].astimezone(timezone.utc)
+            response.cache_control.public = True
+            response.cache_control.max_age = current_app.config['BADGE_CACHE_MAX_AGE']
+            return response.make_conditional(request)
 
-            # 백분위 계산 (다른 사이트들과 비교)
-            all_sites = list(db.db.lighthouse_resource.find())
-            better_than = sum(1 for site in all_sites
-                              if site['total_byte_weight'] > data['total_byte_weight'])
-            percentage = round((better_than / len(all_sites)) * 100)
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
 
-            return jsonify({
-                'carbon': carbon,
-                'percentage': percentage
-            })
+    @app.route('/api/badges', methods=['GET', 'POST'])
+    def badges_data():
+        """
+        여러 URL의 배지를 한 번에 조회 (기관 목록 페이지처럼 배지가 여러 개인 경우)
+
+        GET /api/badges?url=a&url=b 또는 POST {"urls": [...]}
+        응답: {"badges": {url: {"carbon", "percentage"} 또는 null(평가 기록 없음)}}
+        """
+        if request.method == 'POST':
+            urls = (request.get_json(silent=True) or {}).get('urls') or []
+        else:
+            urls = request.args.getlist('url')
+        if not isinstance(urls, list) or not urls:
+            return jsonify({'error': 'URL parameter is required'}), 400
+        urls = list(dict.fromkeys(str(url) for url in urls))
+        if len(urls) > current_app.config['BADGE_BATCH_LIMIT']:
+            return jsonify({'error': f"Too many URLs (max {current_app.config['BADGE_BATCH_LIMIT']})"}), 400
+
+        try:
+            badges = badge_index.badges(urls)
+            response = jsonify({'badges': {
+                url: {'carbon': badge['carbon'], 'percentage': badge['percentage']} if badge else None
+                for url, badge in badges.items()
+            }})
+            if request.method == 'GET':
+                # 배지 하나라도 바뀌면 ETag 가 바뀜
+                found = [badge for badge in badges.values() if badge]
+                response.set_etag(hashlib.sha1('|'.join(
+                    badge['etag'] if badge else '-' for badge in badges.values()).encode()).hexdigest()[:20])
+                audited = [badge['audited_at'] for badge in found if badge['audited_at']]
+                if audited:
+                    response.last_modified = max(audited).astimezone(timezone.utc)
+                response.cache_control.public = True
+                response.cache_control.max_age = current_app.config['BADGE_CACHE_MAX_AGE']
+                return response.make_conditional(request)
+            return response
 
         except Exception as e:
             return jsonify({'error': str(e)}), 500
@@ -176,41 +223,80 @@ def init_routes(app):
     def error():
         return render_template('error.html')
 
+    def show_audit_result(url, view_data):
+        """평가 결과(view_data)를 세션에 저장하고 결과 페이지로 이동"""
+        print("view_data first: ", view_data)
+        # 만약, viewdata의 total_byte_weight이 0이라면 예외처리 (error.html 페이지로 리다이렉트)
+        if view_data['total_byte_weight'] == 0:
+            return redirect(url_for('error'))
+        # 2) before(원본) 스크린샷
+        # capture_screenshot(url, 'app/static/screenshots/before.png', is_file=False)
+
+        try:
+            total_byte_weight = view_data['total_byte_weight'] / 1024  # OK.
+            print("total_byte_weight: ", total_byte_weight)
+
+            # session Data 저장
+            grade = grade_point(total_byte_weight, grade_thresholds.current())
+            session['url'] = url
+            session['view_data'] = json.dumps(view_data)
+            session['grade'] = grade
+            return redirect(url_for('carbon_calculate_emission'))
+
+        except Exception as e:
+            print("Error processing optimized files: {}".format(str(e)))
+            return "Error processing files", 500
+
     @app.route('/', methods=['GET', 'POST'])
     def home():
         if request.method == 'POST':
             url = request.form['wgd-cc-url']
-            # 1) Lighthouse 실행
-            run_lighthouse(url)
             # MongoDB 컬렉션 가져오기
             collection_traffic = db.db.lighthouse_traffic
-            collection_resource = db.db.lighthouse_resource
-            view_data = process_report(url, collection_resource,
-                                       collection_traffic)  # result 화면에서 사용할 웹사이트에 대한 트래픽 평가 결과
-            print("view_data first: ", view_data)
-            # 만약, viewdata의 total_byte_weight이 0이라면 예외처리 (error.html 페이지로 리다이렉트)
-            if view_data['total_byte_weight'] == 0:
-                return redirect(url_for('error'))
-            # 2) before(원본) 스크린샷
-            # capture_screenshot(url, 'app/static/screenshots/before.png', is_file=False)
 
-            try:
-                total_byte_weight = view_data['total_byte_weight'] / 1024  # OK.
-                print("total_byte_weight: ", total_byte_weight)
-
-                # session Data 저장
-                grade = grade_point(total_byte_weight)
-                session['url'] = url
-                session['view_data'] = json.dumps(view_data)
-                session['grade'] = grade
-                return redirect(url_for('carbon_calculate_emission'))
+            # 0) 최근에 평가한 URL이면 저장된 결과 사용
+            view_data = find_cached_view_data(collection_traffic, url, current_app.config['AUDIT_CACHE_TTL'])
+            if view_data is not None:
+                return show_audit_result(url, view_data)
 
-            except Exception as e:
-                print("Error processing optimized files: {}".format(str(e)))
-                return "Error processing files", 500
+            # 1) Lighthouse 평가는 백그라운드 작업으로 실행하고 진행 상황 페이지로 이동
+            job_id = audit_jobs.submit(url)
+            return redirect(url_for('audit_progress', job_id=job_id))
         if request.method == 'GET':
             return render_template('main.html')
 
+    @app.route('/audit/<job_id>')
+    def audit_progress(job_id):
+        job = audit_jobs.get(job_id)
+        if not job:
+            return redirect(url_for('home'))
+        return render_template('audit_progress.html', job_id=job_id, url=job['url'])
+
+    @app.route('/audit/<job_id>/status')
+    def audit_status(job_id):
+        """평가 작업 상태 (queued, auditing, parsing, done, failed)"""
+        job = audit_jobs.get(job_id)
+        if not job:
+            return jsonify({'error': 'Job not found'}), 404
+        return jsonify({
+            'status': job['status'],
+            'url': job['url'],
+            'position': job.get('position'),
+            'error': job.get('error'),
+        })
+
+    @app.route('/audit/<job_id>/result')
+    def audit_result(job_id):
+        job = audit_jobs.get(job_id)
+        if not job:
+            return redirect(url_for('home'))
+        if job['status'] == AUDIT_FAILED:
+            return redirect(url_for('error'))
+        if job['status'] != AUDIT_DONE:
+            return redirect(url_for('audit_progress', job_id=job_id))
+
+        return show_audit_result(job['url'], job['view_data'])
+
     @app.route('/carbon_calculate_emission')
     def carbon_calculate_emission():
         print("Entering carbon_calculate_emission route")  # 디버깅 로그
@@ -223,7 +309,8 @@ def init_routes(app):
             url = session.get('url')
 
             # 세션에서 데이터 가져오기
-            traffic_doc = db.db.lighthouse_traffic.find_one({'url': url})
+            traffic_doc = db.db.lighthouse_traffic.find_one({'url': canonicalize_url(url)},
+                                                           {'institution_type': 1, '_id': 0})
             institution_type = traffic_doc.get('institution_type', '공공기관') if traffic_doc else '공공기관'
             session['institution_type'] = institution_type
 
@@ -233,6 +320,10 @@ def init_routes(app):
             session['kb_weight'] = kb_weight
             # 탄소 배출량 계산 (0.04 kWh/GB * 442g CO2/kWh)
             carbon_emission = round(estimate_emission_per_page(kb_weight/(1024*1024)),2)
+            # 계수 불확실성을 반영한 90% 구간 (p5 ~ p95)
+            bands = emission_bands(kb_weight/(1024*1024))
+            carbon_emission_low = round(bands['p5'], 2)
+            carbon_emission_high = round(bands['p95'], 2)
             # MB로 변환하여 평균과 비교
             mb_weight = kb_weight / 1024
             # global_avg_diff = round(mb_weight - 2.4, 2)  # 세계 평균 2.4MB 기준
@@ -255,6 +346,8 @@ def init_routes(app):
                                 view_data=view_data,
                                 grade=grade,
                                 carbon_emission=carbon_emission,
+                                carbon_emission_low=carbon_emission_low,
+                                carbon_emission_high=carbon_emission_high,
                                 global_avg_carbon=session['global_avg_carbon'],
                                 korea_avg_carbon=session['korea_avg_carbon'],
                                 kb_weight=kb_weight,
@@ -340,7 +433,8 @@ def init_routes(app):
             url_s = url_s.replace("https://", "")
         print("url_s : ", url_s)
         # 이미지 분류
-        Image_paths = proc_url.get_report_imagepath()
+        # 저장된 lighthouse_resource 의 network_requests 에서 이미지 경로 추출
+        Image_paths = proc_url.get_resource_imagepath(db.db.lighthouse_resource, session.get('url'))
         # 이거 gitingnore 하세요. 
         image_dir_path = f'app/static/images/{url_s}'
         if os.path.exists(image_dir_path):
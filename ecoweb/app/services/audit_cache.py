@@ -0,0 +1,133 @@
+'''
+Lighthouse 평가 결과 캐시
+
+같은 URL을 짧은 시간 안에 다시 평가하지 않도록 lighthouse_traffic 문서에
+정규화된 URL(canonical_url), 평가 시각(audited_at), 결과 화면용 view_data 를 함께 저장하고
+유효 기간(AUDIT_CACHE_TTL) 안의 결과가 있으면 Lighthouse 실행 없이 그대로 사용한다.
+'''
+from datetime import datetime, timedelta
+from urllib.parse import urlsplit, urlunsplit
+
+from pymongo import UpdateOne
+
+def canonicalize_url(url):
+    """
+    캐시 키로 사용할 URL 정규화
+    - scheme 이 없거나 http 이면 https 로 통일 (배치 평가와 동일한 규칙)
+    - host 소문자 변환, 기본 포트 제거
+    - fragment, 경로 끝의 '/' 제거
+    """
+    url = url.strip()
+    if '://' not in url:
+        url = 'https://' + url
+    parts = urlsplit(url)
+    host = (parts.hostname or '').lower()
+    try:
+        port = parts.port
+    except ValueError:
+        port = None
+    netloc = host if port in (None, 80, 443) else f'{host}:{port}'
+    return urlunsplit(('https', netloc, parts.path.rstrip('/'), parts.query, ''))
+
+def find_cached_view_data(collection_traffic, url, max_age):
+    """
+    max_age(초) 이내에 평가된 view_data 반환. 없으면 None
+
+    Args:
+        collection_traffic: lighthouse_traffic 컬렉션
+        url (str): 평가할 URL
+        max_age (int): 캐시 유효 기간(초). 0 이하이면 캐시를 사용하지 않음
+    """
+    if not max_age or max_age <= 0:
+        return None
+    document = collection_traffic.find_one(
+        {
+            'canonical_url': canonicalize_url(url),
+            'audited_at': {'$gte': datetime.now() - timedelta(seconds=max_age)},
+            'view_data': {'$exists': True},
+        },
+        {'view_data': 1, '_id': 0},
+        sort=[('audited_at', -1)],
+    )
+    return document['view_data'] if document else None
+
+def audit_updates(traffic_data, resource_data, view_data=None, audited_at=None):
+    """
+    평가 결과를 canonical_url 기준 upsert 할 (filter, update) 쌍 생성
+
+    http/https, 끝의 '/', 대소문자만 다른 URL이 같은 문서를 갱신하도록 url 에도 정규화된 URL을 저장하고
+    요청한 그대로의 URL은 traffic 문서의 requested_url 에 남긴다.
+    audited_at 이 없으면 현재 시각 (보관된 리포트에서 다시 추출할 때는 원래 평가 시각을 사용)
+    traffic 문서의 updated_at 은 audited_at 과 관계없이 실제로 저장된 시각(MongoDB 서버 시각)으로,
+    변경된 문서만 읽는 작업(statistics_materializer)의 워터마크로 사용한다.
+
+    Returns:
+        tuple: ((traffic_filter, traffic_update), (resource_filter, resource_update))
+    """
+    audited_at = audited_at or datetime.now()
+    canonical_url = canonicalize_url(traffic_data['url'])
+    traffic_fields = {**traffic_data, 'url': canonical_url, 'requested_url': traffic_data['url'],
+                      'canonical_url': canonical_url, 'audited_at': audited_at}
+    if view_data is not None:
+        traffic_fields['view_data'] = view_data
+    resource_fields = {**resource_data, 'url': canonical_url, 'canonical_url': canonical_url,
+                       'audited_at': audited_at}
+    if view_data is not None:
+        # /api/badge 백분위 인덱스(badge_index)에서 사용
+        resource_fields['total_byte_weight'] = view_data['total_byte_weight']
+
+    return (({'canonical_url': canonical_url}, {'$set': traffic_fields, '$currentDate': {'updated_at': True}}),
+            ({'canonical_url': canonical_url}, {'$set': resource_fields}))
+
+def save_audit(collection_resource, collection_traffic, traffic_data, resource_data, view_data=None):
+    """
+    평가 결과를 canonical_url 기준으로 upsert (같은 URL을 다시 평가해도 문서가 중복 생성되지 않음)
+
+    traffic 문서에 이미 있는 기관 정보(institutionType 등)는 그대로 유지된다.
+    """
+    (traffic_filter, traffic_update), (resource_filter, resource_update) = \
+        audit_updates(traffic_data, resource_data, view_data)
+    collection_traffic.update_one(traffic_filter, traffic_update, upsert=True)
+    collection_resource.update_one(resource_filter, resource_update, upsert=True)
+
+def record_removed_urls(collection_removed, urls):
+    """
+    lighthouse_traffic 에서 지우거나 이름(url)을 바꾼 문서의 이전 url 기록
+
+    statistics_materializer 는 updated_at 이 바뀐 문서만 읽으므로 이 기록(removed_at)을 보고 이전 url 의 집계를 뺀다.
+    """
+    operations = [UpdateOne({'url': url}, {'$currentDate': {'removed_at': True}}, upsert=True)
+                  for url in dict.fromkeys(urls)]
+    if operations:
+        collection_removed.bulk_write(operations, ordered=False)
+
+def merge_duplicate_audits(collection, collection_removed=None):
+    """
+    정규화 전에 저장된 문서 정리: canonical_url 이 같은 문서 중 가장 최근 평가만 남기고
+    남긴 문서의 url, canonical_url 을 정규화된 URL로 바꿈 (canonical_url unique 인덱스를 만들기 전에 실행)
+
+    Args:
+        collection_removed: 지우거나 url 을 바꾼 문서의 이전 url 을 기록할 컬렉션 (lighthouse_traffic 정리할 때)
+
+    Returns:
+        int: 삭제한 문서 수
+    """
+    groups = {}
+    for document in collection.find({'url': {'$type': 'string'}}, {'url': 1, 'canonical_url': 1, 'audited_at': 1}):
+        groups.setdefault(canonicalize_url(document['url']), []).append(document)
+
+    removed = 0
+    for canonical_url, documents in groups.items():
+        documents.sort(key=lambda document: document.get('audited_at') or datetime.min, reverse=True)
+        keep, duplicates = documents[0], documents[1:]
+        renamed = keep['url'] != canonical_url or keep.get('canonical_url') != canonical_url
+        if collection_removed is not None:
+            # 문서를 바꾸기 전에 기록 (중간에 멈춰도 다시 실행하면 같은 기록이 남음)
+            record_removed_urls(collection_removed, [d['url'] for d in duplicates] + ([keep['url']] if renamed else []))
+        if duplicates:
+            removed += collection.delete_many({'_id': {'$in': [d['_id'] for d in duplicates]}}).deleted_count
+        if renamed:
+            collection.update_one({'_id': keep['_id']},
+                                  {'$set': {'url': canonical_url, 'canonical_url': canonical_url},
+                                   '$currentDate': {'updated_at': True}})
+    return removed
@@ -0,0 +1,114 @@
+'''
+웹사이트 평가 백그라운드 작업
+
+home() 에서 Lighthouse 를 직접 실행하면 평가가 끝날 때까지 Flask 요청 스레드가 묶이므로
+평가를 작업(job)으로 등록하고 별도 스레드 풀에서 실행한다.
+작업 상태는 MongoDB(audit_jobs)에 저장하므로 어느 Flask 워커에서든 진행 상황을 조회할 수 있다.
+
+    queued -> auditing -> parsing -> done
+                                  -> failed
+'''
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from pymongo import ASCENDING
+from pymongo.errors import PyMongoError
+
+from app.services.grade_thresholds import record_weights, weight_kb
+from app.services.lighthouse import run_lighthouse, process_report, remove_report
+from app.services.report_archive import ReportArchive
+
+QUEUED = 'queued'
+AUDITING = 'auditing'
+PARSING = 'parsing'
+DONE = 'done'
+FAILED = 'failed'
+
+
+class AuditJobQueue:
+    def __init__(self, app=None):
+        self.executor = None
+        self.database = None
+        self.timeout = None
+        self.retention = None
+        self.archive = None
+
+    def init_app(self, app, database):
+        """
+        Args:
+            app: Flask 앱 (AUDIT_JOB_WORKERS, AUDIT_JOB_TIMEOUT, AUDIT_JOB_RETENTION 설정 사용)
+            database: app.database.MongoDB
+        """
+        self.database = database
+        self.timeout = app.config['AUDIT_JOB_TIMEOUT']
+        self.executor = ThreadPoolExecutor(max_workers=app.config['AUDIT_JOB_WORKERS'],
+                                           thread_name_prefix='audit-job')
+        self.retention = app.config['AUDIT_JOB_RETENTION']
+        # 원본 리포트 보관 (app.services.report_archive)
+        self.archive = ReportArchive(database.db.lighthouse_reports)
+        # MongoDB 에 연결할 수 없어도 앱 시작이 막히지 않도록 백그라운드에서 생성
+        threading.Thread(target=self.ensure_indexes, name='audit-job-indexes', daemon=True).start()
+
+    def ensure_indexes(self):
+        try:
+            # 오래된 작업 문서는 자동 삭제
+            self.collection.create_index('created_at', expireAfterSeconds=self.retention)
+            self.collection.create_index([('status', ASCENDING), ('created_at', ASCENDING)])
+            self.archive.ensure_indexes()
+        except PyMongoError as e:
+            print(f"Warning: could not create audit job indexes: {str(e)}")
+
+    @property
+    def collection(self):
+        return self.database.db.audit_jobs
+
+    def submit(self, url):
+        """평가 작업을 등록하고 job_id 반환"""
+        job_id = uuid.uuid4().hex
+        now = datetime.now()
+        self.collection.insert_one({
+            '_id': job_id,
+            'url': url,
+            'status': QUEUED,
+            'created_at': now,
+            'updated_at': now,
+        })
+        self.executor.submit(self._run, job_id, url)
+        return job_id
+
+    def get(self, job_id):
+        """작업 상태 조회. 대기 중이면 앞에 남은 작업 수(position)도 함께 반환"""
+        job = self.collection.find_one({'_id': job_id})
+        if job and job['status'] == QUEUED:
+            job['position'] = self.collection.count_documents(
+                {'status': QUEUED, 'created_at': {'$lt': job['created_at']}})
+        return job
+
+    def _update(self, job_id, status, **fields):
+        self.collection.update_one({'_id': job_id},
+                                   {'$set': {'status': status, 'updated_at': datetime.now(), **fields}})
+
+    def _run(self, job_id, url):
+        try:
+            self._update(job_id, AUDITING)
+            report_path = run_lighthouse(url, timeout=self.timeout)
+            try:
+                self.archive.try_add(url, report_path)
+
+                self._update(job_id, PARSING)
+                view_data = process_report(url, self.database.db.lighthouse_resource,
+                                           self.database.db.lighthouse_traffic, report_path)
+            finally:
+                # 원본은 archive 에 보관되고, 이미지 경로는 lighthouse_resource 의 network_requests 에서 읽으므로 바로 삭제
+                remove_report(report_path)
+            # 등급 기준 스케치에 반영 (app.services.grade_thresholds). 실패한 평가의 기본 view_data(0KB)는 제외
+            weight = weight_kb(view_data)
+            if weight is not None:
+                record_weights(self.database.db.grade_sketches, [weight])
+
+            self._update(job_id, DONE, view_data=view_data)
+        except Exception as e:
+            print(f"Audit job {job_id} failed for {url}: {str(e)}")
+            self._update(job_id, FAILED, error=str(e))
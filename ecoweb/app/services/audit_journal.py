@@ -0,0 +1,126 @@
+'''
+일괄 평가 진행 기록 (재시작 가능한 batch_audit 용)
+
+URL마다 상태 변화를 JSON Lines 파일에 한 줄씩 추가하고 바로 fsync 하므로
+프로세스가 죽거나 서버가 재부팅되어도 어디까지 평가했는지 남는다.
+같은 URL에 대한 기록은 마지막 줄이 현재 상태이다.
+
+    {"url": "...", "status": "in_flight", "at": "2024-11-20T10:00:00"}
+    {"url": "...", "status": "done", "at": "...", "attempts": 1}
+    {"url": "...", "status": "failed", "at": "...", "attempts": 3, "error_class": "dns", "reason": "..."}
+'''
+import json
+import os
+import subprocess
+import threading
+from datetime import datetime, timedelta
+
+from app.services.lighthouse import LighthouseError
+
+IN_FLIGHT = 'in_flight'
+DONE = 'done'
+FAILED = 'failed'
+
+# 오류 종류별 재시도 정책: (최대 시도 횟수, 첫 대기 시간(초)). 대기 시간은 시도할 때마다 2배
+RETRY_POLICY = {
+    'dns': (2, 60),       # 일시적인 DNS 장애가 아니면 재시도해도 소용없으므로 길게 한 번만
+    'timeout': (3, 15),   # 느린 사이트는 잠시 후 다시
+    'chrome': (4, 2),     # Chrome 비정상 종료는 바로 다시 띄우면 대부분 성공
+    'network': (2, 30),   # 연결 거부, 인증서 오류, 4xx/5xx 문서 응답
+    'other': (3, 5),
+}
+
+# Lighthouse 오류 메시지(runtimeError 코드, net::ERR_*) -> 오류 종류
+ERROR_PATTERNS = (
+    ('dns', ('DNS_FAILURE', 'ERR_NAME_NOT_RESOLVED', 'ENOTFOUND', 'getaddrinfo')),
+    ('timeout', ('NO_FCP', 'PAGE_HUNG', 'PROTOCOL_TIMEOUT', 'NO_NAVSTART', 'ERR_TIMED_OUT', 'timed out')),
+    ('chrome', ('Target closed', 'crashed', 'ECONNREFUSED', 'Unable to connect to Chrome',
+                'CRI_TIMEOUT', 'ERR_INSUFFICIENT_RESOURCES', 'Session closed')),
+    ('network', ('ERR_CONNECTION', 'ERR_CERT', 'ERR_SSL', 'FAILED_DOCUMENT_REQUEST',
+                 'ERRORED_DOCUMENT_REQUEST', 'INSECURE_DOCUMENT_REQUEST', 'CHROME_INTERSTITIAL_ERROR')),
+)
+
+def classify_error(error):
+    """예외를 RETRY_POLICY 의 오류 종류로 분류"""
+    if isinstance(error, subprocess.TimeoutExpired):
+        return 'timeout'
+    message = error.stderr if isinstance(error, LighthouseError) else str(error)
+    for error_class, patterns in ERROR_PATTERNS:
+        if any(pattern in message for pattern in patterns):
+            return error_class
+    # 메시지 없이 시그널로 종료된 경우 (OOM killer 등) Chrome 문제로 간주
+    if isinstance(error, LighthouseError) and error.returncode < 0:
+        return 'chrome'
+    return 'other'
+
+def retry_delay(error_class, attempt):
+    """attempt 번째 시도가 실패한 뒤 기다릴 시간(초). 더 이상 재시도하지 않으면 None"""
+    max_attempts, base_delay = RETRY_POLICY.get(error_class, RETRY_POLICY['other'])
+    if attempt >= max_attempts:
+        return None
+    return base_delay * 2 ** (attempt - 1)
+
+
+class AuditJournal:
+    """URL별 평가 상태를 파일에 기록하고 재시작 시 남은 URL을 계산"""
+
+    def __init__(self, path):
+        self.path = path
+        self.states = self._replay()
+        self._lock = threading.Lock()
+        self._file = open(path, 'a', encoding='utf-8')
+
+    def _replay(self):
+        states = {}
+        if not os.path.exists(self.path):
+            return states
+        with open(self.path, 'r', encoding='utf-8') as file:
+            for line in file:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # 기록 도중 종료되어 잘린 마지막 줄
+                states[entry['url']] = entry
+        return states
+
+    def _write(self, url, status, **fields):
+        entry = {'url': url, 'status': status, 'at': datetime.now().isoformat(timespec='seconds'), **fields}
+        with self._lock:
+            self._file.write(json.dumps(entry, ensure_ascii=False) + '\n')
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self.states[url] = entry
+
+    def start(self, url):
+        self._write(url, IN_FLIGHT)
+
+    def done(self, url, attempts):
+        self._write(url, DONE, attempts=attempts)
+
+    def failed(self, url, attempts, error_class, reason):
+        self._write(url, FAILED, attempts=attempts, error_class=error_class, reason=reason[:500])
+
+    def pending(self, sites, stale_after, retry_failed=False):
+        """
+        아직 평가하지 않은 사이트만 반환
+
+        Args:
+            sites (list): load_sites() 결과
+            stale_after (float): 이 시간(초)보다 오래된 in_flight 는 중단된 것으로 보고 다시 평가
+            retry_failed (bool): True 이면 실패한 URL도 다시 평가
+        """
+        stale_before = datetime.now() - timedelta(seconds=stale_after)
+        remaining = []
+        for site in sites:
+            entry = self.states.get(site['siteLink'])
+            if entry is None:
+                remaining.append(site)
+            elif entry['status'] == IN_FLIGHT:
+                if datetime.fromisoformat(entry['at']) < stale_before:
+                    remaining.append(site)
+            elif entry['status'] == FAILED and retry_failed:
+                remaining.append(site)
+        return remaining
+
+    def close(self):
+        self._file.close()
@@ -0,0 +1,148 @@
+'''
+평가 결과 일괄 저장 (write-behind 버퍼)
+
+process_Analysis 가 URL마다 update_one 을 두 번씩 호출하는 대신
+AuditWriter 에 모아두었다가 batch_size 개가 쌓이거나 flush_interval 초가 지나면
+컬렉션별로 unordered bulk_write 한 번으로 저장한다. 종료 시(close) 남은 문서도 모두 저장한다.
+grade_sketches 컬렉션을 넘기면 저장한 평가의 total_byte_weight 를 등급 기준 스케치(app.services.grade_thresholds)에도 반영한다.
+
+    with AuditWriter(collection_resource, collection_traffic) as writer:
+        process_Analysis(url, site, collection_resource, collection_traffic, report_path, writer=writer)
+'''
+import threading
+import time
+
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError, PyMongoError
+
+from app.services.audit_cache import audit_updates
+from app.services.grade_thresholds import record_weights, weight_kb
+
+
+class AuditWriter:
+    """
+    Args:
+        collection_resource: lighthouse_resource 컬렉션
+        collection_traffic: lighthouse_traffic 컬렉션
+        batch_size (int): 버퍼에 쌓인 평가 수가 이 값에 도달하면 바로 저장
+        flush_interval (float): 마지막 저장 후 이 시간(초)이 지나면 백그라운드에서 저장
+        grade_sketches: 등급 기준 스케치 컬렉션 (없으면 반영하지 않음)
+    """
+
+    def __init__(self, collection_resource, collection_traffic, batch_size=100, flush_interval=10.0,
+                 grade_sketches=None):
+        self.collection_resource = collection_resource
+        self.collection_traffic = collection_traffic
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.grade_sketches = grade_sketches
+
+        self._traffic_ops = []
+        self._resource_ops = []
+        self._callbacks = []
+        self._weights_kb = []
+        self._buffer_lock = threading.Lock()
+        self._flush_lock = threading.Lock()   # bulk_write 는 한 번에 하나씩
+
+        # 저장 통계
+        self.written_count = 0
+        self.error_count = 0
+        self.flush_count = 0
+        self.write_seconds = 0.0
+        self.started_at = time.monotonic()
+
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._flush_periodically, daemon=True)
+        self._thread.start()
+
+    def add(self, traffic_data, resource_data, view_data=None, on_saved=None, audited_at=None):
+        """
+        평가 결과 하나를 버퍼에 추가 (audit_cache.save_audit 와 같은 upsert)
+
+        on_saved 는 이 평가가 실제로 MongoDB 에 저장된 뒤 호출된다 (진행 기록의 done 처리 등)
+        """
+        (traffic_filter, traffic_update), (resource_filter, resource_update) = \
+            audit_updates(traffic_data, resource_data, view_data, audited_at)
+        with self._buffer_lock:
+            self._traffic_ops.append(UpdateOne(traffic_filter, traffic_update, upsert=True))
+            self._resource_ops.append(UpdateOne(resource_filter, resource_update, upsert=True))
+            if on_saved is not None:
+                self._callbacks.append(on_saved)
+            weight = weight_kb(view_data)
+            if weight is not None:
+                self._weights_kb.append(weight)
+            full = len(self._traffic_ops) >= self.batch_size
+        if full:
+            self.flush()
+
+    def flush(self):
+        """버퍼에 쌓인 문서를 bulk_write 로 저장"""
+        with self._flush_lock:
+            with self._buffer_lock:
+                traffic_ops, self._traffic_ops = self._traffic_ops, []
+                resource_ops, self._resource_ops = self._resource_ops, []
+                callbacks, self._callbacks = self._callbacks, []
+                weights_kb, self._weights_kb = self._weights_kb, []
+            if not traffic_ops:
+                return
+
+            started = time.monotonic()
+            succeeded = True
+            for collection, ops in ((self.collection_traffic, traffic_ops),
+                                    (self.collection_resource, resource_ops)):
+                try:
+                    collection.bulk_write(ops, ordered=False)
+                    self.written_count += len(ops)
+                except BulkWriteError as e:
+                    errors = e.details.get('writeErrors', [])
+                    self.written_count += len(ops) - len(errors)
+                    self.error_count += len(errors)
+                    succeeded = False
+                    print(f"Bulk write error ({collection.name}): {len(errors)} failed, first: {errors[:1]}")
+                except PyMongoError as e:
+                    self.error_count += len(ops)
+                    succeeded = False
+                    print(f"Bulk write error ({collection.name}): {str(e)}")
+            self.write_seconds += time.monotonic() - started
+            self.flush_count += 1
+            print(f"[AuditWriter] flushed {len(traffic_ops)} audits | {self.summary()}")
+
+            # 저장에 실패한 묶음은 done 처리하지 않음 (--resume 시 in_flight 로 남아 다시 평가됨)
+            # 콜백 하나가 실패해도 나머지 콜백과 flush 를 호출한 스레드에 영향이 없도록 하나씩 처리
+            if succeeded:
+                for callback in callbacks:
+                    try:
+                        callback()
+                    except Exception as e:
+                        print(f"[AuditWriter] on_saved callback error: {str(e)}")
+                if self.grade_sketches is not None:
+                    try:
+                        record_weights(self.grade_sketches, weights_kb)
+                    except Exception as e:
+                        print(f"[AuditWriter] could not record grade weights: {str(e)}")
+
+    def summary(self):
+        running = time.monotonic() - self.started_at
+        docs_per_second = self.written_count / running if running > 0 else 0.0
+        return (f"written {self.written_count} docs in {self.flush_count} flushes "
+                f"({docs_per_second:.1f} docs/s, {self.write_seconds:.1f}s in Mongo), errors {self.error_count}")
+
+    def _flush_periodically(self):
+        while not self._stopped.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception as e:
+                # 다음 주기에 다시 저장하도록 스레드는 계속 실행
+                print(f"[AuditWriter] periodic flush error: {str(e)}")
+
+    def close(self):
+        """백그라운드 저장을 멈추고 남은 문서를 모두 저장"""
+        self._stopped.set()
+        self._thread.join()
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
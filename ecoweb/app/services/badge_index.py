@@ -0,0 +1,163 @@
+'''
+/api/badge 백분위 계산용 메모리 인덱스
+
+요청마다 lighthouse_resource 전체를 읽어 비교하는 대신
+전체 사이트의 total_byte_weight 를 정렬된 리스트로 메모리에 두고 bisect 로 순위를 구한다.
+새 평가는 audited_at 기준 워터마크 이후의 문서만 주기적으로(BADGE_INDEX_REFRESH 초) 읽어 반영한다.
+(배치 평가는 다른 프로세스에서 저장하므로 저장 시점에 알림을 받는 대신 조회 시 갱신)
+
+배지 응답(carbon, percentage, ETag)은 URL별로 메모해두고 그 URL의 새 평가가 반영되면 지운다.
+다른 사이트의 평가로 바뀌는 백분위는 전체를 다시 읽을 때(FULL_RELOAD_INTERVAL) 반영된다.
+'''
+import hashlib
+import threading
+import time
+from bisect import bisect_left, bisect_right, insort
+from datetime import timedelta
+
+from app.services.audit_cache import canonicalize_url
+
+# AuditWriter 는 audited_at 을 정한 뒤 최대 flush_interval 만큼 늦게 저장하므로 워터마크를 이만큼 겹쳐서 조회
+WATERMARK_OVERLAP = timedelta(minutes=2)
+# audited_at 을 바꾸지 않는 저장(보관된 리포트 재추출 등)도 반영되도록 가끔 전체를 다시 읽음
+FULL_RELOAD_INTERVAL = 60 * 60
+
+
+class BadgePercentileIndex:
+    def __init__(self, app=None):
+        self.database = None
+        self.refresh_interval = 30
+        self._weights = []          # 정렬된 total_byte_weight
+        self._by_url = {}           # url -> total_byte_weight
+        self._audited_at = {}       # url -> audited_at (Last-Modified)
+        self._badges = {}           # url -> 배지 응답 메모
+        self._watermark = None      # 반영한 문서 중 가장 최근 audited_at
+        self._checked_at = 0.0
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+
+    def init_app(self, app, database):
+        """
+        Args:
+            app: Flask 앱 (BADGE_INDEX_REFRESH 설정 사용)
+            database: app.database.MongoDB
+        """
+        self.database = database
+        self.refresh_interval = app.config['BADGE_INDEX_REFRESH']
+
+    @property
+    def collection(self):
+        return self.database.db.lighthouse_resource
+
+    def _set(self, url, weight, audited_at=None):
+        if audited_at and audited_at != self._audited_at.get(url):
+            self._audited_at[url] = audited_at
+            self._badges.pop(url, None)
+        previous = self._by_url.get(url)
+        if previous == weight:
+            return
+        self._badges.pop(url, None)
+        if previous is not None:
+            del self._weights[bisect_left(self._weights, previous)]
+        self._by_url[url] = weight
+        insort(self._weights, weight)
+
+    def _apply(self, documents):
+        for document in documents:
+            audited_at = document.get('audited_at')
+            self._set(document['url'], document['total_byte_weight'], audited_at)
+            if audited_at and (self._watermark is None or audited_at > self._watermark):
+                self._watermark = audited_at
+
+    def _load(self):
+        projection = {'url': 1, 'total_byte_weight': 1, 'audited_at': 1, '_id': 0}
+        documents = list(self.collection.find({'total_byte_weight': {'$type': 'number'}}, projection))
+        self._by_url = {document['url']: document['total_byte_weight'] for document in documents}
+        self._weights = sorted(self._by_url.values())
+        self._audited_at = {document['url']: document['audited_at'] for document in documents
+                            if document.get('audited_at')}
+        self._badges = {}
+        self._watermark = max((document['audited_at'] for document in documents if document.get('audited_at')),
+                              default=None)
+        self._loaded_at = self._checked_at = time.monotonic()
+
+    def refresh(self, force=False):
+        """워터마크 이후에 저장된 평가만 읽어서 반영 (refresh_interval 안에 다시 호출하면 아무것도 안 함)"""
+        now = time.monotonic()
+        if not force and now - self._checked_at < self.refresh_interval:
+            return
+        with self._lock:
+            if not force and now - self._checked_at < self.refresh_interval:
+                return
+            if not self._loaded_at or now - self._loaded_at >= FULL_RELOAD_INTERVAL or self._watermark is None:
+                self._load()
+                return
+            self._apply(self.collection.find(
+                {'audited_at': {'$gte': self._watermark - WATERMARK_OVERLAP},
+                 'total_byte_weight': {'$type': 'number'}},
+                {'url': 1, 'total_byte_weight': 1, 'audited_at': 1, '_id': 0},
+            ))
+            self._checked_at = now
+
+    def weights(self, urls):
+        """
+        URL 목록의 total_byte_weight (평가 기록이 없으면 None)
+
+        평가 결과는 정규화된 URL(audit_cache.canonicalize_url)로 저장되므로 같은 규칙으로 찾는다.
+        인덱스에 없는 URL(방금 저장된 평가)만 모아서 MongoDB 에 $in 한 번으로 조회
+        """
+        self.refresh()
+        canonical_urls = {url: canonicalize_url(url) for url in urls}
+        weights = {canonical_url: self._by_url.get(canonical_url) for canonical_url in canonical_urls.values()}
+        missing = [canonical_url for canonical_url, weight in weights.items() if weight is None]
+        if missing:
+            documents = list(self.collection.find({'url': {'$in': missing}, 'total_byte_weight': {'$type': 'number'}},
+                                                  {'url': 1, 'total_byte_weight': 1, 'audited_at': 1, '_id': 0}))
+            with self._lock:
+                self._apply(documents)
+            for document in documents:
+                weights[document['url']] = document['total_byte_weight']
+        return {url: weights[canonical_url] for url, canonical_url in canonical_urls.items()}
+
+    def weight(self, url):
+        """URL 의 total_byte_weight. 인덱스에 없으면 MongoDB 에서 한 번 더 찾아봄"""
+        return self.weights([url])[url]
+
+    def better_than(self, weight):
+        """weight 보다 무거운 사이트의 비율(%)"""
+        with self._lock:
+            total = len(self._weights)
+            heavier = total - bisect_right(self._weights, weight)
+        return round(heavier / total * 100) if total else 0
+
+    def badges(self, urls):
+        """
+        URL별 /api/badge 응답 (메모된 값이 있으면 그대로 사용). 평가 기록이 없는 URL은 None
+
+        Returns:
+            dict: url -> {carbon, percentage, etag, audited_at} 또는 None
+        """
+        result = {}
+        for url, total_byte_weight in self.weights(urls).items():
+            if total_byte_weight is None:
+                result[url] = None
+                continue
+            canonical_url = canonicalize_url(url)
+            badge = self._badges.get(canonical_url)
+            if badge is None:
+                kb_weight = total_byte_weight / 1024
+                carbon = round((kb_weight * 0.04) / 272.51, 3)
+                percentage = self.better_than(total_byte_weight)
+                badge = {
+                    'carbon': carbon,
+                    'percentage': percentage,
+                    'etag': hashlib.sha1(f'{canonical_url}|{total_byte_weight}|{percentage}'.encode()).hexdigest()[:20],
+                    'audited_at': self._audited_at.get(canonical_url),
+                }
+                self._badges[canonical_url] = badge
+            result[url] = badge
+        return result
+
+    def badge(self, url):
+        """/api/badge 응답. 평가 기록이 없으면 None"""
+        return self.badges([url])[url]
@@ -0,0 +1,239 @@
+'''
+공공기관 웹사이트 Lighthouse 일괄 평가 (병렬 워커)
+
+korea_public_website_urls.csv 의 약 2.2만개 사이트를 여러 워커로 동시에 평가하고
+결과는 process_Analysis 를 통해 MongoDB(lighthouse_traffic, lighthouse_resource)에 저장한다.
+
+사용법 (ecoweb 디렉토리에서 실행):
+    python -m app.services.batch_audit --workers 8 --timeout 120
+    # 중단된 평가 이어서 진행 (완료된 URL은 건너뛰고, 오래된 in_flight 는 다시 평가)
+    python -m app.services.batch_audit --workers 8 --resume
+    # Chrome 을 미리 띄워두고 재사용 (평가마다 Chrome 을 새로 띄우지 않음)
+    python -m app.services.batch_audit --workers 8 --chrome-pool
+'''
+import argparse
+import csv
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+
+from pymongo import MongoClient
+
+from config import Config, BASE_DIR
+from app.services.lighthouse import run_lighthouse, process_Analysis, remove_report
+from app.services.audit_journal import AuditJournal, classify_error, retry_delay
+from app.services.chrome_pool import ChromePool
+from app.services.audit_writer import AuditWriter
+from app.services.report_archive import ReportArchive
+
+DEFAULT_INPUT_PATH = os.path.join(BASE_DIR, 'app', 'data', 'urls', 'korea_public_website_urls.csv')
+DEFAULT_JOURNAL_PATH = os.path.join(BASE_DIR, 'batch_audit_journal.jsonl')
+
+# korea_public_website_urls.csv 컬럼 -> MongoDB 필드명
+CSV_FIELD_MAP = {
+    '기관유형': 'institutionType',
+    '기관분류': 'institutionCategory',
+    '상세기관분류': 'institutionSubcategory',
+    '사이트명': 'siteName',
+    '사이트 구분': 'siteType',
+    '사이트링크': 'siteLink',
+}
+
+def load_sites(path=DEFAULT_INPUT_PATH):
+    """공공기관 사이트 목록(csv 또는 json)을 읽어 siteLink 를 https 로 통일한 dict 리스트로 반환"""
+    if path.endswith('.json'):
+        with open(path, 'r', encoding='utf-8') as file:
+            sites = json.load(file)
+    else:
+        with open(path, 'r', encoding='utf-8-sig', newline='') as file:
+            sites = [{CSV_FIELD_MAP.get(key, key): value for key, value in row.items()}
+                     for row in csv.DictReader(file)]
+
+    for site in sites:
+        site['siteLink'] = site['siteLink'].strip().replace('http://', 'https://')
+    return [site for site in sites if site['siteLink']]
+
+
+class AuditProgress:
+    """워커들이 공유하는 진행 상황 (처리량, 예상 종료 시각)"""
+
+    def __init__(self, total):
+        self.total = total
+        self.success_count = 0
+        self.error_count = 0
+        self.started_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    @property
+    def done_count(self):
+        return self.success_count + self.error_count
+
+    def record(self, url, success, elapsed):
+        with self._lock:
+            if success:
+                self.success_count += 1
+            else:
+                self.error_count += 1
+            line = self.summary()
+        status = 'Success' if success else 'Error'
+        print(f"[{datetime.now():%Y-%m-%d %H:%M:%S}] {status} {url} ({elapsed:.1f}s) | {line}")
+
+    def summary(self):
+        running = time.monotonic() - self.started_at
+        throughput = self.done_count / running * 3600 if running > 0 else 0.0  # audits/hour
+        remaining = self.total - self.done_count
+        if throughput > 0:
+            eta = datetime.now() + timedelta(hours=remaining / throughput)
+            eta_text = f"{eta:%m-%d %H:%M}"
+        else:
+            eta_text = '-'
+        return (f"{self.done_count}/{self.total} "
+                f"(Success: {self.success_count}, Error: {self.error_count}) "
+                f"{throughput:.0f} audits/h, ETA {eta_text}")
+
+
+def audit_once(site, collection_resource, collection_traffic, timeout=None, chrome_pool=None,
+               writer=None, on_saved=None, archive=None):
+    """
+    사이트 하나를 한 번 평가해 저장 (재시도 없음, Lighthouse 오류는 예외로 전달)
+
+    chrome_pool 이 있으면 미리 띄워둔 Chrome 에 붙어서 평가하고, writer 가 있으면 결과를 모아서 저장한다.
+    archive(ReportArchive) 가 있으면 원본 리포트를 압축해서 보관한다.
+    on_saved 는 결과가 MongoDB 에 실제로 저장된 뒤 호출된다 (writer 사용 시 flush 이후).
+
+    Returns:
+        bool: 저장했으면 True, 리포트에 필요한 audit 이 없으면 False (재시도해도 같은 결과)
+    """
+    url = site['siteLink']
+    report_path = None
+    try:
+        if chrome_pool is None:
+            report_path = run_lighthouse(url, timeout=timeout, check=True)
+        else:
+            with chrome_pool.instance() as chrome:
+                report_path = run_lighthouse(url, timeout=timeout, check=True, port=chrome.port)
+        if archive is not None:
+            archive.try_add(url, report_path)
+        return process_Analysis(url, site, collection_resource, collection_traffic,
+                                report_path=report_path, writer=writer, on_saved=on_saved) == 1
+    finally:
+        remove_report(report_path)
+
+
+def audit_site(site, collection_resource, collection_traffic, journal, timeout=None, chrome_pool=None,
+               writer=None, archive=None):
+    """
+    사이트 하나를 평가해 저장. 성공하면 True
+
+    실패하면 오류 종류(DNS, timeout, Chrome 비정상 종료 등)에 따라 RETRY_POLICY 만큼 대기 후 재시도하고
+    진행 상태는 journal 에 기록한다.
+    """
+    url = site['siteLink']
+    journal.start(url)
+    attempt = 0
+
+    while True:
+        attempt += 1
+        try:
+            # done 은 결과가 MongoDB 에 실제로 저장된 뒤에 기록
+            saved_attempt = attempt
+            if audit_once(site, collection_resource, collection_traffic, timeout=timeout,
+                          chrome_pool=chrome_pool, writer=writer, archive=archive,
+                          on_saved=lambda: journal.done(url, saved_attempt)):
+                return True
+            journal.failed(url, attempt, 'no_data', 'network-requests/resource-summary not found in report')
+            return False
+        except Exception as e:
+            error_class = classify_error(e)
+            delay = retry_delay(error_class, attempt)
+            if delay is None:
+                print(f"최대 재시도 횟수 초과 ({error_class}). URL 건너뜁니다: {url}")
+                journal.failed(url, attempt, error_class, str(e))
+                return False
+            print(f"오류 발생 ({url}, {error_class}): {str(e)[:200]}. {delay}초 후 재시도합니다. (시도 {attempt}회)")
+            time.sleep(delay)
+
+
+def run_batch(sites, collection_resource, collection_traffic, journal, workers=4, timeout=180,
+              chrome_pool=None, writer=None, archive=None):
+    """
+    사이트 목록을 workers 개의 스레드로 동시에 평가
+
+    각 워커는 Lighthouse 프로세스를 하나씩 띄우므로 workers 는 CPU 코어 수 이하로 설정하는 것을 권장.
+
+    Returns:
+        AuditProgress: 최종 진행 상황
+    """
+    progress = AuditProgress(len(sites))
+
+    def task(site):
+        started = time.monotonic()
+        success = audit_site(site, collection_resource, collection_traffic, journal, timeout=timeout,
+                             chrome_pool=chrome_pool, writer=writer, archive=archive)
+        progress.record(site['siteLink'], success, time.monotonic() - started)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(task, site) for site in sites]
+        for future in as_completed(futures):
+            future.result()
+
+    print(f"Finished: {progress.summary()}")
+    return progress
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='공공기관 웹사이트 Lighthouse 일괄 평가')
+    parser.add_argument('--input', default=DEFAULT_INPUT_PATH, help='사이트 목록 (csv 또는 json)')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 4, help='동시에 실행할 Lighthouse 수')
+    parser.add_argument('--timeout', type=float, default=180, help='URL 하나당 제한 시간(초)')
+    parser.add_argument('--limit', type=int, default=None, help='앞에서부터 N개만 평가')
+    parser.add_argument('--journal', default=DEFAULT_JOURNAL_PATH, help='진행 기록 파일 (JSON Lines)')
+    parser.add_argument('--resume', action='store_true', help='진행 기록을 읽어 완료된 URL은 건너뜀')
+    parser.add_argument('--stale-after', type=float, default=None,
+                        help='이 시간(초)보다 오래된 in_flight URL은 다시 평가 (기본: timeout x 4)')
+    parser.add_argument('--retry-failed', action='store_true', help='--resume 시 실패한 URL도 다시 평가')
+    parser.add_argument('--chrome-pool', action='store_true',
+                        help='워커 수만큼 Chrome 을 미리 띄워두고 재사용 (CHROME_PATH 환경변수로 Chrome 경로 지정)')
+    parser.add_argument('--chrome-max-audits', type=int, default=50, help='Chrome 하나로 평가할 최대 횟수')
+    parser.add_argument('--write-batch-size', type=int, default=100, help='MongoDB 에 한 번에 저장할 평가 수')
+    parser.add_argument('--write-interval', type=float, default=10.0, help='MongoDB 저장 최대 간격(초)')
+    parser.add_argument('--no-archive', action='store_true', help='원본 리포트를 보관하지 않음')
+    args = parser.parse_args(argv)
+
+    sites = load_sites(args.input)
+    if args.limit:
+        sites = sites[:args.limit]
+
+    journal = AuditJournal(args.journal)
+    if args.resume:
+        stale_after = args.stale_after if args.stale_after is not None else args.timeout * 4
+        total = len(sites)
+        sites = journal.pending(sites, stale_after, retry_failed=args.retry_failed)
+        print(f"Resume: {total - len(sites)}개 건너뜀, {len(sites)}개 평가 예정")
+
+    chrome_pool = ChromePool(args.workers, max_audits=args.chrome_max_audits) if args.chrome_pool else None
+    client = MongoClient(Config.MONGO_URI)
+    try:
+        db = client[Config.DB_NAME]
+        archive = None
+        if not args.no_archive:
+            archive = ReportArchive(db['lighthouse_reports'])
+            archive.ensure_indexes()
+        with AuditWriter(db['lighthouse_resource'], db['lighthouse_traffic'],
+                         batch_size=args.write_batch_size, flush_interval=args.write_interval,
+                         grade_sketches=db['grade_sketches']) as writer:
+            run_batch(sites, db['lighthouse_resource'], db['lighthouse_traffic'], journal,
+                      workers=args.workers, timeout=args.timeout, chrome_pool=chrome_pool, writer=writer,
+                      archive=archive)
+    finally:
+        client.close()
+        journal.close()
+        if chrome_pool:
+            chrome_pool.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,41 +1,72 @@
-import pandas as pd
+import argparse
+import os
 import json
 
-def get_category_total_co2():
-    # CSV 파일 읽기
-    df = pd.read_csv('../data/urls/flattened_lighthouse_traffic.csv')
-    
-    # total 타입만 필터링
-    total_df = df[df['resource_summary.resourceType'] == 'total']
-    
-    # institutionType 별로 그룹화, 그리고 그룹별로 합계 계산
-    total_sites = total_df.groupby('institutionType')['resource_summary.transferSize'].sum()
-    
+from pymongo import MongoClient
+
+from config import Config
+from app.services.emissions_calculator import estimate_emissions
+
+# ecoweb 디렉토리에서 python -m app.services.category_total_co2 --output /tmp/category_total_co2.json 로 실행
+# (웹에서 쓰는 static/statistics/category_total_co2.json 은 statistics_materializer 가 갱신하므로 여기서는 쓰지 않음)
+
+def category_total_pipeline():
+    """
+    기관 유형별 total 전송량 합계 (MongoDB 에서 집계하고 유형별 한 줄씩만 받음)
+
+    첫 $match 는 resource_summary.resourceType 인덱스(app.services.db_indexes)를 사용하지만
+    평가된 문서는 거의 모두 total 항목이 있으므로 사실상 전체를 읽는다. (자주 필요하면 statistics_materializer 사용)
+    """
+    return [
+        {'$match': {'resource_summary.resourceType': 'total', 'institutionType': {'$type': 'string'}}},
+        {'$project': {'_id': 0, 'institutionType': 1, 'resource_summary': 1}},
+        {'$unwind': '$resource_summary'},
+        {'$match': {'resource_summary.resourceType': 'total'}},
+        {'$group': {'_id': '$institutionType', 'totalBytes': {'$sum': '$resource_summary.transferSize'}}},
+        {'$sort': {'_id': 1}},
+    ]
+
+def get_category_total_co2(collection):
+    # institutionType 별 total 전송량 합계
+    rows = list(collection.aggregate(category_total_pipeline()))
+
+    # 배출량은 전송량에 비례하므로 유형별 합계로 한 번에 계산 (사이트별 배출량의 합과 같음)
+    total_bytes = [row['totalBytes'] for row in rows]
+    total_co2 = estimate_emissions([size / 1024 ** 3 for size in total_bytes])['total']
+
     # byte를 mb로 변환 
-    total_sites = (total_sites / 1024 / 1024).round(2)
-    
-    # Series를 딕셔너리로 변환
-    result_dict = total_sites.to_dict()
-    
-    # 결과 출력 (디버깅용)
-    print("\n=== 기관 유형별 총 트래픽 ===")
-    for institution_type, mb_size in result_dict.items():
-        print(f"{institution_type}: {mb_size}MB")
-    
-    # JSON 파일로 저장
     result_list = [
         {
-            "institutionType": inst_type,
-            "totalMB": mb_size
+            "institutionType": row['_id'],
+            "totalMB": round(size / 1024 / 1024, 2),
+            "totalCO2": round(float(co2), 2)
         }
-        for inst_type, mb_size in result_dict.items()
+        for row, size, co2 in zip(rows, total_bytes, total_co2)
     ]
     
-    # JSON 파일로 저장 (한글 인코딩 처리)
-    with open('../static/statistics/category_total_co2.json', 'w', encoding='utf-8') as f:
-        json.dump(result_list, f, ensure_ascii=False, indent=2)
+    # 결과 출력 (디버깅용)
+    print("\n=== 기관 유형별 총 트래픽 ===")
+    for item in result_list:
+        print(f"{item['institutionType']}: {item['totalMB']}MB")
     
-    return total_sites
+    return result_list
+
+def write_json(data, path):
+    """읽는 쪽에서 깨진 파일이 보이지 않도록 임시 파일에 쓴 뒤 교체 (한글 인코딩 처리)"""
+    temp_path = f'{path}.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    os.replace(temp_path, path)
 
 if __name__ == '__main__':
-    get_category_total_co2()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description='기관 유형별 총 전송량/배출량 집계')
+    parser.add_argument('--output', required=True,
+                        help='저장할 json 경로 (static/statistics 는 statistics_materializer 가 갱신)')
+    parser.add_argument('--mongo-uri', default=Config.MONGO_URI)
+    args = parser.parse_args()
+
+    client = MongoClient(args.mongo_uri)
+    try:
+        write_json(get_category_total_co2(client[Config.DB_NAME]['lighthouse_traffic']), args.output)
+    finally:
+        client.close()
@@ -0,0 +1,199 @@
+'''
+내용이 바뀐 사이트만 다시 평가하기 위한 사전 점검
+
+전체 사이트를 주기적으로 다시 평가하면 대부분은 내용이 그대로인 사이트라 Lighthouse 실행이 낭비된다.
+Lighthouse 대신 첫 페이지(HTML)만 요청해서 ETag, Last-Modified, 본문 해시(sha256)를
+site_fingerprints 컬렉션에 기록하고, 다음 점검 때 조건부 요청(If-None-Match / If-Modified-Since)으로 비교한다.
+
+다시 평가할 사이트에는 본문 해시를 content_sha256 으로 넘기고, 평가가 저장될 때 lighthouse_traffic 에 함께 저장된다.
+바뀌었는지는 이 값(마지막으로 저장된 평가 당시의 본문 해시)과 비교하므로 다시 평가가 실패하거나
+실행되지 않았으면(--output) 다음 점검에서도 바뀐 사이트로 남는다.
+(content_sha256 이 없는 예전 평가는 지난 점검의 본문 해시와 비교)
+
+다시 평가하는 사이트:
+    - 처음 점검하는 사이트, 또는 304 가 아니고 본문 해시가 바뀐 사이트
+    - 마지막 평가(lighthouse_traffic.audited_at)가 max_age 보다 오래되었거나 평가 기록이 없는 사이트
+그 외 사이트는 이전 평가 결과를 그대로 사용하고 lighthouse_traffic 에 content_checked_at 만 기록한다.
+(점검 요청 자체가 실패한 사이트는 이전 지문을 유지하고 바뀌지 않은 것으로 본다)
+
+사용법 (ecoweb 디렉토리에서 실행):
+    python -m app.services.change_detection --max-age-days 30              # 바뀐 사이트를 작업 큐(audit_queue)에 등록
+    python -m app.services.change_detection --output changed_sites.json    # batch_audit --input 으로 사용할 목록 저장
+'''
+import argparse
+import hashlib
+import json
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import requests
+from pymongo import MongoClient, UpdateOne
+
+from config import Config
+from app.services.audit_cache import canonicalize_url
+from app.services.batch_audit import DEFAULT_INPUT_PATH, load_sites
+from app.services.work_queue import AuditWorkQueue
+
+USER_AGENT = 'Mozilla/5.0 (compatible; ecoweb-change-check/1.0)'
+CHUNK_SIZE = 64 * 1024
+QUERY_CHUNK_SIZE = 1000
+
+CHANGED = 'changed'
+UNCHANGED = 'unchanged'
+ERROR = 'error'
+
+
+def fetch_fingerprint(session, url, previous=None, timeout=15):
+    """
+    첫 페이지의 지문(ETag, Last-Modified, 본문 해시) 조회
+
+    previous 지문이 있으면 조건부 요청을 보내고, 304 이면 본문을 받지 않고 이전 지문을 그대로 사용한다.
+
+    Returns:
+        tuple: (CHANGED | UNCHANGED, fingerprint dict)
+    """
+    headers = {'User-Agent': USER_AGENT}
+    if previous:
+        if previous.get('etag'):
+            headers['If-None-Match'] = previous['etag']
+        if previous.get('last_modified'):
+            headers['If-Modified-Since'] = previous['last_modified']
+
+    with session.get(url, headers=headers, timeout=timeout, stream=True, allow_redirects=True) as response:
+        if response.status_code == 304 and previous:
+            return UNCHANGED, {key: previous.get(key) for key in ('etag', 'last_modified', 'body_sha256')}
+        response.raise_for_status()
+
+        digest = hashlib.sha256()
+        for chunk in response.iter_content(CHUNK_SIZE):
+            digest.update(chunk)
+        fingerprint = {
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'body_sha256': digest.hexdigest(),
+        }
+
+    if previous and previous.get('body_sha256') == fingerprint['body_sha256']:
+        return UNCHANGED, fingerprint
+    return CHANGED, fingerprint
+
+
+def _find_by_url(collection, urls, projection):
+    """정규화된 URL 목록으로 문서 조회 ($in 을 QUERY_CHUNK_SIZE 개씩 나눠서)"""
+    documents = {}
+    for start in range(0, len(urls), QUERY_CHUNK_SIZE):
+        for document in collection.find({'url': {'$in': urls[start:start + QUERY_CHUNK_SIZE]}}, projection):
+            documents[document['url']] = document
+    return documents
+
+
+def detect_changes(sites, collection_fingerprints, collection_traffic, max_age, workers=32, timeout=15):
+    """
+    사이트마다 지문을 비교해 다시 평가할 사이트와 이전 결과를 그대로 쓸 사이트로 나눔
+
+    Args:
+        max_age (float): 마지막 평가가 이 시간(초)보다 오래되면 내용이 같아도 다시 평가
+
+    Returns:
+        tuple: (다시 평가할 사이트 리스트, 이전 결과를 그대로 쓸 URL 리스트, 상태별 개수 dict)
+    """
+    urls = [site['siteLink'] for site in sites]
+    previous = {}
+    for start in range(0, len(urls), QUERY_CHUNK_SIZE):
+        for document in collection_fingerprints.find({'_id': {'$in': urls[start:start + QUERY_CHUNK_SIZE]}}):
+            previous[document['_id']] = document
+    last_audits = _find_by_url(collection_traffic, [canonicalize_url(url) for url in urls],
+                               {'url': 1, 'audited_at': 1, 'content_sha256': 1, '_id': 0})
+
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=workers, pool_maxsize=workers)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+
+    def check(url):
+        try:
+            return fetch_fingerprint(session, url, previous.get(url), timeout=timeout)
+        except Exception as e:
+            return ERROR, str(e)[:200]
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(check, urls))
+
+    now = datetime.now()
+    stale_before = now - timedelta(seconds=max_age)
+    to_audit, unchanged_urls = [], []
+    counts = {CHANGED: 0, UNCHANGED: 0, ERROR: 0, 'stale': 0}
+    operations = []
+    for site, url, (state, result) in zip(sites, urls, results):
+        last_audit = last_audits.get(canonicalize_url(url), {})
+        if state == ERROR:
+            operations.append(UpdateOne({'_id': url}, {'$set': {'checked_at': now, 'error': result}}, upsert=True))
+        else:
+            fields = {**result, 'checked_at': now}
+            if state == CHANGED:
+                fields['changed_at'] = now
+            operations.append(UpdateOne({'_id': url}, {'$set': fields, '$unset': {'error': ''}}, upsert=True))
+            if last_audit.get('content_sha256'):
+                state = UNCHANGED if result['body_sha256'] == last_audit['content_sha256'] else CHANGED
+            # 평가가 저장될 때 lighthouse_traffic 에 함께 저장됨 (process_Analysis 의 url_data)
+            site = {**site, 'content_sha256': result['body_sha256']}
+        counts[state] += 1
+
+        audited_at = last_audit.get('audited_at')
+        if state == CHANGED:
+            to_audit.append(site)
+        elif audited_at is None or audited_at < stale_before:
+            counts['stale'] += 1
+            to_audit.append(site)
+        else:
+            unchanged_urls.append(url)
+
+    for start in range(0, len(operations), QUERY_CHUNK_SIZE):
+        collection_fingerprints.bulk_write(operations[start:start + QUERY_CHUNK_SIZE], ordered=False)
+    return to_audit, unchanged_urls, counts
+
+
+def carry_forward(collection_traffic, urls):
+    """내용이 바뀌지 않은 사이트의 이전 평가 결과를 이번 점검에도 유효한 것으로 표시"""
+    now = datetime.now()
+    urls = [canonicalize_url(url) for url in urls]
+    for start in range(0, len(urls), QUERY_CHUNK_SIZE):
+        collection_traffic.update_many({'url': {'$in': urls[start:start + QUERY_CHUNK_SIZE]}},
+                                       {'$set': {'content_checked_at': now}})
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='내용이 바뀐 사이트만 골라서 다시 평가 예약')
+    parser.add_argument('--input', default=DEFAULT_INPUT_PATH, help='사이트 목록 (csv 또는 json)')
+    parser.add_argument('--max-age-days', type=float, default=30, help='이 기간(일)이 지난 평가는 내용이 같아도 다시 평가')
+    parser.add_argument('--workers', type=int, default=32, help='동시에 보낼 HTTP 요청 수')
+    parser.add_argument('--timeout', type=float, default=15, help='요청 하나당 제한 시간(초)')
+    parser.add_argument('--output', default=None, help='작업 큐 대신 다시 평가할 사이트 목록을 json 으로 저장')
+    parser.add_argument('--mongo-uri', default=Config.MONGO_URI)
+    args = parser.parse_args(argv)
+
+    sites = load_sites(args.input)
+    client = MongoClient(args.mongo_uri)
+    try:
+        db = client[Config.DB_NAME]
+        to_audit, unchanged_urls, counts = detect_changes(
+            sites, db['site_fingerprints'], db['lighthouse_traffic'], args.max_age_days * 24 * 60 * 60,
+            workers=args.workers, timeout=args.timeout)
+        carry_forward(db['lighthouse_traffic'], unchanged_urls)
+        print(f"Checked {len(sites)} sites: {counts}. "
+              f"{len(to_audit)} to re-audit, {len(unchanged_urls)} carried forward")
+
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as file:
+                json.dump(to_audit, file, ensure_ascii=False)
+            print(f"Saved to {args.output} (python -m app.services.batch_audit --input {args.output})")
+        else:
+            queue = AuditWorkQueue(db['audit_queue'])
+            queue.ensure_indexes()
+            print(f"Requeued {queue.requeue(to_audit)} sites. {queue.counts()}")
+    finally:
+        client.close()
+
+
+if __name__ == '__main__':
+    main()
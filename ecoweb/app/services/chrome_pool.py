@@ -0,0 +1,131 @@
+'''
+Lighthouse 용 Headless Chrome 풀
+
+run_lighthouse 를 그냥 호출하면 평가마다 Chrome 을 새로 띄우고 종료한다.
+ChromePool 은 remote-debugging-port 를 연 Chrome 을 미리 띄워두고
+Lighthouse 를 --port 로 붙여서 실행하므로 Chrome 기동 시간이 평가마다 들지 않는다.
+Chrome 은 max_audits 번 사용하면 새로 띄우고, 비정상 종료(crash)한 경우에도 다시 띄운다.
+
+    pool = ChromePool(size=4)
+    with pool.instance() as chrome:
+        run_lighthouse(url, port=chrome.port)
+    pool.close()
+'''
+import os
+import queue
+import shutil
+import socket
+import subprocess
+import tempfile
+import time
+import urllib.request
+from contextlib import contextmanager
+
+CHROME_PATH = os.getenv('CHROME_PATH', 'google-chrome')
+CHROME_ARGS = ['--headless=new', '--no-sandbox', '--disable-gpu', '--disable-dev-shm-usage',
+               '--no-first-run', '--no-default-browser-check', '--disable-extensions']
+
+
+class ChromeInstance:
+    """remote-debugging-port 로 Lighthouse 가 붙을 수 있는 Chrome 프로세스 하나"""
+
+    def __init__(self, startup_timeout=30):
+        self.port = _free_port()
+        self.user_data_dir = tempfile.mkdtemp(prefix='ecoweb_chrome_')
+        self.audit_count = 0
+        command = [CHROME_PATH, f'--remote-debugging-port={self.port}',
+                   f'--user-data-dir={self.user_data_dir}', *CHROME_ARGS, 'about:blank']
+        self.process = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        self._wait_ready(startup_timeout)
+
+    def _wait_ready(self, startup_timeout):
+        deadline = time.monotonic() + startup_timeout
+        while time.monotonic() < deadline:
+            if self.is_alive():
+                return
+            if self.process.poll() is not None:
+                break
+            time.sleep(0.2)
+        self.stop()
+        raise RuntimeError(f"Chrome did not start on port {self.port} ({CHROME_PATH})")
+
+    def is_alive(self):
+        """프로세스가 살아있고 DevTools 엔드포인트가 응답하는지 확인"""
+        if self.process.poll() is not None:
+            return False
+        try:
+            with urllib.request.urlopen(f'http://127.0.0.1:{self.port}/json/version', timeout=2):
+                return True
+        except OSError:
+            return False
+
+    def stop(self):
+        if self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+                self.process.wait()
+        shutil.rmtree(self.user_data_dir, ignore_errors=True)
+
+
+class ChromePool:
+    """
+    미리 띄워둔 Chrome 을 워커들이 빌려 쓰는 풀
+
+    Args:
+        size (int): Chrome 인스턴스 수 (보통 batch_audit 의 workers 와 같게)
+        max_audits (int): 인스턴스 하나로 평가할 최대 횟수. 넘으면 새 Chrome 으로 교체 (메모리 누수 방지)
+    """
+
+    def __init__(self, size, max_audits=50):
+        self.max_audits = max_audits
+        self._idle = queue.Queue()
+        self._closed = False
+        for _ in range(size):
+            self._idle.put(ChromeInstance())
+
+    @contextmanager
+    def instance(self):
+        chrome = self._idle.get()
+        failed = False
+        try:
+            if not chrome.is_alive():
+                print(f"Chrome on port {chrome.port} is not responding. Restarting.")
+                chrome = self._replace(chrome)
+            yield chrome
+        except Exception:
+            # 평가가 실패(timeout 등)한 뒤에는 Chrome 상태를 알 수 없으므로 교체
+            failed = True
+            raise
+        finally:
+            chrome.audit_count += 1
+            if self._closed:
+                chrome.stop()
+            else:
+                if failed or chrome.audit_count >= self.max_audits or not chrome.is_alive():
+                    try:
+                        chrome = self._replace(chrome)
+                    except RuntimeError as e:
+                        # 종료된 인스턴스를 그대로 돌려놓고 다음 사용 시 다시 띄움
+                        print(f"Chrome restart failed: {str(e)}")
+                self._idle.put(chrome)
+
+    def _replace(self, chrome):
+        chrome.stop()
+        return ChromeInstance()
+
+    def close(self):
+        self._closed = True
+        while True:
+            try:
+                self._idle.get_nowait().stop()
+            except queue.Empty:
+                break
+
+
+def _free_port():
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
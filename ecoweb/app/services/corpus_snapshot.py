@@ -0,0 +1,311 @@
+'''
+평가 결과 스냅샷 (Parquet / Arrow IPC)
+
+분석 스크립트와 노트북이 손으로 만든 flattened_lighthouse_traffic.csv 를 읽는 대신
+lighthouse_traffic / lighthouse_resource 를 타입이 있는 컬럼 형식으로 내보내고 필요한 컬럼만 메모리 맵으로 읽는다.
+
+    <SNAPSHOT_DIR>/<생성 시각>/traffic/institutionType=<기관 유형>/part-*.parquet   사이트별 1행
+    <SNAPSHOT_DIR>/<생성 시각>/resources/part-*.parquet                             network_requests 1개당 1행
+    <SNAPSHOT_DIR>/<생성 시각>/manifest.json                                        형식, 행 수, 생성 시각
+    <SNAPSHOT_DIR>/LATEST                                                           가장 최근 스냅샷 이름
+
+기관 정보(institutionType 등)와 resourceType 은 dictionary 로 인코딩한다.
+MongoDB 에서 BATCH_ROWS 개씩 읽어 바로 파일로 쓰므로 전체 결과를 메모리에 올리지 않는다.
+--format ipc 로 내보내면 압축하지 않은 Arrow IPC 파일이라 읽을 때 복사 없이 메모리 맵으로 사용된다.
+
+사용 예:
+    from app.services.corpus_snapshot import load
+    table = load('traffic', columns=['institutionType', 'total_transfer_size'])
+    df = table.to_pandas()
+
+사용법 (ecoweb 디렉토리에서 실행):
+    python -m app.services.corpus_snapshot export
+    python -m app.services.corpus_snapshot export --format ipc --keep 5
+    python -m app.services.corpus_snapshot info
+
+저장 위치는 CORPUS_SNAPSHOT_DIR 환경변수로 지정 (기본: ecoweb/snapshots)
+'''
+import argparse
+import json
+import os
+import shutil
+import time
+import uuid
+from datetime import datetime
+
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.fs as pafs
+from pymongo import MongoClient
+
+from config import BASE_DIR, Config
+
+SNAPSHOT_DIR = os.getenv('CORPUS_SNAPSHOT_DIR', os.path.join(BASE_DIR, 'snapshots'))
+LATEST_FILE = 'LATEST'
+MANIFEST_FILE = 'manifest.json'
+BATCH_ROWS = 10000
+MAX_ROWS_PER_FILE = 500000
+FORMATS = ('parquet', 'ipc')
+
+CATEGORY = pa.dictionary(pa.int32(), pa.string())
+INSTITUTION_FIELDS = ('institutionType', 'institutionCategory', 'institutionSubcategory', 'siteType')
+# resource_summary 의 resourceType -> 컬럼 이름
+RESOURCE_TYPES = {
+    'total': 'total_transfer_size',
+    'document': 'document_transfer_size',
+    'script': 'script_transfer_size',
+    'stylesheet': 'stylesheet_transfer_size',
+    'image': 'image_transfer_size',
+    'font': 'font_transfer_size',
+    'media': 'media_transfer_size',
+    'other': 'other_transfer_size',
+    'third-party': 'third_party_transfer_size',
+}
+VIEW_DATA_FIELDS = (
+    'total_byte_weight', 'third_party_summary_wasted_bytes', 'total_unused_bytes_script',
+    'total_resource_bytes_script', 'can_optimize_css_bytes', 'can_optimize_js_bytes',
+    'modern_image_formats_bytes', 'efficient_animated_content', 'duplicated_javascript',
+)
+
+TRAFFIC_SCHEMA = pa.schema(
+    [('url', pa.string()), ('canonical_url', pa.string()), ('siteName', pa.string()), ('siteLink', pa.string())]
+    + [(field, CATEGORY) for field in INSTITUTION_FIELDS]
+    + [('audited_at', pa.timestamp('ms'))]
+    + [(column, pa.int64()) for column in RESOURCE_TYPES.values()]
+    + [(field, pa.float64()) for field in VIEW_DATA_FIELDS]
+)
+RESOURCE_SCHEMA = pa.schema([
+    ('url', pa.string()),
+    ('request_url', pa.string()),
+    ('resourceType', CATEGORY),
+    ('resourceSize', pa.int64()),
+    ('audited_at', pa.timestamp('ms')),
+])
+# 쓸 때는 기관 유형별 디렉토리로 나누고, 읽을 때는 디렉토리 이름을 다시 dictionary 컬럼으로
+PARTITIONING = {
+    'traffic': ds.partitioning(pa.schema([('institutionType', CATEGORY)]), flavor='hive'),
+    'resources': None,
+}
+READ_PARTITIONING = {
+    'traffic': ds.HivePartitioning.discover(infer_dictionary=True),
+    'resources': None,
+}
+
+
+def _number(value):
+    return value if isinstance(value, (int, float)) and not isinstance(value, bool) else None
+
+
+def _int(value):
+    value = _number(value)
+    return int(value) if value is not None else None
+
+
+def _datetime(value):
+    return value if isinstance(value, datetime) else None
+
+
+def traffic_row(document):
+    """lighthouse_traffic 문서 -> TRAFFIC_SCHEMA 행"""
+    row = {field: document.get(field) for field in ('url', 'canonical_url', 'siteName', 'siteLink')}
+    row.update({field: document.get(field) or None for field in INSTITUTION_FIELDS})
+    row['audited_at'] = _datetime(document.get('audited_at'))
+    sizes = {item.get('resourceType'): item.get('transferSize') for item in document.get('resource_summary') or []}
+    row.update({column: _int(sizes.get(resource_type)) for resource_type, column in RESOURCE_TYPES.items()})
+    view_data = document.get('view_data') or {}
+    row.update({field: _number(view_data.get(field)) for field in VIEW_DATA_FIELDS})
+    return row
+
+
+def _batches(rows, schema):
+    """행(dict) iterator -> BATCH_ROWS 개씩 RecordBatch"""
+    columns = {name: [] for name in schema.names}
+    count = 0
+    for row in rows:
+        for name in schema.names:
+            columns[name].append(row[name])
+        count += 1
+        if count >= BATCH_ROWS:
+            yield pa.RecordBatch.from_pydict(columns, schema=schema)
+            columns = {name: [] for name in schema.names}
+            count = 0
+    if count:
+        yield pa.RecordBatch.from_pydict(columns, schema=schema)
+
+
+def _traffic_rows(collection):
+    projection = {'_id': 0, 'url': 1, 'canonical_url': 1, 'siteName': 1, 'siteLink': 1, 'audited_at': 1,
+                  'resource_summary': 1, 'view_data': 1, **{field: 1 for field in INSTITUTION_FIELDS}}
+    for document in collection.find({}, projection).batch_size(BATCH_ROWS):
+        yield traffic_row(document)
+
+
+def _resource_rows(collection):
+    projection = {'_id': 0, 'url': 1, 'network_requests': 1, 'audited_at': 1}
+    for document in collection.find({}, projection).batch_size(1000):
+        audited_at = _datetime(document.get('audited_at'))
+        for request in document.get('network_requests') or []:
+            yield {
+                'url': document.get('url'),
+                'request_url': request.get('url'),
+                'resourceType': request.get('resourceType'),
+                'resourceSize': _int(request.get('resourceSize')),
+                'audited_at': audited_at,
+            }
+
+
+def _file_format(file_format):
+    if file_format == 'parquet':
+        parquet = ds.ParquetFileFormat()
+        return parquet, parquet.make_write_options(compression='zstd')
+    # 메모리 맵으로 복사 없이 읽을 수 있도록 압축하지 않음
+    ipc = ds.IpcFileFormat()
+    return ipc, ipc.make_write_options(compression=None)
+
+
+def _write(directory, name, rows, schema, file_format):
+    """rows 를 directory/name 데이터셋으로 저장하고 행 수 반환"""
+    count = 0
+
+    def counted(batches):
+        nonlocal count
+        for batch in batches:
+            count += batch.num_rows
+            yield batch
+
+    # 행이 없으면 write_dataset 이 디렉토리를 만들지 않으므로 빈 데이터셋도 열 수 있게 미리 생성
+    os.makedirs(os.path.join(directory, name), exist_ok=True)
+    format_, options = _file_format(file_format)
+    ds.write_dataset(
+        counted(_batches(rows, schema)),
+        os.path.join(directory, name),
+        schema=schema,
+        format=format_,
+        file_options=options,
+        partitioning=PARTITIONING[name],
+        basename_template=f'part-{{i}}.{file_format}',
+        max_rows_per_file=MAX_ROWS_PER_FILE,
+        max_rows_per_group=min(BATCH_ROWS * 10, MAX_ROWS_PER_FILE),
+        existing_data_behavior='error',
+    )
+    return count
+
+
+def export_snapshot(db, root=SNAPSHOT_DIR, file_format='parquet', keep=3):
+    """
+    lighthouse_traffic / lighthouse_resource 를 새 스냅샷으로 저장
+
+    임시 디렉토리에 모두 쓴 뒤 이름을 바꾸고 LATEST 를 교체하므로 읽는 쪽은 완성된 스냅샷만 본다.
+
+    Returns:
+        dict: manifest
+    """
+    if file_format not in FORMATS:
+        raise ValueError(f"Unknown format: {file_format}")
+    os.makedirs(root, exist_ok=True)
+    created_at = datetime.now()
+    # 같은 초에 다시 내보내도 이름이 겹치지 않도록 마이크로초까지 (고정 길이라 정렬 순서 = 생성 순서)
+    name = created_at.strftime('%Y%m%dT%H%M%S%f')
+    temp_dir = os.path.join(root, f'.tmp-{uuid.uuid4().hex}')
+    try:
+        manifest = {
+            'name': name,
+            'format': file_format,
+            'created_at': created_at.isoformat(timespec='seconds'),
+            'rows': {
+                'traffic': _write(temp_dir, 'traffic', _traffic_rows(db['lighthouse_traffic']),
+                                  TRAFFIC_SCHEMA, file_format),
+                'resources': _write(temp_dir, 'resources', _resource_rows(db['lighthouse_resource']),
+                                    RESOURCE_SCHEMA, file_format),
+            },
+        }
+        with open(os.path.join(temp_dir, MANIFEST_FILE), 'w', encoding='utf-8') as file:
+            json.dump(manifest, file, ensure_ascii=False, indent=2)
+        os.rename(temp_dir, os.path.join(root, name))
+    except BaseException:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+        raise
+
+    temp_latest = os.path.join(root, f'{LATEST_FILE}.tmp')
+    with open(temp_latest, 'w', encoding='utf-8') as file:
+        file.write(name)
+    os.replace(temp_latest, os.path.join(root, LATEST_FILE))
+    _prune(root, keep)
+    return manifest
+
+
+def _prune(root, keep):
+    """최근 keep 개를 남기고 오래된 스냅샷 삭제"""
+    names = sorted(name for name in os.listdir(root)
+                   if os.path.isfile(os.path.join(root, name, MANIFEST_FILE)))
+    for name in names[:-keep] if keep > 0 else []:
+        shutil.rmtree(os.path.join(root, name), ignore_errors=True)
+
+
+def snapshot_path(root=SNAPSHOT_DIR, snapshot=None):
+    """스냅샷 디렉토리 (snapshot 이 없으면 LATEST)"""
+    if snapshot is None:
+        with open(os.path.join(root, LATEST_FILE), 'r', encoding='utf-8') as file:
+            snapshot = file.read().strip()
+    return os.path.join(root, snapshot)
+
+
+def read_manifest(root=SNAPSHOT_DIR, snapshot=None):
+    with open(os.path.join(snapshot_path(root, snapshot), MANIFEST_FILE), 'r', encoding='utf-8') as file:
+        return json.load(file)
+
+
+def open_dataset(name='traffic', root=SNAPSHOT_DIR, snapshot=None):
+    """스냅샷의 traffic 또는 resources 데이터셋 (파일은 메모리 맵으로 읽음)"""
+    path = snapshot_path(root, snapshot)
+    manifest = read_manifest(root, os.path.basename(path))
+    file_format = ds.IpcFileFormat() if manifest['format'] == 'ipc' else ds.ParquetFileFormat()
+    return ds.dataset(os.path.join(path, name), format=file_format, partitioning=READ_PARTITIONING[name],
+                      filesystem=pafs.LocalFileSystem(use_mmap=True))
+
+
+def load(name='traffic', columns=None, filter=None, root=SNAPSHOT_DIR, snapshot=None):
+    """
+    스냅샷에서 필요한 컬럼만 읽기
+
+    Args:
+        columns (list): 읽을 컬럼 (None 이면 전체)
+        filter: pyarrow.dataset 조건식 (예: ds.field('institutionType') == '중앙행정기관').
+                파티션 컬럼(institutionType) 조건은 해당 디렉토리만 읽음
+
+    Returns:
+        pyarrow.Table
+    """
+    return open_dataset(name, root, snapshot).to_table(columns=columns, filter=filter)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='평가 결과 Parquet/Arrow 스냅샷')
+    parser.add_argument('--root', default=SNAPSHOT_DIR)
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    export = subparsers.add_parser('export', help='MongoDB 에서 새 스냅샷 생성')
+    export.add_argument('--format', choices=FORMATS, default='parquet')
+    export.add_argument('--keep', type=int, default=3, help='남겨둘 스냅샷 개수')
+    export.add_argument('--mongo-uri', default=Config.MONGO_URI)
+
+    subparsers.add_parser('info', help='가장 최근 스냅샷 정보')
+    args = parser.parse_args(argv)
+
+    if args.command == 'info':
+        print(json.dumps(read_manifest(args.root), ensure_ascii=False, indent=2))
+        print(open_dataset('traffic', args.root).schema)
+        return
+
+    client = MongoClient(args.mongo_uri)
+    try:
+        started = time.monotonic()
+        manifest = export_snapshot(client[Config.DB_NAME], args.root, args.format, args.keep)
+    finally:
+        client.close()
+    print(f"Saved snapshot {manifest['name']} ({manifest['rows']}) "
+          f"to {args.root} in {time.monotonic() - started:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,179 @@
+'''
+MongoDB 인덱스 관리
+
+앱이 자주 실행하는 조회(HOT_QUERIES)에 필요한 인덱스를 INDEXES 에 모아두고
+앱 시작 시(MongoDB.init_app) 한 번에 생성한다. 이미 있는 인덱스는 다시 만들지 않는다.
+(작업 큐, 리포트 보관소, 평가 작업처럼 CLI 로도 쓰는 모듈의 인덱스는 각 모듈의 ensure_indexes/init_app 에서 생성)
+
+check 는 HOT_QUERIES 를 explain 해서 인덱스 없이 전체를 읽는(COLLSCAN) 조회를 출력하고,
+프로파일러가 켜져 있으면(db.setProfilingLevel) system.profile 에 기록된 COLLSCAN 조회도 함께 출력한다.
+
+사용법 (ecoweb 디렉토리에서 실행):
+    python -m app.services.db_indexes ensure
+    python -m app.services.db_indexes check
+    python -m app.services.db_indexes dedupe    # URL 정규화 전에 중복 저장된 평가 정리 후 인덱스 생성
+'''
+import argparse
+from datetime import datetime
+
+from pymongo import MongoClient, IndexModel, ASCENDING, DESCENDING
+from pymongo.errors import OperationFailure
+
+from config import Config
+from app.services.audit_cache import merge_duplicate_audits
+
+INDEXES = {
+    'lighthouse_traffic': [
+        IndexModel([('url', ASCENDING)]),
+        # 평가 결과 upsert, 캐시 조회용 (app.services.audit_cache). URL 하나에 문서 하나
+        IndexModel([('canonical_url', ASCENDING)], unique=True, sparse=True),
+        # 통계 집계 파이프라인의 첫 $match 용 (app.services.category_total_co2, rank_esg)
+        # total 항목이 없는(평가 실패) 문서만 걸러지고 $unwind 뒤의 $sort 는 인덱스를 쓰지 못함
+        IndexModel([('resource_summary.resourceType', ASCENDING), ('institutionType', ASCENDING)]),
+        # 변경된 문서만 읽는 통계 갱신용 (app.services.statistics_materializer)
+        IndexModel([('updated_at', ASCENDING)]),
+    ],
+    'lighthouse_resource': [
+        IndexModel([('url', ASCENDING)]),
+        IndexModel([('canonical_url', ASCENDING)], unique=True, sparse=True),
+        # /api/badge 백분위 인덱스 갱신용 (app.services.badge_index)
+        IndexModel([('audited_at', ASCENDING)]),
+    ],
+    # 지우거나 url 을 바꾼 traffic 문서 기록 (app.services.statistics_materializer)
+    'lighthouse_traffic_removed': [
+        IndexModel([('url', ASCENDING)], unique=True),
+        IndexModel([('removed_at', ASCENDING)]),
+    ],
+    'users': [
+        IndexModel([('username', ASCENDING)], unique=True),
+    ],
+}
+
+# (컬렉션, filter, projection, sort) - check 에서 explain 할 조회 형태 (값은 임의)
+HOT_QUERIES = [
+    ('lighthouse_resource', {'url': 'https://example.go.kr'}, {'network_requests': 1, '_id': 0}, None),
+    ('lighthouse_resource', {'url': {'$in': ['https://example.go.kr']}, 'total_byte_weight': {'$type': 'number'}},
+     {'url': 1, 'total_byte_weight': 1, 'audited_at': 1, '_id': 0}, None),
+    ('lighthouse_resource', {'audited_at': {'$gte': datetime(2000, 1, 1)}, 'total_byte_weight': {'$type': 'number'}},
+     {'url': 1, 'total_byte_weight': 1, 'audited_at': 1, '_id': 0}, None),
+    ('lighthouse_traffic', {'url': 'https://example.go.kr'}, {'institution_type': 1, '_id': 0}, None),
+    ('lighthouse_traffic', {'canonical_url': 'https://example.go.kr', 'audited_at': {'$gte': datetime(2000, 1, 1)},
+                            'view_data': {'$exists': True}},
+     {'view_data': 1, '_id': 0}, [('audited_at', -1)]),
+    ('lighthouse_traffic', {'resource_summary.resourceType': 'total', 'institutionType': {'$type': 'string'}},
+     {'institutionType': 1, 'resource_summary': 1, '_id': 0}, None),
+    ('lighthouse_traffic', {'updated_at': {'$gte': datetime(2000, 1, 1)}},
+     {'url': 1, 'resource_summary': 1, 'updated_at': 1, 'institutionType': 1, '_id': 0}, None),
+    ('users', {'username': 'admin'}, None, None),
+    ('audit_jobs', {'status': 'queued', 'created_at': {'$lt': datetime(2000, 1, 1)}}, {'_id': 1}, None),
+    ('lighthouse_reports', {'url': 'https://example.go.kr'}, {'sha256': 1, 'archived_at': 1},
+     [('archived_at', -1)]),
+]
+
+
+def ensure_indexes(db):
+    """
+    INDEXES 에 정의된 인덱스 생성
+
+    username, canonical_url 이 중복된 기존 문서가 있으면 unique 인덱스를 만들 수 없으므로 경고만 출력하고 계속 진행한다.
+    (canonical_url 중복은 dedupe 명령으로 정리)
+    """
+    for collection_name, indexes in INDEXES.items():
+        for index in indexes:
+            # 하나가 실패해도 나머지 인덱스는 생성되도록 하나씩 생성
+            try:
+                db[collection_name].create_indexes([index])
+            except OperationFailure as e:
+                print(f"Warning: could not create index {index.document['name']} on {collection_name}: {str(e)}")
+                if collection_name == 'users':
+                    duplicates = db.users.aggregate([
+                        {'$group': {'_id': '$username', 'count': {'$sum': 1}}},
+                        {'$match': {'count': {'$gt': 1}}},
+                    ])
+                    print(f"Duplicated usernames: {[row['_id'] for row in duplicates]}")
+                elif 'canonical_url' in index.document['key']:
+                    print("Run 'python -m app.services.db_indexes dedupe' to merge duplicated audits")
+
+
+def _plan_stages(plan):
+    """winningPlan 트리의 stage 이름 목록"""
+    stages = [plan.get('stage')]
+    for key in ('inputStage', 'queryPlan'):
+        if key in plan:
+            stages += _plan_stages(plan[key])
+    for child in plan.get('inputStages', []):
+        stages += _plan_stages(child)
+    return stages
+
+
+def find_unindexed_queries(db, queries=HOT_QUERIES):
+    """
+    explain 결과 COLLSCAN 이 있는 조회 목록
+
+    Returns:
+        list: (컬렉션, filter, stage 목록)
+    """
+    unindexed = []
+    for collection_name, query, projection, sort in queries:
+        cursor = db[collection_name].find(query, projection)
+        if sort:
+            cursor = cursor.sort(sort)
+        stages = _plan_stages(cursor.explain()['queryPlanner']['winningPlan'])
+        if 'COLLSCAN' in stages:
+            unindexed.append((collection_name, query, stages))
+    return unindexed
+
+
+def find_profiled_collscans(db, limit=50):
+    """프로파일러(system.profile)에 기록된 COLLSCAN 조회 (컬렉션, filter 형태별로 한 번씩)"""
+    seen = set()
+    result = []
+    for entry in db['system.profile'].find({'planSummary': 'COLLSCAN'}, {'ns': 1, 'command': 1}) \
+                                       .sort('ts', DESCENDING).limit(limit * 10):
+        command = entry.get('command', {})
+        shape = (entry.get('ns'), tuple(sorted((command.get('filter') or command.get('q') or {}).keys())))
+        if shape not in seen:
+            seen.add(shape)
+            result.append(shape)
+        if len(result) >= limit:
+            break
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='MongoDB 인덱스 생성 및 점검')
+    parser.add_argument('command', choices=['ensure', 'check', 'dedupe'])
+    parser.add_argument('--mongo-uri', default=Config.MONGO_URI)
+    args = parser.parse_args(argv)
+
+    client = MongoClient(args.mongo_uri)
+    try:
+        db = client[Config.DB_NAME]
+        if args.command == 'dedupe':
+            for collection_name in ('lighthouse_traffic', 'lighthouse_resource'):
+                # traffic 은 지우거나 url 을 바꾼 기록을 남겨서 statistics_materializer 가 이전 집계를 빼도록 함
+                collection_removed = db['lighthouse_traffic_removed'] if collection_name == 'lighthouse_traffic' else None
+                removed = merge_duplicate_audits(db[collection_name], collection_removed)
+                print(f"{collection_name}: removed {removed} duplicated documents")
+            ensure_indexes(db)
+            return
+        if args.command == 'ensure':
+            ensure_indexes(db)
+            for collection_name in INDEXES:
+                print(f"{collection_name}: {sorted(db[collection_name].index_information())}")
+            return
+
+        unindexed = find_unindexed_queries(db)
+        for collection_name, query, stages in unindexed:
+            print(f"COLLSCAN {collection_name} {query} ({' <- '.join(filter(None, stages))})")
+        profiled = find_profiled_collscans(db)
+        for namespace, fields in profiled:
+            print(f"COLLSCAN (profiler) {namespace} filter fields {list(fields)}")
+        if not unindexed and not profiled:
+            print("All hot queries use an index")
+    finally:
+        client.close()
+
+
+if __name__ == '__main__':
+    main()
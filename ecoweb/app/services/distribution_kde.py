@@ -0,0 +1,222 @@
+'''
+페이지 크기 분포 KDE (distribution_data.json 생성)
+
+kde_chart.js 가 그리는 공공기관 페이지 크기(MB) 분포 곡선을 계산한다.
+점마다 모든 사이트의 커널을 더하면 O(사이트 수 x 점 수) 이므로
+값을 등간격 격자에 선형 binning 한 뒤 가우시안 커널과 FFT 로 convolution 한다. (O(사이트 수 + 격자 log 격자))
+bandwidth 는 Silverman 규칙 (0.9 * min(표준편차, IQR / 1.34) * n^(-1/5)) 으로 자동 선택한다.
+
+distribution_data.json 형식은 기존과 같고(kde_points, stats) 기관 유형별 곡선(by_institution)이 추가된다.
+웹에서 쓰는 static/statistics/distribution_data.json 은 statistics_materializer 가 히스토그램으로 주기적으로 갱신하고,
+이 CLI 는 원래 값으로 같은 내용을 계산해서 --output 에 저장한다. (히스토그램 근사 확인, 분석용)
+값은 가장 최근 스냅샷(app.services.corpus_snapshot)에서 필요한 컬럼만 읽는다. (--from-mongo 이면 MongoDB 에서 조회)
+
+사용법 (ecoweb 디렉토리에서 실행):
+    python -m app.services.distribution_kde --output /tmp/distribution_data.json
+    python -m app.services.distribution_kde --from-mongo --output /tmp/distribution_data.json
+'''
+import argparse
+import json
+import math
+import os
+import time
+
+import numpy as np
+from pymongo import MongoClient
+
+from config import Config
+from app.services.corpus_snapshot import load
+
+# 출력 곡선 (0 ~ 20MB, 100개 점) 과 평균 비교 기준 (한국 평균 4.7MB)
+KDE_MAX_MB = 20
+KDE_POINTS = 100
+AVERAGE_MB = 4.7
+# binning 격자: 최소 점 수, bandwidth 당 격자 수, 최대 점 수
+MIN_GRID = 1024
+GRID_PER_BANDWIDTH = 8
+MAX_GRID = 2 ** 18
+# 커널은 bandwidth 의 이 배수까지만 계산 (그 밖은 0 으로 봄)
+KERNEL_CUTOFF = 5
+
+
+def silverman_bandwidth(std, iqr, count):
+    """Silverman 규칙 bandwidth. IQR 이 0 이면(값이 한쪽에 몰림) 표준편차만 사용"""
+    spread = min(std, iqr / 1.34) if iqr > 0 else std
+    if count < 2 or spread <= 0:
+        return 0.0
+    return 0.9 * spread * count ** (-1 / 5)
+
+
+def linear_binning(values, start, step, size):
+    """값을 양쪽 격자점에 거리에 반비례하게 나눠서 더함 (격자 밖의 값은 버림)"""
+    position = (np.asarray(values, dtype=np.float64) - start) / step
+    left = np.floor(position).astype(np.int64)
+    weight_right = position - left
+    counts = np.zeros(size)
+    for index, weight in ((left, 1 - weight_right), (left + 1, weight_right)):
+        inside = (index >= 0) & (index < size)
+        counts += np.bincount(index[inside], weights=weight[inside], minlength=size)
+    return counts
+
+
+def kde_from_bins(counts, step, bandwidth, total=None):
+    """
+    격자별 개수에 가우시안 커널을 FFT 로 convolution 한 밀도 (격자점마다 값)
+
+    Args:
+        total: 정규화에 쓸 전체 개수 (격자 밖에 있는 값까지 포함하려면 지정, 기본은 counts 합)
+    """
+    counts = np.asarray(counts, dtype=np.float64)
+    total = counts.sum() if total is None else total
+    if not total:
+        return np.zeros(len(counts))
+    if bandwidth <= 0:
+        return counts / (total * step)
+
+    reach = min(int(math.ceil(KERNEL_CUTOFF * bandwidth / step)), len(counts))
+    offsets = np.arange(-reach, reach + 1) * step
+    kernel = np.exp(-0.5 * (offsets / bandwidth) ** 2) / (bandwidth * math.sqrt(2 * math.pi))
+    size = 1 << int(len(counts) + len(kernel) - 1).bit_length()
+    density = np.fft.irfft(np.fft.rfft(counts, size) * np.fft.rfft(kernel, size), size)
+    # 커널 중심이 reach 번째라서 결과를 그만큼 밀어서 자름. FFT 오차로 생긴 음수는 0
+    return np.maximum(density[reach:reach + len(counts)], 0) / total
+
+
+def kde(values, x, bandwidth=None):
+    """
+    values 의 KDE 를 x 위치에서 계산
+
+    Returns:
+        tuple: (밀도 배열, 사용한 bandwidth)
+    """
+    values = np.asarray(values, dtype=np.float64)
+    values = values[np.isfinite(values)]
+    if not len(values):
+        return np.zeros(len(x)), 0.0
+    if bandwidth is None:
+        q1, q3 = np.percentile(values, [25, 75])
+        bandwidth = silverman_bandwidth(values.std(ddof=1) if len(values) > 1 else 0.0, q3 - q1, len(values))
+
+    # 출력 범위 바깥 값도 커널 꼬리가 범위 안에 영향을 주므로 커널 폭만큼 넓혀서 binning
+    margin = KERNEL_CUTOFF * bandwidth
+    start = min(float(np.min(x)), float(values.min())) - margin
+    end = max(float(np.max(x)), float(values.max())) + margin
+    step = (end - start) / (MIN_GRID - 1)
+    if bandwidth > 0:
+        step = min(step, bandwidth / GRID_PER_BANDWIDTH)
+    size = min(int(math.ceil((end - start) / step)) + 1, MAX_GRID)
+    step = (end - start) / (size - 1)
+
+    counts = linear_binning(values, start, step, size)
+    density = kde_from_bins(counts, step, bandwidth, total=len(values))
+    grid = start + np.arange(size) * step
+    return np.interp(x, grid, density), float(bandwidth)
+
+
+def summary_stats(values_mb):
+    """distribution_data.json 의 stats"""
+    count = len(values_mb)
+    over = int(np.count_nonzero(values_mb > AVERAGE_MB))
+    return {
+        'mean': float(values_mb.mean()),
+        'std': float(values_mb.std(ddof=1)) if count > 1 else 0.0,
+        'total_count': count,
+        'over_4_7mb': over,
+        'under_4_7mb': count - over,
+        'over_percentage': over / count * 100,
+        'under_percentage': (count - over) / count * 100,
+    }
+
+
+def _points(x, y):
+    return [{'x': float(px), 'y': float(py)} for px, py in zip(x, y)]
+
+
+def build_distribution(sizes_mb, institution_types=None):
+    """
+    distribution_data.json 내용
+
+    Args:
+        sizes_mb: 사이트별 페이지 크기(MB) 배열
+        institution_types: 사이트별 기관 유형 배열 (있으면 유형별 곡선 추가)
+    """
+    sizes_mb = np.asarray(sizes_mb, dtype=np.float64)
+    x = np.linspace(0, KDE_MAX_MB, KDE_POINTS)
+    y, bandwidth = kde(sizes_mb, x)
+    result = {'kde_points': _points(x, y), 'stats': {**summary_stats(sizes_mb), 'bandwidth': bandwidth}}
+
+    if institution_types is not None:
+        institution_types = np.asarray(institution_types, dtype=object)
+        by_institution = []
+        for institution_type in sorted({t for t in institution_types if t}):
+            group = sizes_mb[institution_types == institution_type]
+            group_y, group_bandwidth = kde(group, x)
+            by_institution.append({
+                'institutionType': institution_type,
+                'count': int(len(group)),
+                'mean': float(group.mean()),
+                'bandwidth': group_bandwidth,
+                'kde_points': _points(x, group_y),
+            })
+        result['by_institution'] = by_institution
+    return result
+
+
+def load_sizes_from_snapshot():
+    """가장 최근 스냅샷의 (페이지 크기 MB 배열, 기관 유형 배열)"""
+    table = load('traffic', columns=['institutionType', 'total_transfer_size'])
+    sizes = table.column('total_transfer_size').to_numpy(zero_copy_only=False).astype(np.float64)
+    types = np.array(table.column('institutionType').to_pylist(), dtype=object)
+    valid = np.isfinite(sizes)
+    return sizes[valid] / 1024 ** 2, types[valid]
+
+
+def load_sizes_from_mongo(collection):
+    """lighthouse_traffic 의 resource_summary total 전송량 (MB), 기관 유형"""
+    sizes, types = [], []
+    pipeline = [
+        {'$match': {'resource_summary.resourceType': 'total'}},
+        {'$project': {'_id': 0, 'institutionType': 1, 'resource_summary': 1}},
+        {'$unwind': '$resource_summary'},
+        {'$match': {'resource_summary.resourceType': 'total',
+                    'resource_summary.transferSize': {'$type': 'number'}}},
+        {'$project': {'institutionType': 1, 'transferSize': '$resource_summary.transferSize'}},
+    ]
+    for row in collection.aggregate(pipeline):
+        sizes.append(row['transferSize'])
+        types.append(row.get('institutionType'))
+    return np.array(sizes, dtype=np.float64) / 1024 ** 2, np.array(types, dtype=object)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='페이지 크기 분포 KDE (distribution_data.json) 생성')
+    parser.add_argument('--from-mongo', action='store_true', help='스냅샷 대신 MongoDB 에서 조회')
+    parser.add_argument('--output', required=True, help='저장할 json 경로 (static/statistics 는 statistics_materializer 가 갱신)')
+    parser.add_argument('--mongo-uri', default=Config.MONGO_URI)
+    args = parser.parse_args(argv)
+
+    started = time.monotonic()
+    if args.from_mongo:
+        client = MongoClient(args.mongo_uri)
+        try:
+            sizes_mb, types = load_sizes_from_mongo(client[Config.DB_NAME]['lighthouse_traffic'])
+        finally:
+            client.close()
+    else:
+        sizes_mb, types = load_sizes_from_snapshot()
+    if not len(sizes_mb):
+        print("No sites with transfer size")
+        return
+
+    distribution = build_distribution(sizes_mb, types)
+    temp_path = f'{args.output}.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as file:
+        json.dump(distribution, file, ensure_ascii=False, indent=2)
+    os.replace(temp_path, args.output)
+    print(f"{distribution['stats']['total_count']} sites, bandwidth {distribution['stats']['bandwidth']:.3f}MB, "
+          f"{len(distribution['by_institution'])} institution types. "
+          f"Saved to {args.output} in {time.monotonic() - started:.2f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,201 @@
+'''
+탄소 배출량 불확실성 구간 (몬테카를로)
+
+emissions_calculator 의 계수(세그먼트별 kWh/GB, 탄소집약도)는 출처마다 값이 달라 하나의 숫자로는 불확실성이 보이지 않는다.
+계수 묶음을 분포에서 n_samples 개 뽑아 numpy 배열 연산으로 한 번에 계산하고 p5/p50/p95 구간을 구한다.
+
+배출량은 data_gb 에 비례하므로 방문자/캐시/그린호스팅 비율이 모든 페이지에 같으면
+"GB 당 배출량" 표본의 백분위만 한 번 구해서 data_gb 를 곱하면 된다 (전체 사이트 일괄 계산도 표본 수와 무관).
+같은 설정의 백분위는 메모해두므로 요청마다 다시 뽑지 않는다.
+
+분포 형식 (tuple):
+    ('fixed', value)
+    ('uniform', low, high)
+    ('triangular', low, mode, high)
+    ('normal', mean, std)          # 0 미만은 0 으로 자름
+    ('lognormal', median, sigma)   # log 의 표준편차가 sigma
+
+사용 예:
+    emission_bands(0.00456)                                       # {'p5': ..., 'p50': ..., 'p95': ..., 'mean': ...}
+    emission_bands(weights_gb, return_visitor_ratio=0.25, data_cache_ratio=('uniform', 0.3, 0.7))
+    emission_bands(0.00456, distributions={'intensity': ('normal', 494, 50)})
+'''
+from functools import lru_cache
+
+import numpy as np
+
+from app.services.emissions_calculator import (
+    KOREA_AVERAGE_INTENSITY,
+    ELECTRICITY_DATA_CENTER_O,
+    ELECTRICITY_NETWORK_O,
+    ELECTRICITY_USER_DEVICE,
+    ELECTRICITY_EMBODIED,
+    ELECTRICITY_EMBODIED_NETWORK,
+    ELECTRICITY_EMBODIED_USER_DEVICE,
+)
+
+# 세그먼트 계수는 기준값의 ±40%, 탄소집약도는 연중 변동 폭 정도
+DEFAULT_DISTRIBUTIONS = {
+    'operation_datacenter': ('triangular', ELECTRICITY_DATA_CENTER_O * 0.6, ELECTRICITY_DATA_CENTER_O,
+                             ELECTRICITY_DATA_CENTER_O * 1.4),
+    'operation_network': ('triangular', ELECTRICITY_NETWORK_O * 0.6, ELECTRICITY_NETWORK_O,
+                          ELECTRICITY_NETWORK_O * 1.4),
+    'operation_user_device': ('triangular', ELECTRICITY_USER_DEVICE * 0.6, ELECTRICITY_USER_DEVICE,
+                              ELECTRICITY_USER_DEVICE * 1.4),
+    'embodied_datacenter': ('triangular', ELECTRICITY_EMBODIED * 0.6, ELECTRICITY_EMBODIED,
+                            ELECTRICITY_EMBODIED * 1.4),
+    'embodied_network': ('triangular', ELECTRICITY_EMBODIED_NETWORK * 0.6, ELECTRICITY_EMBODIED_NETWORK,
+                         ELECTRICITY_EMBODIED_NETWORK * 1.4),
+    'embodied_user_device': ('triangular', ELECTRICITY_EMBODIED_USER_DEVICE * 0.6, ELECTRICITY_EMBODIED_USER_DEVICE,
+                             ELECTRICITY_EMBODIED_USER_DEVICE * 1.4),
+    'intensity': ('normal', KOREA_AVERAGE_INTENSITY, 40),
+}
+PERCENTILES = (5, 50, 95)
+DEFAULT_SAMPLES = 10000
+# 같은 입력이면 같은 구간이 나오도록 기본 시드 고정 (None 이면 매번 다름)
+DEFAULT_SEED = 0
+# 페이지별 비율이 다를 때 (페이지 수 x 표본 수) 배열을 이만큼씩 나눠서 계산
+CHUNK_ELEMENTS = 4_000_000
+
+
+def sample(spec, n_samples, rng):
+    """분포(tuple) 또는 숫자에서 n_samples 개 추출"""
+    if np.isscalar(spec):
+        return np.full(n_samples, float(spec))
+    kind, *params = spec
+    if kind == 'fixed':
+        return np.full(n_samples, float(params[0]))
+    if kind == 'uniform':
+        return rng.uniform(params[0], params[1], n_samples)
+    if kind == 'triangular':
+        low, mode, high = params
+        if low == high:
+            return np.full(n_samples, float(mode))
+        return rng.triangular(low, mode, high, n_samples)
+    if kind == 'normal':
+        return np.maximum(rng.normal(params[0], params[1], n_samples), 0.0)
+    if kind == 'lognormal':
+        return rng.lognormal(np.log(params[0]), params[1], n_samples)
+    raise ValueError(f"Unknown distribution: {spec}")
+
+
+def sample_coefficients(n_samples=DEFAULT_SAMPLES, distributions=None, seed=DEFAULT_SEED):
+    """
+    계수 묶음 n_samples 개 추출
+
+    Args:
+        distributions (dict): DEFAULT_DISTRIBUTIONS 중 바꿀 항목만 (이름 -> 분포 또는 숫자)
+
+    Returns:
+        dict: 이름 -> (n_samples,) 배열
+    """
+    specs = {**DEFAULT_DISTRIBUTIONS, **(distributions or {})}
+    unknown = set(specs) - set(DEFAULT_DISTRIBUTIONS)
+    if unknown:
+        raise ValueError(f"Unknown coefficients: {sorted(unknown)}")
+    rng = np.random.default_rng(seed)
+    # 항목 순서를 고정해야 같은 시드에서 같은 표본이 나옴
+    return {name: sample(specs[name], n_samples, rng) for name in DEFAULT_DISTRIBUTIONS}
+
+
+def emission_per_gb(coefficients, new_visitor_ratio=1.0, return_visitor_ratio=0.0,
+                    data_cache_ratio=0.0, green_host_factor=0.0):
+    """
+    계수 표본별 GB 당 배출량 (gCO2e/GB). estimate_emissions 와 같은 식
+
+    비율 인자는 표본 배열과 broadcast 된다. (페이지별 비율은 (페이지 수, 1) 모양으로 넘기면 (페이지 수, 표본 수))
+    """
+    kwh_per_gb = (coefficients['operation_datacenter'] * (1 - green_host_factor)
+                  + coefficients['operation_network'] + coefficients['operation_user_device']
+                  + coefficients['embodied_datacenter'] + coefficients['embodied_network']
+                  + coefficients['embodied_user_device'])
+    visitor_factor = new_visitor_ratio + return_visitor_ratio * (1 - data_cache_ratio)
+    return kwh_per_gb * coefficients['intensity'] * visitor_factor
+
+
+def _freeze(value):
+    """메모 키로 쓰도록 dict 는 정렬된 tuple 로"""
+    if isinstance(value, dict):
+        return tuple(sorted(value.items()))
+    return value
+
+
+@lru_cache(maxsize=256)
+def _per_gb_quantiles(n_samples, distributions, seed, percentiles, ratios):
+    """비율이 페이지마다 같을 때 GB 당 배출량의 (백분위..., 평균)"""
+    coefficients = sample_coefficients(n_samples, dict(distributions or ()), seed)
+    rng = np.random.default_rng(None if seed is None else seed + 1)
+    # 분포로 주어진 비율도 계수와 같은 표본 축으로 추출
+    new_ratio, return_ratio, cache_ratio, green_factor = (sample(spec, n_samples, rng) for spec in ratios)
+    per_gb = emission_per_gb(coefficients, new_ratio, return_ratio, cache_ratio, green_factor)
+    quantiles = np.percentile(per_gb, percentiles)
+    return tuple(float(q) for q in quantiles) + (float(per_gb.mean()),)
+
+
+def _band_keys(percentiles):
+    return [f'p{p:g}' for p in percentiles] + ['mean']
+
+
+def emission_bands(
+    data_gb,
+    new_visitor_ratio=1.0,
+    return_visitor_ratio=0.0,
+    data_cache_ratio=0.0,
+    green_host_factor=0.0,
+    distributions=None,
+    n_samples=DEFAULT_SAMPLES,
+    seed=DEFAULT_SEED,
+    percentiles=PERCENTILES,
+    ):
+    """
+    페이지 배출량(gCO2e)의 불확실성 구간
+
+    data_gb 는 스칼라 또는 배열. 비율 인자는 숫자, 분포(tuple), 또는 페이지별 배열(data_gb 와 같은 길이).
+
+    Returns:
+        dict: 'p5', 'p50', 'p95', 'mean' -> data_gb 와 같은 모양 (스칼라 입력이면 float)
+    """
+    data_gb = np.asarray(data_gb, dtype=np.float64)
+    percentiles = tuple(percentiles)
+    ratios = (new_visitor_ratio, return_visitor_ratio, data_cache_ratio, green_host_factor)
+    keys = _band_keys(percentiles)
+
+    if all(np.isscalar(r) or isinstance(r, tuple) for r in ratios):
+        # 시드가 없으면 매번 새로 뽑아야 하므로 메모를 쓰지 않음
+        quantiles = _per_gb_quantiles if seed is not None else _per_gb_quantiles.__wrapped__
+        per_gb = quantiles(n_samples, _freeze(distributions), seed, percentiles, ratios)
+        bands = {key: data_gb * value for key, value in zip(keys, per_gb)}
+    else:
+        bands = _per_page_bands(data_gb, ratios, distributions, n_samples, seed, percentiles)
+
+    if data_gb.ndim == 0:
+        return {key: float(value) for key, value in bands.items()}
+    return bands
+
+
+def _per_page_bands(data_gb, ratios, distributions, n_samples, seed, percentiles):
+    """페이지별 비율이 다를 때: (페이지, 표본) 배열을 나눠서 계산. 계수 표본은 모든 페이지가 공유"""
+    data_gb = np.atleast_1d(data_gb)
+    coefficients = sample_coefficients(n_samples, distributions, seed)
+    rng = np.random.default_rng(None if seed is None else seed + 1)
+    columns = []
+    for spec in ratios:
+        if np.isscalar(spec) or isinstance(spec, tuple):
+            columns.append(sample(spec, n_samples, rng))
+        else:
+            column = np.broadcast_to(np.asarray(spec, dtype=np.float64), data_gb.shape)
+            columns.append(column[:, np.newaxis])
+
+    keys = _band_keys(percentiles)
+    bands = {key: np.empty(data_gb.shape) for key in keys}
+    chunk = max(1, CHUNK_ELEMENTS // n_samples)
+    for start in range(0, len(data_gb), chunk):
+        part = slice(start, start + chunk)
+        new_ratio, return_ratio, cache_ratio, green_factor = (
+            column[part] if column.ndim == 2 else column for column in columns)
+        emissions = data_gb[part, np.newaxis] * emission_per_gb(
+            coefficients, new_ratio, return_ratio, cache_ratio, green_factor)
+        for key, values in zip(keys, np.percentile(emissions, percentiles, axis=1)):
+            bands[key][part] = values
+        bands['mean'][part] = emissions.mean(axis=1)
+    return bands
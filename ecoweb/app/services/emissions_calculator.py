@@ -1,3 +1,5 @@
+import numpy as np
+
 # 추가로 알아야하는 정보 
 # 1) 호스팅 제공업체를 알아야함.(green hosting)
 # 2) 실제 트래픽: 웹 서버 로그를 통해 (재방문자까지), CDN 통계, 분석 도구를 통해
@@ -47,28 +49,64 @@ def calculate_embodied_emissions(data_transmission_traffic):
     embodied_emissions = embodied_o + network_o + user_device_o
     return embodied_o, network_o, user_device_o
 
-def estimate_emission_per_page(
+def estimate_emissions(
     data_gb,
     new_visitor_ratio=1.0,
     return_visitor_ratio=0.0,
     data_cache_ratio=0.0,
     green_host_factor=0.0,
+    intensity=KOREA_AVERAGE_INTENSITY,
     ):
+    """
+    여러 페이지의 배출량을 한 번에 계산 (numpy 배열 연산)
+
+    각 인자는 스칼라 또는 같은 길이의 배열이며 서로 broadcast 된다.
+    (예: 전체 사이트의 data_gb 배열 + 공통 방문자 비율)
+    intensity 는 탄소집약도(gCO2e/kWh). 시간대별 값은 app.services.grid_intensity 참고
+
+    Returns:
+        dict: 세그먼트별 배출량 배열 (gCO2e)
+            operation_datacenter, operation_network, operation_user_device,
+            embodied_datacenter, embodied_network, embodied_user_device, total
+    """
+    data_gb = np.asarray(data_gb, dtype=np.float64)
+
     # 1) 운영 배출
     op_dc, op_net, op_ud = calculate_operation_emissions(data_gb)
     # 2) 내재 배출
     em_dc, em_net, em_ud = calculate_embodied_emissions(data_gb)
-    
-    # 데이터 센터 운영 배출에서 그린호스팅 비율 적용
-    op_dc_adjusted = adjust_for_green_hosting(op_dc, green_host_factor)
 
-     # 모든 세그먼트의 합 (운영+내재)
-    total_segment_emission = (op_dc_adjusted + em_dc) + (op_net + em_net) + (op_ud + em_ud)
+    # 데이터 센터 운영 배출에서 그린호스팅 비율 적용
+    op_dc = adjust_for_green_hosting(op_dc, np.asarray(green_host_factor, dtype=np.float64))
 
-    # 신방문자 부분
-    new_visitor_emission = total_segment_emission * new_visitor_ratio
+    # 신방문자 + 재방문자 (캐시를 통해 일부 전송량이 줄어든다고 가정) 비율을 모든 세그먼트에 적용
+    visitor_factor = (np.asarray(new_visitor_ratio, dtype=np.float64)
+                      + np.asarray(return_visitor_ratio, dtype=np.float64)
+                      * (1 - np.asarray(data_cache_ratio, dtype=np.float64)))
+    # 세그먼트 계산은 KOREA_AVERAGE_INTENSITY 기준이므로 비율만큼 보정 (기본값이면 1)
+    visitor_factor = visitor_factor * (np.asarray(intensity, dtype=np.float64) / KOREA_AVERAGE_INTENSITY)
 
-    # 재방문자 부분 (캐시를 통해 일부 전송량이 줄어든다고 가정)
-    return_visitor_emission = total_segment_emission * return_visitor_ratio * (1 - data_cache_ratio)
+    segments = {
+        'operation_datacenter': op_dc * visitor_factor,
+        'operation_network': op_net * visitor_factor,
+        'operation_user_device': op_ud * visitor_factor,
+        'embodied_datacenter': em_dc * visitor_factor,
+        'embodied_network': em_net * visitor_factor,
+        'embodied_user_device': em_ud * visitor_factor,
+    }
+    # 모든 세그먼트의 합 (운영+내재)
+    segments['total'] = ((segments['operation_datacenter'] + segments['embodied_datacenter'])
+                         + (segments['operation_network'] + segments['embodied_network'])
+                         + (segments['operation_user_device'] + segments['embodied_user_device']))
+    return segments
 
-    return new_visitor_emission + return_visitor_emission
+def estimate_emission_per_page(
+    data_gb,
+    new_visitor_ratio=1.0,
+    return_visitor_ratio=0.0,
+    data_cache_ratio=0.0,
+    green_host_factor=0.0,
+    ):
+    """페이지 하나의 배출량 (gCO2e). estimate_emissions 와 같은 계산"""
+    return float(estimate_emissions(data_gb, new_visitor_ratio, return_visitor_ratio,
+                                    data_cache_ratio, green_host_factor)['total'])
@@ -0,0 +1,324 @@
+'''
+Chrome 없이 HTTP 요청만으로 페이지 용량 추정 (1차 선별용)
+
+첫 페이지 HTML 을 받아 html.parser 로 CSS/JS/이미지/폰트 등 리소스 링크를 찾고
+(CSS 안의 url() 로 참조하는 폰트/이미지도 포함) 리소스마다 HEAD(Content-Length) 또는 GET 으로
+전송 크기를 구해 view_data 와 같은 키로 합산한다.
+결과는 grade_point(total_byte_weight / 1024), estimate_emission_per_page(total_byte_weight / 1024 ** 3) 에 그대로 사용 가능.
+
+JavaScript 로 나중에 불러오는 리소스는 알 수 없으므로 Lighthouse 보다 작게 나올 수 있고,
+미사용 CSS/JS 등 절감 가능 용량(can_optimize_* 등)은 0 으로 채운다.
+전체 사이트를 빠르게 선별한 뒤 등급이 나쁜 사이트만 Lighthouse 로 정밀 평가하는 용도.
+
+사용법 (ecoweb 디렉토리에서 실행):
+    python -m app.services.fast_estimate --url https://www.example.go.kr
+    python -m app.services.fast_estimate --workers 32 --output triage.csv --flagged flagged_sites.json --flag-grade D
+    python -m app.services.batch_audit --input flagged_sites.json
+'''
+import argparse
+import csv
+import json
+import re
+import zlib
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from html.parser import HTMLParser
+from urllib.parse import urljoin, urlsplit
+
+import requests
+
+from app.services.batch_audit import DEFAULT_INPUT_PATH, load_sites
+from app.services.emissions_calculator import estimate_emission_per_page
+from app.utils.grade import GRADES, grade_point
+
+USER_AGENT = ('Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 '
+              '(KHTML, like Gecko) Chrome/120.0 Safari/537.36')
+# brotli 는 기본 설치가 아니므로 gzip/deflate 만 요청 (전송 크기는 압축된 크기 기준)
+ACCEPT_ENCODING = 'gzip, deflate'
+CHUNK_SIZE = 64 * 1024
+MAX_RESOURCES = 200
+
+CSS_URL_PATTERN = re.compile(r'url\(\s*[\'"]?([^\'")]+)[\'"]?\s*\)', re.IGNORECASE)
+CSS_IMPORT_PATTERN = re.compile(r'@import\s+[\'"]([^\'"]+)[\'"]', re.IGNORECASE)
+
+# view_data 의 resource-summary 계열 키
+RESOURCE_KEYS = {
+    'font': 'font_total_bytes',
+    'script': 'script_total_bytes',
+    'document': 'html_total_bytes',
+    'stylesheet': 'css_total_bytes',
+    'other': 'other_total_bytes',
+    'media': 'media_total_bytes',
+}
+
+
+class ResourceLinkParser(HTMLParser):
+    """HTML 에서 (리소스 URL, 종류) 목록 추출"""
+
+    def __init__(self, base_url):
+        super().__init__(convert_charrefs=True)
+        self.base_url = base_url
+        self.resources = []
+        self.inline_styles = []
+        self._in_style = False
+
+    def _add(self, url, resource_type):
+        if url and not url.startswith(('data:', 'javascript:', 'about:', '#')):
+            self.resources.append((urljoin(self.base_url, url.strip()), resource_type))
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == 'base' and attrs.get('href'):
+            self.base_url = urljoin(self.base_url, attrs['href'])
+        elif tag == 'link':
+            rel = (attrs.get('rel') or '').lower()
+            if 'stylesheet' in rel:
+                self._add(attrs.get('href'), 'stylesheet')
+            elif 'preload' in rel or 'icon' in rel:
+                kind = (attrs.get('as') or '').lower()
+                self._add(attrs.get('href'), {'style': 'stylesheet', 'script': 'script', 'font': 'font',
+                                              'image': 'media'}.get(kind, 'media' if 'icon' in rel else 'other'))
+        elif tag == 'script':
+            self._add(attrs.get('src'), 'script')
+        elif tag in ('img', 'source', 'video', 'audio', 'input'):
+            if tag == 'input' and (attrs.get('type') or '').lower() != 'image':
+                return
+            self._add(attrs.get('src') or _first_srcset(attrs.get('srcset')), 'media')
+            self._add(attrs.get('poster'), 'media')
+        elif tag in ('iframe', 'embed', 'object'):
+            self._add(attrs.get('src') or attrs.get('data'), 'other')
+        elif tag == 'style':
+            self._in_style = True
+        if attrs.get('style'):
+            self.inline_styles.append(attrs['style'])
+
+    def handle_endtag(self, tag):
+        if tag == 'style':
+            self._in_style = False
+
+    def handle_data(self, data):
+        if self._in_style:
+            self.inline_styles.append(data)
+
+
+def _first_srcset(srcset):
+    """srcset 의 첫 번째 후보 URL (브라우저는 하나만 받음)"""
+    if not srcset:
+        return None
+    return srcset.split(',')[0].strip().split(' ')[0]
+
+
+def _css_resources(css_text, base_url):
+    """CSS 의 url(), @import 로 참조하는 리소스"""
+    resources = [(urljoin(base_url, url), 'stylesheet') for url in CSS_IMPORT_PATTERN.findall(css_text)]
+    for url in CSS_URL_PATTERN.findall(css_text):
+        if url.startswith('data:'):
+            continue
+        path = urlsplit(url).path.lower()
+        resource_type = 'font' if path.endswith(('.woff', '.woff2', '.ttf', '.otf', '.eot')) else 'media'
+        resources.append((urljoin(base_url, url), resource_type))
+    return resources
+
+
+def _decode_body(raw, content_encoding):
+    encoding = (content_encoding or '').lower()
+    if 'gzip' in encoding or 'deflate' in encoding:
+        try:
+            return zlib.decompress(raw, 47)    # gzip / zlib 헤더 자동 인식
+        except zlib.error:
+            return zlib.decompress(raw, -15)   # 헤더 없는 deflate
+    return raw
+
+
+def _site_host(host):
+    return host[4:] if host.startswith('www.') else host
+
+
+def is_third_party(resource_url, page_url):
+    """페이지와 다른 사이트(하위 도메인 제외)의 리소스인지"""
+    page_host = _site_host(urlsplit(page_url).hostname or '')
+    host = _site_host(urlsplit(resource_url).hostname or '')
+    return not (host == page_host or host.endswith('.' + page_host) or page_host.endswith('.' + host))
+
+
+def fetch_transfer(session, url, timeout=10, want_body=False):
+    """
+    리소스 하나의 전송 크기(압축된 크기) 조회
+
+    본문이 필요 없으면 HEAD 의 Content-Length 를 먼저 사용하고, 없으면 GET 으로 받으면서 크기를 센다.
+
+    Returns:
+        tuple: (전송 크기, 압축 해제한 본문 또는 None, 최종 URL)
+    """
+    headers = {'User-Agent': USER_AGENT, 'Accept-Encoding': ACCEPT_ENCODING}
+    if not want_body:
+        response = session.head(url, headers=headers, timeout=timeout, allow_redirects=True)
+        length = response.headers.get('Content-Length')
+        if response.ok and length and length.isdigit() and int(length) > 0:
+            return int(length), None, response.url
+
+    with session.get(url, headers=headers, timeout=timeout, stream=True, allow_redirects=True) as response:
+        response.raise_for_status()
+        chunks = []
+        size = 0
+        for chunk in response.raw.stream(CHUNK_SIZE, decode_content=False):
+            size += len(chunk)
+            if want_body:
+                chunks.append(chunk)
+        body = _decode_body(b''.join(chunks), response.headers.get('Content-Encoding')) if want_body else None
+        return size, body, response.url
+
+
+def estimate_view_data(url, session=None, workers=8, timeout=10, max_resources=MAX_RESOURCES):
+    """
+    HTTP 요청만으로 view_data 와 같은 키의 용량 추정값 생성
+
+    Raises:
+        requests.RequestException: 첫 페이지를 받지 못한 경우
+    """
+    session = session or requests.Session()
+    view_data = {
+        'total_byte_weight': 0,
+        'third_party_summary_wasted_bytes': 0,
+        'total_unused_bytes_script': 0,
+        'total_resource_bytes_script': 0,
+        'can_optimize_css_bytes': 0,
+        'can_optimize_js_bytes': 0,
+        'modern_image_formats_bytes': 0,
+        'efficient_animated_content': 0,
+        'duplicated_javascript': 0,
+        **{key: 0 for key in RESOURCE_KEYS.values()},
+        'third_party_total_bytes': 0,
+    }
+
+    html_size, html, page_url = fetch_transfer(session, url, timeout=timeout, want_body=True)
+    view_data['html_total_bytes'] = html_size
+
+    parser = ResourceLinkParser(page_url)
+    parser.feed(html.decode('utf-8', errors='replace'))
+    resources = list(parser.resources)
+    for style in parser.inline_styles:
+        resources += _css_resources(style, parser.base_url)
+
+    seen = {page_url}
+    sizes = []
+
+    def measure(resource_url, resource_type):
+        want_body = resource_type == 'stylesheet'
+        size, body, final_url = fetch_transfer(session, resource_url, timeout=timeout, want_body=want_body)
+        nested = _css_resources(body.decode('utf-8', errors='replace'), final_url) if body else []
+        return resource_url, resource_type, size, nested
+
+    # CSS 가 참조하는 폰트/이미지까지 한 단계 더 따라감
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = set()
+        for resource_url, resource_type in resources:
+            if resource_url not in seen and resource_url.startswith('http') and len(seen) <= max_resources:
+                seen.add(resource_url)
+                pending.add(executor.submit(measure, resource_url, resource_type))
+        while pending:
+            future = next(as_completed(pending))
+            pending.remove(future)
+            try:
+                resource_url, resource_type, size, nested = future.result()
+            except Exception:
+                continue
+            sizes.append((resource_url, resource_type, size))
+            for nested_url, nested_type in nested:
+                if nested_url not in seen and nested_url.startswith('http') and len(seen) <= max_resources:
+                    seen.add(nested_url)
+                    pending.add(executor.submit(measure, nested_url, nested_type))
+
+    for resource_url, resource_type, size in sizes:
+        view_data[RESOURCE_KEYS[resource_type]] += size
+        if is_third_party(resource_url, page_url):
+            view_data['third_party_total_bytes'] += size
+    view_data['total_resource_bytes_script'] = view_data['script_total_bytes']
+    view_data['total_byte_weight'] = sum(view_data[key] for key in RESOURCE_KEYS.values())
+    return view_data
+
+
+def triage(sites, workers=16, resource_workers=8, timeout=10):
+    """
+    사이트 목록 전체를 빠르게 추정
+
+    Returns:
+        list: 사이트별 {site, view_data, grade, carbon_emission, error}
+    """
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=workers, pool_maxsize=workers * resource_workers)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+
+    def estimate(site):
+        try:
+            view_data = estimate_view_data(site['siteLink'], session, workers=resource_workers, timeout=timeout)
+        except Exception as e:
+            return {'site': site, 'view_data': None, 'grade': None, 'carbon_emission': None, 'error': str(e)[:200]}
+        total_bytes = view_data['total_byte_weight']
+        return {
+            'site': site,
+            'view_data': view_data,
+            'grade': grade_point(total_bytes / 1024),
+            'carbon_emission': round(estimate_emission_per_page(total_bytes / 1024 ** 3), 2),
+            'error': None,
+        }
+
+    results = []
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(estimate, site) for site in sites]
+        for index, future in enumerate(as_completed(futures), 1):
+            results.append(future.result())
+            if index % 100 == 0:
+                print(f"[{index}/{len(sites)}] estimated")
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='HTTP 요청만으로 페이지 용량을 추정해 정밀 평가 대상 선별')
+    parser.add_argument('--url', default=None, help='URL 하나만 추정해서 출력')
+    parser.add_argument('--input', default=DEFAULT_INPUT_PATH, help='사이트 목록 (csv 또는 json)')
+    parser.add_argument('--limit', type=int, default=None, help='앞에서부터 N개만 추정')
+    parser.add_argument('--workers', type=int, default=16, help='동시에 추정할 사이트 수')
+    parser.add_argument('--resource-workers', type=int, default=8, help='사이트 하나당 동시 요청 수')
+    parser.add_argument('--timeout', type=float, default=10, help='요청 하나당 제한 시간(초)')
+    parser.add_argument('--output', default='triage.csv', help='사이트별 추정 결과 (csv)')
+    parser.add_argument('--flagged', default=None, help='정밀 평가 대상 사이트 목록 (json, batch_audit --input 용)')
+    parser.add_argument('--flag-grade', default='D', choices=GRADES, help='이 등급 이하 또는 추정 실패 사이트를 정밀 평가 대상으로')
+    args = parser.parse_args(argv)
+
+    if args.url:
+        view_data = estimate_view_data(args.url, workers=args.resource_workers, timeout=args.timeout)
+        for key, value in view_data.items():
+            print(f"{key}: {value}")
+        print(f"grade: {grade_point(view_data['total_byte_weight'] / 1024)}")
+        return
+
+    sites = load_sites(args.input)
+    if args.limit:
+        sites = sites[:args.limit]
+    results = triage(sites, workers=args.workers, resource_workers=args.resource_workers, timeout=args.timeout)
+
+    with open(args.output, 'w', encoding='utf-8-sig', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(['siteLink', 'total_byte_weight', 'grade', 'carbon_emission', 'error'])
+        for result in results:
+            total_bytes = result['view_data']['total_byte_weight'] if result['view_data'] else ''
+            writer.writerow([result['site']['siteLink'], total_bytes, result['grade'] or '',
+                             result['carbon_emission'] if result['carbon_emission'] is not None else '',
+                             result['error'] or ''])
+
+    flag_from = GRADES.index(args.flag_grade)
+    flagged = [result['site'] for result in results
+               if result['grade'] is None or GRADES.index(result['grade']) >= flag_from]
+    error_count = sum(1 for result in results if result['error'])
+    print(f"Estimated {len(results) - error_count} sites (errors {error_count}), "
+          f"{len(flagged)} flagged for full audit. Saved to {args.output}")
+
+    if args.flagged:
+        with open(args.flagged, 'w', encoding='utf-8') as file:
+            json.dump(flagged, file, ensure_ascii=False)
+        print(f"Flagged sites saved to {args.flagged}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,186 @@
+'''
+실제 평가 결과로 등급(grade_point) 기준 계산
+
+utils/cutoff.py 처럼 전체 데이터를 정렬하는 대신 total_byte_weight(KB)의 KLL 스케치(app.utils.quantile_sketch)를
+grade_sketches 컬렉션에 보관하고, 평가가 저장될 때마다(AuditWriter flush, 웹 평가 작업) 새 값만 합친다.
+여러 배치 작업이 동시에 합쳐도 잃어버리는 값이 없도록 version 필드로 비교 후 교체(optimistic concurrency)한다.
+
+등급 기준은 스케치의 GRADE_QUANTILES 분위수 (A+ 는 하위 5%, ..., E 는 하위 70%, 나머지는 F).
+cutoff.py 의 백분위(5, 10, 20, 30, 50)를 따르고, 마지막 E 상한은 100% 대신 70% 를 사용한다. (100% 이면 F 가 나오지 않음)
+같은 사이트를 다시 평가하면 한 번 더 반영되므로 가끔 rebuild 로 lighthouse_resource 에서 다시 만든다.
+
+사용법 (ecoweb 디렉토리에서 실행):
+    python -m app.services.grade_thresholds show
+    python -m app.services.grade_thresholds rebuild
+'''
+import argparse
+import threading
+import time
+from datetime import datetime
+
+from pymongo import MongoClient
+from pymongo.errors import DuplicateKeyError, PyMongoError
+
+from config import Config
+from app.utils.grade import GRADES, DEFAULT_THRESHOLDS
+from app.utils.quantile_sketch import KLLSketch
+
+SKETCH_NAME = 'total_byte_weight_kb'
+GRADE_QUANTILES = (0.05, 0.10, 0.20, 0.30, 0.50, 0.70)
+MERGE_RETRIES = 10
+
+
+def merge_sketch(collection, sketch, name=SKETCH_NAME):
+    """
+    저장된 스케치에 sketch 를 합침. 다른 작업이 먼저 바꿨으면 다시 읽어서 재시도
+
+    Returns:
+        bool: 저장 성공 여부
+    """
+    for _ in range(MERGE_RETRIES):
+        document = collection.find_one({'_id': name})
+        if document is None:
+            try:
+                collection.insert_one({'_id': name, 'version': 1, 'sketch': sketch.to_dict(),
+                                       'updated_at': datetime.now()})
+                return True
+            except DuplicateKeyError:
+                continue
+        merged = KLLSketch.from_dict(document['sketch']).merge(sketch)
+        result = collection.replace_one(
+            {'_id': name, 'version': document['version']},
+            {'version': document['version'] + 1, 'sketch': merged.to_dict(), 'updated_at': datetime.now()},
+        )
+        if result.matched_count:
+            return True
+    print(f"Warning: could not merge {name} sketch after {MERGE_RETRIES} retries")
+    return False
+
+
+def weight_kb(view_data):
+    """
+    스케치에 반영할 view_data 의 total_byte_weight(KB). 반영하지 않을 값이면 None
+
+    평가에 실패하면 process_report 가 total_byte_weight 0 인 기본 view_data 를 반환하므로 0 이하는 제외
+    (0KB 가 쌓이면 A+, A 기준이 내려감)
+    """
+    weight = (view_data or {}).get('total_byte_weight')
+    if isinstance(weight, bool) or not isinstance(weight, (int, float)) or weight <= 0:
+        return None
+    return weight / 1024
+
+
+def record_weights(collection, weights_kb, name=SKETCH_NAME):
+    """새 평가의 total_byte_weight(KB) 목록을 스케치에 반영 (저장 실패는 경고만 출력)"""
+    if not weights_kb:
+        return False
+    sketch = KLLSketch()
+    sketch.update_many(weights_kb)
+    try:
+        return merge_sketch(collection, sketch, name)
+    except PyMongoError as e:
+        print(f"Warning: could not record grade sketch: {str(e)}")
+        return False
+
+
+def load_sketch(collection, name=SKETCH_NAME):
+    document = collection.find_one({'_id': name}, {'sketch': 1})
+    return KLLSketch.from_dict(document['sketch']) if document else None
+
+
+def thresholds_from_sketch(sketch, quantiles=GRADE_QUANTILES):
+    """A+ ~ E 상한(KB) 목록"""
+    return tuple(round(value, 2) for value in sketch.quantiles(quantiles))
+
+
+def rebuild_sketch(db, name=SKETCH_NAME):
+    """lighthouse_resource 의 사이트별 마지막 total_byte_weight 로 스케치를 새로 만듦 (전체를 한 번 읽음)"""
+    sketch = KLLSketch()
+    for document in db['lighthouse_resource'].find({'total_byte_weight': {'$type': 'number'}},
+                                                   {'total_byte_weight': 1, '_id': 0}):
+        sketch.update(document['total_byte_weight'] / 1024)
+    document = db['grade_sketches'].find_one({'_id': name}, {'version': 1})
+    db['grade_sketches'].replace_one(
+        {'_id': name},
+        {'version': (document['version'] if document else 0) + 1, 'sketch': sketch.to_dict(),
+         'updated_at': datetime.now()},
+        upsert=True,
+    )
+    return sketch
+
+
+class GradeThresholds:
+    """
+    웹 요청에서 사용할 등급 기준 (refresh_interval 초마다 스케치를 다시 읽음)
+
+    스케치의 값이 min_count 보다 적으면 None (grade_point 가 DEFAULT_THRESHOLDS 사용)
+    """
+
+    def __init__(self, app=None):
+        self.database = None
+        self.refresh_interval = 300
+        self.min_count = 1000
+        self._thresholds = None
+        self._checked_at = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app, database):
+        """
+        Args:
+            app: Flask 앱 (GRADE_THRESHOLDS_REFRESH, GRADE_SKETCH_MIN_COUNT 설정 사용)
+            database: app.database.MongoDB
+        """
+        self.database = database
+        self.refresh_interval = app.config['GRADE_THRESHOLDS_REFRESH']
+        self.min_count = app.config['GRADE_SKETCH_MIN_COUNT']
+
+    @property
+    def collection(self):
+        return self.database.db.grade_sketches
+
+    def current(self):
+        now = time.monotonic()
+        if self._checked_at is not None and now - self._checked_at < self.refresh_interval:
+            return self._thresholds
+        with self._lock:
+            if self._checked_at is not None and now - self._checked_at < self.refresh_interval:
+                return self._thresholds
+            try:
+                sketch = load_sketch(self.collection)
+                self._thresholds = (thresholds_from_sketch(sketch)
+                                    if sketch is not None and sketch.count >= self.min_count else None)
+            except PyMongoError as e:
+                # 이전 기준을 계속 사용
+                print(f"Warning: could not load grade sketch: {str(e)}")
+            self._checked_at = now
+        return self._thresholds
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='평가 결과로 등급 기준 계산')
+    parser.add_argument('command', choices=['show', 'rebuild'])
+    parser.add_argument('--mongo-uri', default=Config.MONGO_URI)
+    args = parser.parse_args(argv)
+
+    client = MongoClient(args.mongo_uri)
+    try:
+        db = client[Config.DB_NAME]
+        if args.command == 'rebuild':
+            sketch = rebuild_sketch(db)
+        else:
+            sketch = load_sketch(db['grade_sketches'])
+    finally:
+        client.close()
+
+    if sketch is None or not sketch.count:
+        print("No grade sketch yet (python -m app.services.grade_thresholds rebuild)")
+        return
+    print(f"{sketch.count} audits, {sum(len(items) for items in sketch.compactors)} values retained")
+    thresholds = thresholds_from_sketch(sketch)
+    for grade, quantile, upper, default in zip(GRADES, GRADE_QUANTILES,
+                                               thresholds, DEFAULT_THRESHOLDS):
+        print(f"{grade}: <= {upper}KB (p{quantile * 100:g}, default {default}KB)")
+
+
+if __name__ == '__main__':
+    main()
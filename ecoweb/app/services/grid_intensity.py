@@ -0,0 +1,110 @@
+'''
+전력망 탄소집약도(gCO2e/kWh) 조회
+
+GRID_INTENSITY_TABLE(기본: app/data/grid_intensity.csv) 파일이 있으면 월/시간대별 값을 사용하고
+없으면 KOREA_AVERAGE_INTENSITY 상수를 사용한다.
+조회할 때마다 파일이 있는지 확인하므로 실행 중에 표를 추가하거나 바꿔도 재시작 없이 반영된다.
+app/data/grid_intensity.sample.csv 를 grid_intensity.csv 로 복사한 뒤 값을 채워서 사용한다.
+(예시 파일은 모든 달이 상수와 같은 값이라 그대로 복사하면 결과가 바뀌지 않음)
+
+표 형식 (csv, 헤더 포함). 빠진 월/시간은 앞뒤 값으로 보간 (시간은 24시간, 월은 12개월 주기):
+    month,hour,intensity
+    1,0,452.1
+    1,1,448.7
+    ...
+hour 가 없는 행(빈 값)은 그 달의 평균값으로 사용한다.
+'''
+import csv
+import os
+from functools import lru_cache
+
+import numpy as np
+
+from app.services.emissions_calculator import KOREA_AVERAGE_INTENSITY
+
+DEFAULT_TABLE_PATH = os.getenv('GRID_INTENSITY_TABLE',
+                               os.path.join(os.path.dirname(__file__), '..', 'data', 'grid_intensity.csv'))
+HOURS = np.arange(24)
+
+
+class ConstantIntensity:
+    """모든 시간대에 같은 값"""
+
+    def __init__(self, value=KOREA_AVERAGE_INTENSITY):
+        self.value = value
+
+    def hourly(self, month):
+        """month(1~12)의 0~23시 탄소집약도 배열"""
+        return np.full(24, float(self.value))
+
+    def monthly(self):
+        """1~12월의 하루 평균 탄소집약도 배열"""
+        return np.full(12, float(self.value))
+
+    def at(self, month, hour):
+        return float(self.value)
+
+
+class TableIntensity:
+    """월/시간대별 표를 12x24 격자로 보간해서 사용"""
+
+    def __init__(self, path):
+        self.path = path
+
+    @property
+    def grid(self):
+        return _load_grid(self.path, os.path.getmtime(self.path))
+
+    def hourly(self, month):
+        return self.grid[month - 1]
+
+    def monthly(self):
+        return self.grid.mean(axis=1)
+
+    def at(self, month, hour):
+        """month(1~12), hour(0~24, 소수 가능) 의 탄소집약도. 시간 사이는 선형 보간"""
+        return _interpolate_hour(self.path, os.path.getmtime(self.path), month, round(hour, 2))
+
+
+@lru_cache(maxsize=4)
+def _load_grid(path, mtime):
+    """표를 읽어 12x24 격자로 보간 (파일이 바뀌면 mtime 이 달라져서 다시 읽음)"""
+    grid = np.full((12, 24), np.nan)
+    with open(path, 'r', encoding='utf-8-sig', newline='') as file:
+        for row in csv.DictReader(file):
+            month = int(row['month'])
+            intensity = float(row['intensity'])
+            if (row.get('hour') or '').strip() == '':
+                # 월 평균만 있는 경우: 아직 값이 없는 시간대를 채움
+                grid[month - 1] = np.where(np.isnan(grid[month - 1]), intensity, grid[month - 1])
+            else:
+                grid[month - 1, int(row['hour'])] = intensity
+    if np.isnan(grid).all():
+        raise ValueError(f"No intensity rows in {path}")
+
+    # 1) 값이 있는 달은 시간 방향으로 보간 (23시 다음은 0시)
+    for month in range(12):
+        known = ~np.isnan(grid[month])
+        if known.any():
+            grid[month] = np.interp(HOURS, HOURS[known], grid[month, known], period=24)
+    # 2) 값이 없는 달은 시간대별로 월 방향 보간 (12월 다음은 1월)
+    known_months = ~np.isnan(grid[:, 0])
+    months = np.arange(12)
+    for hour in HOURS:
+        grid[:, hour] = np.interp(months, months[known_months], grid[known_months, hour], period=12)
+    # 캐시된 배열을 여러 곳에서 공유하므로 읽기 전용
+    grid.setflags(write=False)
+    return grid
+
+
+@lru_cache(maxsize=4096)
+def _interpolate_hour(path, mtime, month, hour):
+    hourly = _load_grid(path, mtime)[month - 1]
+    return float(np.interp(hour, np.append(HOURS, 24), np.append(hourly, hourly[0])))
+
+
+def get_intensity_source(path=DEFAULT_TABLE_PATH):
+    """표 파일이 있으면 TableIntensity, 없으면 ConstantIntensity (표를 읽는 부분은 _load_grid 가 mtime 기준으로 캐시)"""
+    if path and os.path.exists(path):
+        return TableIntensity(path)
+    return ConstantIntensity()
@@ -1,14 +1,86 @@
-import json
 import subprocess
 import os
+import signal
+import tempfile
+import uuid
+from app.services.audit_cache import save_audit
+from app.services.report_reader import read_report
 
-def run_lighthouse(url):
-    # Windows version
-    command = f'lighthouse {url} --only-audits=network-requests,resource-summary,third-party-summary,script-treemap-data,total-byte-weight,unused-css-rules,unused-javascript,modern-image-formats,efficient-animated-content,duplicated-javascript,js-libraries --output json --output-path ./report.json --preset=desktop'
-    # Linux Headless version
-    # command = f'lighthouse {url} --chrome-flags="--headless --no-sandbox --disable-gpu --disable-dev-shm-usage" --only-audits=network-requests,resource-summary,third-party-summary,script-treemap-data,total-byte-weight,unused-css-rules,,unused-javascript,modern-image-formats,efficient-animated-content,duplicated-javascript,js-libraries --output json --output-path ./report.json --preset=desktop'
+LIGHTHOUSE_AUDITS = 'network-requests,resource-summary,third-party-summary,script-treemap-data,total-byte-weight,unused-css-rules,unused-javascript,modern-image-formats,efficient-animated-content,duplicated-javascript,js-libraries'
+# Linux Headless 환경에서는 LIGHTHOUSE_CHROME_FLAGS="--headless --no-sandbox --disable-gpu --disable-dev-shm-usage" 로 설정
+CHROME_FLAGS = os.getenv('LIGHTHOUSE_CHROME_FLAGS', '')
+# 평가별 리포트 저장 디렉토리 (동시에 실행되는 평가끼리 리포트가 덮어써지지 않도록 평가마다 별도 파일 사용)
+REPORT_DIR = os.getenv('LIGHTHOUSE_REPORT_DIR', os.path.join(tempfile.gettempdir(), 'ecoweb_reports'))
 
-    subprocess.run(command, shell=True)
+def new_report_path():
+    """평가 하나에 사용할 고유한 리포트 경로 생성"""
+    os.makedirs(REPORT_DIR, exist_ok=True)
+    return os.path.join(REPORT_DIR, f'report_{uuid.uuid4().hex}.json')
+
+def remove_report(report_path):
+    """평가가 끝난 리포트 파일 삭제"""
+    if report_path and os.path.exists(report_path):
+        os.remove(report_path)
+
+class LighthouseError(Exception):
+    """Lighthouse 가 비정상 종료한 경우 (stderr 마지막 부분을 메시지로 가짐)"""
+
+    def __init__(self, url, returncode, stderr):
+        self.url = url
+        self.returncode = returncode
+        self.stderr = stderr
+        super().__init__(f"Lighthouse failed for {url} (exit code {returncode}): {stderr}")
+
+def run_lighthouse(url, output_path=None, timeout=None, check=False, port=None):
+    """
+    Lighthouse CLI 실행
+
+    Args:
+        url (str): 평가할 URL
+        output_path (str, optional): 리포트(json) 저장 경로. 없으면 new_report_path() 로 생성
+        timeout (float, optional): 제한 시간(초). 초과 시 Lighthouse/Chrome 프로세스를 종료하고 TimeoutExpired 발생
+        check (bool): True 이면 Lighthouse 가 0 이 아닌 코드로 종료했을 때 LighthouseError 발생
+        port (int, optional): 이미 실행 중인 Chrome 의 remote-debugging-port (ChromePool).
+            지정하면 Chrome 을 새로 띄우지 않고 해당 Chrome 에 붙어서 평가
+
+    Returns:
+        str: 리포트 경로 (process_report, process_Analysis, get_report_imagepath 에 전달)
+    """
+    if output_path is None:
+        output_path = new_report_path()
+    command = ['lighthouse', url, f'--only-audits={LIGHTHOUSE_AUDITS}',
+               '--output', 'json', '--output-path', output_path, '--preset=desktop']
+    if port is not None:
+        command.append(f'--port={port}')
+    elif CHROME_FLAGS:
+        command.append(f'--chrome-flags={CHROME_FLAGS}')
+
+    # Windows 에서는 lighthouse 가 .cmd 이므로 shell 로 실행
+    # 그 외에는 프로세스 그룹을 분리해서 timeout 시 Chrome 까지 함께 종료
+    is_windows = os.name == 'nt'
+    process = subprocess.Popen(command, shell=is_windows, start_new_session=not is_windows,
+                               stderr=subprocess.PIPE if check else None)
+    try:
+        _, stderr = process.communicate(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        _kill_process_tree(process)
+        raise
+    if check and process.returncode != 0:
+        stderr = stderr.decode('utf-8', errors='replace') if stderr else ''
+        raise LighthouseError(url, process.returncode, stderr[-2000:].strip())
+    return output_path
+
+def _kill_process_tree(process):
+    """Lighthouse 와 Lighthouse 가 띄운 Chrome 프로세스를 모두 종료"""
+    try:
+        if os.name == 'nt':
+            subprocess.run(['taskkill', '/F', '/T', '/PID', str(process.pid)],
+                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        else:
+            os.killpg(process.pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        pass
+    process.communicate()
 
 def safe_get_audit_value(report, audit_path, default_value=0):
     """안전하게 audit 값을 가져오는 헬퍼 함수"""
@@ -85,10 +157,65 @@ def safe_get_audit_value(report, audit_path, default_value=0):
 #         print(f"Error running Lighthouse: {str(e)}")
 #         return False
 
-def process_report(url, collection_resource, collection_traffic):
+def build_view_data(url, report):
+    """read_report() 결과에서 결과 화면(view_data)에 사용할 값 계산"""
+    resource_summary = safe_get_audit_value(report, ['resource-summary', 'details', 'items'], [])
+
+    # 1. 리소스 데이터 추출 with 상세한 예외 처리
     try:
-        with open('report.json', 'r', encoding='utf-8') as file:
-            report = json.load(file)
+        total_resource_bytes = resource_summary[0].get('transferSize', 0)
+        resource_bytes = {
+            'font_total_bytes': resource_summary[1].get('transferSize', 0) if len(resource_summary) > 1 else 0,
+            'script_total_bytes': resource_summary[2].get('transferSize', 0) if len(resource_summary) > 2 else 0,
+            'html_total_bytes': resource_summary[3].get('transferSize', 0) if len(resource_summary) > 3 else 0,
+            'css_total_bytes': resource_summary[4].get('transferSize', 0) if len(resource_summary) > 4 else 0,
+            'other_total_bytes': resource_summary[5].get('transferSize', 0) if len(resource_summary) > 5 else 0,
+            'media_total_bytes': resource_summary[6].get('transferSize', 0) if len(resource_summary) > 6 else 0,
+            'third_party_total_bytes': resource_summary[7].get('transferSize', 0) if len(resource_summary) > 7 else 0
+        }
+    except IndexError as e:
+        print(f"Warning: Incomplete resource summary for {url}: {str(e)}")
+        resource_bytes = {k: 0 for k in ['font_total_bytes', 'script_total_bytes', 'html_total_bytes', 
+                                       'css_total_bytes', 'other_total_bytes', 'media_total_bytes', 
+                                       'third_party_total_bytes']}
+
+    # 2. 스크립트 데이터 처리
+    script_treemap_data = safe_get_audit_value(report, ['script-treemap-data', 'details', 'nodes'], [])
+    
+    # 3. view_data 준비
+    view_data = {
+        'third_party_summary_wasted_bytes': safe_get_audit_value(
+            report, ['third-party-summary', 'details', 'summary', 'wastedBytes']
+        ),
+        'total_unused_bytes_script': sum(node.get('unusedBytes', 0) for node in script_treemap_data),
+        'total_resource_bytes_script': sum(node.get('resourceBytes', 0) for node in script_treemap_data),
+        'total_byte_weight': safe_get_audit_value(
+            report, ['total-byte-weight', 'numericValue']
+        ),
+        'can_optimize_css_bytes': safe_get_audit_value(
+            report, ['unused-css-rules', 'details', 'overallSavingsBytes']
+        ),
+        'can_optimize_js_bytes': safe_get_audit_value(
+            report, ['unused-javascript', 'details', 'overallSavingsBytes']
+        ),
+        'modern_image_formats_bytes': safe_get_audit_value(
+            report, ['modern-image-formats', 'details', 'overallSavingsBytes']
+        ),
+        'efficient_animated_content': safe_get_audit_value(
+            report, ['efficient-animated-content', 'details', 'overallSavingsBytes']
+        ),
+        'duplicated_javascript': safe_get_audit_value(
+            report, ['duplicated-javascript', 'numericValue']
+        ),
+        **resource_bytes  # 위에서 준비한 resource_bytes 딕셔너리를 풀어서 넣기
+    }
+
+    return view_data
+
+def process_report(url, collection_resource, collection_traffic, report_path):
+    try:
+        # 필요한 audit 값만 스트리밍으로 추출
+        report = read_report(report_path)
 
         # 1. 기본 데이터 구조 검증
         if 'audits' not in report:
@@ -104,27 +231,7 @@ def process_report(url, collection_resource, collection_traffic):
         if not resource_summary:
             raise KeyError("No resource summary data found")
 
-        # MongoDB에 저장할 데이터 추출
-        # 만약, details가 없는 경우, 빈 리스트를 사용(get 메서드 사용)
-         # 4. 리소스 데이터 추출 with 상세한 예외 처리
-        try:
-            total_resource_bytes = resource_summary[0].get('transferSize', 0)
-            resource_bytes = {
-                'font_total_bytes': resource_summary[1].get('transferSize', 0) if len(resource_summary) > 1 else 0,
-                'script_total_bytes': resource_summary[2].get('transferSize', 0) if len(resource_summary) > 2 else 0,
-                'html_total_bytes': resource_summary[3].get('transferSize', 0) if len(resource_summary) > 3 else 0,
-                'css_total_bytes': resource_summary[4].get('transferSize', 0) if len(resource_summary) > 4 else 0,
-                'other_total_bytes': resource_summary[5].get('transferSize', 0) if len(resource_summary) > 5 else 0,
-                'media_total_bytes': resource_summary[6].get('transferSize', 0) if len(resource_summary) > 6 else 0,
-                'third_party_total_bytes': resource_summary[7].get('transferSize', 0) if len(resource_summary) > 7 else 0
-            }
-        except IndexError as e:
-            print(f"Warning: Incomplete resource summary for {url}: {str(e)}")
-            resource_bytes = {k: 0 for k in ['font_total_bytes', 'script_total_bytes', 'html_total_bytes', 
-                                           'css_total_bytes', 'other_total_bytes', 'media_total_bytes', 
-                                           'third_party_total_bytes']}
-
-        # 5. MongoDB 데이터 준비 with 검증
+        # 4. MongoDB 데이터 준비 with 검증
         traffic_data = {
             'url': url,
             'resource_summary': []
@@ -155,43 +262,14 @@ def process_report(url, collection_resource, collection_traffic):
                     'resourceSize': item.get('resourceSize', 0)
                 })
 
-        # 6. MongoDB 저장 with 예외 처리
+        # 5. view_data 준비
+        view_data = build_view_data(url, report)
+
+        # 6. MongoDB 저장(upsert) with 예외 처리. view_data 도 함께 저장해서 캐시로 사용
         try:
-            collection_traffic.insert_one(traffic_data)
-            collection_resource.insert_one(resource_data)
+            save_audit(collection_resource, collection_traffic, traffic_data, resource_data, view_data)
         except Exception as e:
             print(f"MongoDB insertion error for {url}: {str(e)}")
-    
-        # 7. 스크립트 데이터 처리
-        script_treemap_data = safe_get_audit_value(report, ['script-treemap-data', 'details', 'nodes'], [])
-        
-        # 8. view_data 준비
-        view_data = {
-            'third_party_summary_wasted_bytes': safe_get_audit_value(
-                report, ['third-party-summary', 'details', 'summary', 'wastedBytes']
-            ),
-            'total_unused_bytes_script': sum(node.get('unusedBytes', 0) for node in script_treemap_data),
-            'total_resource_bytes_script': sum(node.get('resourceBytes', 0) for node in script_treemap_data),
-            'total_byte_weight': safe_get_audit_value(
-                report, ['total-byte-weight', 'numericValue']
-            ),
-            'can_optimize_css_bytes': safe_get_audit_value(
-                report, ['unused-css-rules', 'details', 'overallSavingsBytes']
-            ),
-            'can_optimize_js_bytes': safe_get_audit_value(
-                report, ['unused-javascript', 'details', 'overallSavingsBytes']
-            ),
-            'modern_image_formats_bytes': safe_get_audit_value(
-                report, ['modern-image-formats', 'details', 'overallSavingsBytes']
-            ),
-            'efficient_animated_content': safe_get_audit_value(
-                report, ['efficient-animated-content', 'details', 'overallSavingsBytes']
-            ),
-            'duplicated_javascript': safe_get_audit_value(
-                report, ['duplicated-javascript', 'numericValue']
-            ),
-            **resource_bytes  # 위에서 준비한 resource_bytes 딕셔너리를 풀어서 넣기
-        }
 
         return view_data
 
@@ -222,45 +300,57 @@ def process_report(url, collection_resource, collection_traffic):
             'third_party_total_bytes': 0
         }
 
+def build_audit_data(url, url_data, report):
+    """
+    read_report 결과에서 MongoDB 에 저장할 문서 생성
+
+    Returns:
+        tuple: (traffic_data, resource_data, view_data)
+    """
+    network_requests = report['audits']['network-requests']['details']['items']
+    resource_summary = report['audits']['resource-summary']['details']['items']
+
+    # resourceType 이 없는 경우는 'unknown'으로 저장하고 transferSize 가 없는 경우는 0으로 저장한다.
+    traffic_data = {
+        'url' : url,
+        'resource_summary' : [
+            {'resourceType': item.get('resourceType', 'unknown'), 'transferSize': item.get('transferSize', 0)} 
+            for item in resource_summary
+        ],
+        # url_data에 있는 요소 전부 넣기
+        **url_data
+    }
+
+    resource_data = {
+        'url': url,
+        'network_requests': [
+            {
+                'url': item.get('url', ''),
+                'resourceType': item.get('resourceType', 'unknown'),
+                'resourceSize': item.get('resourceSize', 0)
+            } for item in network_requests
+        ],
+    }
+    return traffic_data, resource_data, build_view_data(url, report)
+
 # 공공기관 url 각각에 대해 Lighthouse 평가 결과 MongoDB에 저장 
-def process_Analysis(url,url_data,collection_resource,collection_traffic):
-    with open('report.json', 'r', encoding='utf-8') as file:
-        report = json.load(file)
+def process_Analysis(url, url_data, collection_resource, collection_traffic, report_path, writer=None,
+                     on_saved=None):
     try:
+        # 필요한 audit 값만 스트리밍으로 추출
+        report = read_report(report_path)
+
         # MongoDB에 저장할 데이터 추출
-        network_requests = report['audits']['network-requests']['details']['items']
-        resource_summary = report['audits']['resource-summary']['details']['items']
-        
-        # resourceType 이 없는 경우는 'unknown'으로 저장하고 transferSize 가 없는 경우는 0으로 저장한다.
-        traffic_data = {
-            'url' : url,
-            'resource_summary' : [
-                {'resourceType': item.get('resourceType', 'unknown'), 'transferSize': item.get('transferSize', 0)} 
-                for item in resource_summary
-            ],
-            # url_data에 있는 요소 전부 넣기
-            **url_data
-        }
+        traffic_data, resource_data, view_data = build_audit_data(url, url_data, report)
 
-        resource_data = {
-            'url': url,
-            'network_requests': [
-                {
-                    'url': item.get('url', ''),
-                    'resourceType': item.get('resourceType', 'unknown'),
-                    'resourceSize': item.get('resourceSize', 0)
-                } for item in network_requests
-            ],
-        }
-        print('traffic_data')
-        print(traffic_data)
-        print('resource_data')
-        print(resource_data)
-        # MongoDB에 저장
-        collection_traffic.insert_one(traffic_data)
-        # collection_traffic.insert_one(url_data)
-        collection_resource.insert_one(resource_data)
+        # MongoDB에 저장 (writer 가 있으면 모아서 bulk write)
+        if writer is not None:
+            writer.add(traffic_data, resource_data, view_data, on_saved=on_saved)
+        else:
+            save_audit(collection_resource, collection_traffic, traffic_data, resource_data, view_data)
+            if on_saved is not None:
+                on_saved()
     except Exception as e:
         print(f"Error in process_Analysis: {url}, {e}")
         return 0
-    return 1
\ No newline at end of file
+    return 1
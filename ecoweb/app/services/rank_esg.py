@@ -1,58 +1,81 @@
-import pandas as pd 
-import json
+import argparse
+import os
+
+from pymongo import MongoClient
+
+from config import Config
+from app.services.category_total_co2 import write_json
 '''
 상위5개 하위5개 웹사이트 추출
+
+ecoweb 디렉토리에서 python -m app.services.rank_esg --output-dir /tmp/statistics 로 실행
+(웹에서 쓰는 static/statistics/top5_*.json 은 statistics_materializer 가 갱신하므로 여기서는 쓰지 않음)
 '''
-def get_top5_sites():
-    # CSV 파일 읽기
-    df = pd.read_csv('../data/urls/flattened_lighthouse_traffic.csv')
-    
-    # total 타입만 필터링
-    total_df = df[df['resource_summary.resourceType'] == 'total']
-    
-    # 가장 효율적인(작은) 5개 사이트
-    top5_efficient = total_df.nsmallest(5, 'resource_summary.transferSize')[
-        ['siteName', 'institutionCategory', 'resource_summary.transferSize']
-    ]
-    
-    # 가장 비효율적인(큰) 5개 사이트
-    top5_inefficient = total_df.nlargest(5, 'resource_summary.transferSize')[
-        ['siteName', 'institutionCategory', 'resource_summary.transferSize']
+
+def top_sites_pipeline(direction, limit=5):
+    """
+    total 전송량 기준 정렬 후 limit 개 (direction: 1 이면 작은 순, -1 이면 큰 순)
+
+    $sort 바로 뒤에 $limit 이 있으므로 MongoDB 는 전체를 정렬하지 않고 limit 개만 유지한다.
+    다만 $unwind 뒤의 $sort 라서 인덱스를 쓸 수 없고, 첫 $match 도 거의 모든 문서에 해당하므로 전체를 읽는다.
+    (자주 필요하면 transfer_size 인덱스로 후보만 유지하는 statistics_materializer 사용)
+    """
+    return [
+        {'$match': {'resource_summary.resourceType': 'total'}},
+        {'$project': {'_id': 0, 'siteName': 1, 'institutionCategory': 1, 'resource_summary': 1}},
+        {'$unwind': '$resource_summary'},
+        {'$match': {'resource_summary.resourceType': 'total',
+                    'resource_summary.transferSize': {'$type': 'number'}}},
+        {'$sort': {'resource_summary.transferSize': direction}},
+        {'$limit': limit},
+        {'$project': {'siteName': 1, 'institutionCategory': 1,
+                      'transferSize': '$resource_summary.transferSize'}},
     ]
+
+def get_top5_sites(collection):
+    # 가장 효율적인(작은) 5개 사이트 / 가장 비효율적인(큰) 5개 사이트
+    top5_efficient = list(collection.aggregate(top_sites_pipeline(1)))
+    top5_inefficient = list(collection.aggregate(top_sites_pipeline(-1)))
     
     # 결과 출력 (디버깅용)
     print("\n=== 가장 효율적인 웹사이트 TOP 5 ===")
-    for idx, row in top5_efficient.iterrows():
-        size_kb = row['resource_summary.transferSize'] / 1024
-        print(f"{row['siteName']} ({row['institutionCategory']}): {size_kb:.2f}KB")
+    for row in top5_efficient:
+        size_kb = row['transferSize'] / 1024
+        print(f"{row.get('siteName')} ({row.get('institutionCategory')}): {size_kb:.2f}KB")
     
     print("\n=== 가장 비효율적인 웹사이트 TOP 5 ===")
-    for idx, row in top5_inefficient.iterrows():
-        size_kb = row['resource_summary.transferSize'] / 1024
-        print(f"{row['siteName']} ({row['institutionCategory']}): {size_kb:.2f}KB")
+    for row in top5_inefficient:
+        size_kb = row['transferSize'] / 1024
+        print(f"{row.get('siteName')} ({row.get('institutionCategory')}): {size_kb:.2f}KB")
     
     # 효율적인 사이트 JSON 저장
     efficient_list = [{
-        'siteName': row['siteName'],
-        'institutionCategory': row['institutionCategory'],
-        'transferSize': float(row['resource_summary.transferSize'] / 1024)
-    } for idx, row in top5_efficient.iterrows()]
+        'siteName': row.get('siteName'),
+        'institutionCategory': row.get('institutionCategory'),
+        'transferSize': float(row['transferSize'] / 1024)
+    } for row in top5_efficient]
     
     # 비효율적인 사이트 JSON 저장
     inefficient_list = [{
-        'siteName': row['siteName'],
-        'institutionCategory': row['institutionCategory'],
-        'transferSize': float(row['resource_summary.transferSize'] / 1024)
-    } for idx, row in top5_inefficient.iterrows()]
+        'siteName': row.get('siteName'),
+        'institutionCategory': row.get('institutionCategory'),
+        'transferSize': float(row['transferSize'] / 1024)
+    } for row in top5_inefficient]
     
-    # JSON 파일로 저장 (한글 인코딩 처리)
-    with open('../static/statistics/top5_efficient_sites.json', 'w', encoding='utf-8') as f:
-        json.dump(efficient_list, f, ensure_ascii=False, indent=2)
-    
-    with open('../static/statistics/top5_bad_sites.json', 'w', encoding='utf-8') as f:
-        json.dump(inefficient_list, f, ensure_ascii=False, indent=2)
-    
-    return top5_efficient, top5_inefficient
+    return efficient_list, inefficient_list
 
 if __name__ == "__main__":
-    get_top5_sites()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description='전송량 기준 상위/하위 5개 사이트 추출')
+    parser.add_argument('--output-dir', required=True,
+                        help='top5_efficient_sites.json, top5_bad_sites.json 을 저장할 디렉토리 '
+                             '(static/statistics 는 statistics_materializer 가 갱신)')
+    parser.add_argument('--mongo-uri', default=Config.MONGO_URI)
+    args = parser.parse_args()
+
+    client = MongoClient(args.mongo_uri)
+    try:
+        efficient_list, inefficient_list = get_top5_sites(client[Config.DB_NAME]['lighthouse_traffic'])
+        write_json(efficient_list, os.path.join(args.output_dir, 'top5_efficient_sites.json'))
+        write_json(inefficient_list, os.path.join(args.output_dir, 'top5_bad_sites.json'))
+    finally:
+        client.close()
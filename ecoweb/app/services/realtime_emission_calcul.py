@@ -2,22 +2,37 @@
 from datetime import datetime, timedelta
 import numpy as np
 
-from datetime import datetime, timedelta
-import numpy as np
+from app.services.emissions_calculator import KOREA_AVERAGE_INTENSITY
+from app.services.grid_intensity import get_intensity_source
 
 class EmissionsCalculator:
-    def __init__(self):
+    def __init__(self, intensity_source=None):
         # 기본 배출 계수 (예시값)
         self.EMISSION_FACTOR = 0.2  # g CO2/KB
         self.ENERGY_PER_MINUTE = 0.00025  # kWh/minute
+        # EMISSION_FACTOR 는 평균 탄소집약도(KOREA_AVERAGE_INTENSITY) 기준이므로
+        # 시간대별 탄소집약도 / 평균 만큼 보정 (표가 없으면 항상 1)
+        self._intensity_source = intensity_source
+        self.REFERENCE_INTENSITY = KOREA_AVERAGE_INTENSITY
+
+    @property
+    def intensity_source(self):
+        # 지정하지 않았으면 매번 조회 (실행 중에 추가된 탄소집약도 표도 반영)
+        return self._intensity_source or get_intensity_source()
 
-    def calculate_daily_pattern(self, page_size_kb, daily_traffic_pattern=None):
+    def _intensity_scale(self, month=None):
+        """month 의 0~23시 탄소집약도 보정 계수 배열"""
+        month = month or datetime.now().month
+        return self.intensity_source.hourly(month) / self.REFERENCE_INTENSITY
+
+    def calculate_daily_pattern(self, page_size_kb, daily_traffic_pattern=None, month=None):
         """
         일일 시간대별 탄소배출량 계산
         
         Args:
             page_size_kb (float): 페이지 크기 (KB)
             daily_traffic_pattern (dict, optional): 시간대별 트래픽 패턴
+            month (int, optional): 탄소집약도를 적용할 달 (기본: 이번 달)
         
         Returns:
             dict: 시간대별 예상 탄소배출량
@@ -26,14 +41,11 @@ class EmissionsCalculator:
             # 일반적인 웹사이트 트래픽 패턴 추정
             daily_traffic_pattern = self._generate_typical_pattern()
 
-        emissions = {}
         base_emission = page_size_kb * self.EMISSION_FACTOR
+        traffic_multiplier = np.array([daily_traffic_pattern.get(hour, 1.0) for hour in range(24)])
+        emissions = base_emission * traffic_multiplier * self._intensity_scale(month)
 
-        for hour in range(24):
-            traffic_multiplier = daily_traffic_pattern.get(hour, 1.0)
-            emissions[f"{hour:02d}:00"] = base_emission * traffic_multiplier
-
-        return emissions
+        return {f"{hour:02d}:00": float(emission) for hour, emission in enumerate(emissions)}
 
     def _generate_typical_pattern(self):
         """일반적인 웹사이트 트래픽 패턴 생성"""
@@ -68,20 +80,32 @@ class EmissionsCalculator:
 
         return pattern
 
-    def get_emissions_estimate(self, page_size_kb, monthly_visitors):
+    def _hourly_visitors(self, monthly_visitors):
+        """하루 시간대별 예상 방문자 수 배열"""
+        daily_visitors = monthly_visitors / 30
+        pattern = self._generate_typical_pattern()
+        return daily_visitors * np.array([pattern[hour] for hour in range(24)]) / 24
+
+    def get_emissions_estimate(self, page_size_kb, monthly_visitors, month=None):
         """
         월간 방문자 수를 기반으로 시간대별 배출량 추정
         """
-        daily_visitors = monthly_visitors / 30
-        pattern = self._generate_typical_pattern()
-        
-        hourly_emissions = {}
-        for hour, multiplier in pattern.items():
-            estimated_visitors = (daily_visitors * multiplier) / 24
-            emission = (page_size_kb * self.EMISSION_FACTOR * estimated_visitors)
-            hourly_emissions[f"{hour:02d}:00"] = round(emission, 2)
-            
-        return hourly_emissions
+        emissions = (page_size_kb * self.EMISSION_FACTOR * self._hourly_visitors(monthly_visitors)
+                     * self._intensity_scale(month))
+        return {f"{hour:02d}:00": round(float(emission), 2) for hour, emission in enumerate(emissions)}
+
+    def get_monthly_estimate(self, page_size_kb, monthly_visitors):
+        """
+        1~12월 월간 배출량 추정 (시간대별 트래픽 x 월/시간대별 탄소집약도)
+
+        Returns:
+            dict: {"01": g CO2, ..., "12": g CO2}
+        """
+        # 12 x 24 탄소집약도 보정 계수와 시간대별 방문자 수를 한 번에 곱함
+        scale = np.stack([self._intensity_scale(month) for month in range(1, 13)])
+        daily = (page_size_kb * self.EMISSION_FACTOR * scale * self._hourly_visitors(monthly_visitors)).sum(axis=1)
+        days = np.array([31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31])
+        return {f"{month:02d}": round(float(emission), 2) for month, emission in zip(range(1, 13), daily * days)}
     '''
     # 사용 예시
     calculator = EmissionsCalculator()
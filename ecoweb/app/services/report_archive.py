@@ -0,0 +1,193 @@
+'''
+Lighthouse 원본 리포트 보관소
+
+평가가 끝난 리포트(json)를 gzip 으로 압축해 디스크에 내용 해시(sha256)를 이름으로 저장하고
+어떤 URL의 리포트인지는 lighthouse_reports 컬렉션에 정규화된 URL(audit_cache.canonicalize_url)로 기록한다.
+(평가 결과와 같은 기준이어야 http/https, 끝의 '/' 만 다른 URL의 오래된 리포트로 최근 평가를 덮어쓰지 않음)
+내용이 같은 리포트는 한 번만 저장되고, 같은 리포트를 다시 보관해도(재시도 등) 문서가 중복되지 않는다.
+
+새 지표가 필요하면 Lighthouse 를 다시 실행하지 않고 보관된 리포트에서 다시 추출한다.
+(report_reader.SCALAR_PATHS / LIST_FIELDS 와 build_view_data 를 수정한 뒤 reextract 실행)
+
+사용법 (ecoweb 디렉토리에서 실행):
+    python -m app.services.report_archive reextract                 # URL마다 가장 최근 리포트로 다시 추출
+    python -m app.services.report_archive reextract --url https://www.example.go.kr
+    python -m app.services.report_archive stats
+
+저장 위치는 LIGHTHOUSE_ARCHIVE_DIR 환경변수로 지정 (기본: ecoweb/report_archive)
+'''
+import argparse
+import gzip
+import hashlib
+import os
+import shutil
+import uuid
+from datetime import datetime
+
+from pymongo import MongoClient, ASCENDING, DESCENDING
+
+from config import BASE_DIR, Config
+from app.services.audit_cache import canonicalize_url
+from app.services.audit_writer import AuditWriter
+from app.services.lighthouse import build_audit_data
+from app.services.report_reader import read_report
+
+ARCHIVE_DIR = os.getenv('LIGHTHOUSE_ARCHIVE_DIR', os.path.join(BASE_DIR, 'report_archive'))
+CHUNK_SIZE = 1024 * 1024
+
+
+def _file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ReportArchive:
+    """
+    Args:
+        collection: lighthouse_reports 컬렉션 (url, sha256, archived_at, size, compressed_size)
+        root (str): 압축한 리포트를 저장할 디렉토리
+    """
+
+    def __init__(self, collection, root=ARCHIVE_DIR):
+        self.collection = collection
+        self.root = root
+
+    def ensure_indexes(self):
+        self.collection.create_index([('url', ASCENDING), ('sha256', ASCENDING)], unique=True)
+        self.collection.create_index([('url', ASCENDING), ('archived_at', DESCENDING)])
+        # latest() 의 전체 정렬용
+        self.collection.create_index([('archived_at', DESCENDING)])
+
+    def path(self, sha256):
+        """리포트 파일 경로 (디렉토리 하나에 파일이 너무 많아지지 않도록 해시 앞 2글자로 나눔)"""
+        return os.path.join(self.root, sha256[:2], f'{sha256}.json.gz')
+
+    def add(self, url, report_path):
+        """
+        리포트를 압축해서 보관하고 sha256 반환
+
+        이미 같은 내용의 파일이 있으면 다시 쓰지 않는다.
+        쓰는 도중 종료되어도 깨진 파일이 남지 않도록 임시 파일에 쓴 뒤 이름을 바꾼다.
+        """
+        requested_url, url = url, canonicalize_url(url)
+        sha256 = _file_sha256(report_path)
+        archive_path = self.path(sha256)
+        if not os.path.exists(archive_path):
+            os.makedirs(os.path.dirname(archive_path), exist_ok=True)
+            temp_path = f'{archive_path}.{uuid.uuid4().hex}.tmp'
+            try:
+                with open(report_path, 'rb') as src, gzip.open(temp_path, 'wb') as dst:
+                    shutil.copyfileobj(src, dst, CHUNK_SIZE)
+                os.replace(temp_path, archive_path)
+            finally:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+
+        now = datetime.now()
+        self.collection.update_one(
+            {'url': url, 'sha256': sha256},
+            {'$set': {'requested_url': requested_url, 'archived_at': now, 'size': os.path.getsize(report_path),
+                      'compressed_size': os.path.getsize(archive_path)},
+             '$setOnInsert': {'first_archived_at': now}},
+            upsert=True,
+        )
+        return sha256
+
+    def try_add(self, url, report_path):
+        """보관에 실패해도 평가는 계속 진행 (실패 시 None)"""
+        try:
+            return self.add(url, report_path)
+        except Exception as e:
+            print(f"Report archive error for {url}: {str(e)}")
+            return None
+
+    def open(self, sha256):
+        """보관된 리포트를 바이너리 파일 객체로 열기 (read_report 에 그대로 전달 가능)"""
+        return gzip.open(self.path(sha256), 'rb')
+
+    def latest(self, urls=None):
+        """
+        정규화된 URL마다 가장 최근에 보관된 리포트 정보 (url, sha256, archived_at)
+
+        정규화 전에 보관된 문서(url 이 요청한 그대로)도 같은 URL로 묶어서 가장 최근 것 하나만 반환
+        """
+        wanted = {canonicalize_url(url) for url in urls} if urls else None
+        seen = set()
+        cursor = self.collection.aggregate([
+            {'$project': {'_id': 0, 'url': 1, 'sha256': 1, 'archived_at': 1}},
+            {'$sort': {'archived_at': -1}},
+        ], allowDiskUse=True)
+        for row in cursor:
+            url = canonicalize_url(row['url'])
+            if url in seen or (wanted is not None and url not in wanted):
+                continue
+            seen.add(url)
+            yield {'url': url, 'sha256': row['sha256'], 'archived_at': row['archived_at']}
+
+    def stats(self):
+        result = list(self.collection.aggregate([
+            {'$group': {'_id': None, 'reports': {'$sum': 1}, 'urls': {'$addToSet': '$url'},
+                        'size': {'$sum': '$size'}, 'compressed_size': {'$sum': '$compressed_size'}}},
+            {'$project': {'reports': 1, 'urls': {'$size': '$urls'}, 'size': 1, 'compressed_size': 1}},
+        ]))
+        return result[0] if result else {'reports': 0, 'urls': 0, 'size': 0, 'compressed_size': 0}
+
+
+def reextract(archive, writer, urls=None):
+    """
+    보관된 리포트로 lighthouse_traffic / lighthouse_resource 를 다시 생성 (Lighthouse 실행 없음)
+
+    기관 정보 등 traffic 문서의 다른 필드는 그대로 두고, audited_at 은 원래 평가 시각을 유지한다.
+
+    Returns:
+        tuple: (성공 수, 실패 수)
+    """
+    success_count = error_count = 0
+    for entry in archive.latest(urls):
+        url = entry['url']
+        try:
+            with archive.open(entry['sha256']) as f:
+                report = read_report(f)
+            traffic_data, resource_data, view_data = build_audit_data(url, {}, report)
+            writer.add(traffic_data, resource_data, view_data, audited_at=entry['archived_at'])
+            success_count += 1
+        except Exception as e:
+            print(f"Re-extract error for {url} ({entry['sha256'][:12]}): {str(e)}")
+            error_count += 1
+    return success_count, error_count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='보관된 Lighthouse 리포트 관리')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    reextract_parser = subparsers.add_parser('reextract', help='보관된 리포트로 평가 결과 다시 추출')
+    reextract_parser.add_argument('--url', action='append', help='특정 URL만 (여러 번 지정 가능)')
+    reextract_parser.add_argument('--write-batch-size', type=int, default=500)
+    subparsers.add_parser('stats', help='보관된 리포트 수와 용량 출력')
+    args = parser.parse_args(argv)
+
+    client = MongoClient(Config.MONGO_URI)
+    try:
+        db = client[Config.DB_NAME]
+        archive = ReportArchive(db['lighthouse_reports'])
+        archive.ensure_indexes()
+
+        if args.command == 'stats':
+            stats = archive.stats()
+            ratio = stats['compressed_size'] / stats['size'] if stats['size'] else 0
+            print(f"{stats['reports']} reports for {stats['urls']} URLs, "
+                  f"{stats['size'] / 1024 ** 2:.1f}MB -> {stats['compressed_size'] / 1024 ** 2:.1f}MB ({ratio:.0%})")
+        elif args.command == 'reextract':
+            with AuditWriter(db['lighthouse_resource'], db['lighthouse_traffic'],
+                             batch_size=args.write_batch_size) as writer:
+                success_count, error_count = reextract(archive, writer, args.url)
+            print(f"Re-extracted {success_count} URLs, errors {error_count}")
+    finally:
+        client.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+'''
+Lighthouse 리포트 스트리밍 파서
+
+리포트 전체를 json.load 하지 않고 ijson.kvitems 로 audits 를 하나씩 읽으면서
+process_report / process_Analysis 에서 사용하는 audit 값만 뽑아 작은 dict 로 만든다.
+audit 하나는 ijson C 백엔드(yajl2_c)가 통째로 만들고 필요 없는 audit 은 바로 버리므로
+메모리에는 가장 큰 audit 하나와 남길 값만 올라가고, 파싱 시간은 json.load 와 비슷하다.
+(이벤트마다 Python 에서 경로를 비교하면 json.load 보다 2배 정도 느림)
+
+반환값은 원본 리포트와 같은 구조({'audits': {...}})이므로 safe_get_audit_value 등을 그대로 사용할 수 있다.
+최상위의 runtimeError 는 읽지 않는다. (audits 만 읽어야 리포트의 나머지를 건너뛸 수 있음)
+'''
+import ijson
+
+# 값 하나만 필요한 경로
+SCALAR_PATHS = {
+    'audits.third-party-summary.details.summary.wastedBytes',
+    'audits.total-byte-weight.numericValue',
+    'audits.unused-css-rules.details.overallSavingsBytes',
+    'audits.unused-javascript.details.overallSavingsBytes',
+    'audits.modern-image-formats.details.overallSavingsBytes',
+    'audits.efficient-animated-content.details.overallSavingsBytes',
+    'audits.duplicated-javascript.numericValue',
+}
+
+# 리스트 경로 -> 각 항목에서 남길 필드 (중첩된 값, 예: script-treemap-data 의 children 은 건너뜀)
+LIST_FIELDS = {
+    'audits.network-requests.details.items': ('url', 'resourceType', 'resourceSize', 'transferSize', 'mimeType'),
+    'audits.resource-summary.details.items': ('resourceType', 'label', 'requestCount', 'transferSize'),
+    'audits.script-treemap-data.details.nodes': ('name', 'resourceBytes', 'unusedBytes'),
+}
+
+# 읽을 audit id
+AUDIT_IDS = {path.split('.')[1] for path in (*SCALAR_PATHS, *LIST_FIELDS)}
+_MISSING = object()
+
+def read_report(source):
+    """
+    Lighthouse 리포트에서 필요한 audit 값만 추출
+
+    Args:
+        source (str | file): 리포트 경로 또는 바이너리 파일 객체 (gzip 스트림 등)
+
+    Returns:
+        dict: {'audits': {...}} 형태의 축소된 리포트
+    """
+    if isinstance(source, str):
+        with open(source, 'rb') as file:
+            return _parse(file)
+    return _parse(source)
+
+def _parse(file):
+    report = {'audits': {}}
+    for audit_id, audit in ijson.kvitems(file, 'audits', use_float=True):
+        if audit_id not in AUDIT_IDS:
+            continue
+        for path in SCALAR_PATHS:
+            value = _get_path(audit, path, audit_id)
+            if value is not _MISSING and not isinstance(value, (dict, list)):
+                _set_path(report, path, value)
+        for path, fields in LIST_FIELDS.items():
+            items = _get_path(audit, path, audit_id)
+            if isinstance(items, list):
+                # 항목 바로 아래의 값만 남김 (중첩된 값은 건너뜀)
+                _set_path(report, path, [
+                    {field: item[field] for field in fields
+                     if field in item and not isinstance(item[field], (dict, list))}
+                    for item in items if isinstance(item, dict)
+                ])
+    return report
+
+def _get_path(audit, path, audit_id):
+    """'audits.<audit_id>.a.b' 경로의 값 (다른 audit 의 경로이거나 값이 없으면 _MISSING)"""
+    _, path_audit_id, *keys = path.split('.')
+    if path_audit_id != audit_id:
+        return _MISSING
+    node = audit
+    for key in keys:
+        if not isinstance(node, dict) or key not in node:
+            return _MISSING
+        node = node[key]
+    return node
+
+def _set_path(report, prefix, value):
+    """'audits.a.b' 경로에 값을 저장하고 저장한 값을 반환"""
+    *parents, key = prefix.split('.')
+    node = report
+    for parent in parents:
+        node = node.setdefault(parent, {})
+    node[key] = value
+    return value
@@ -0,0 +1,185 @@
+'''
+전체 공공기관 사이트 최적화 시 절감량 예측 (what-if)
+
+lighthouse_traffic 의 view_data 에 있는 최적화 항목별 절감 가능 바이트(can_optimize_css_bytes 등)를
+평가된 모든 사이트에 적용했을 때 줄어드는 탄소 배출량을 최적화 항목별, 기관 유형별로 합산해서
+static/statistics/savings_projection.json 으로 저장한다. (gov_analysis 페이지의 savings_projection_chart.js 에서 사용)
+
+배출량은 사이트마다 월 monthly_views 회 조회된다고 가정한 연간 값(kg)이며,
+계수 불확실성 구간(p5 ~ p95)은 app.services.emission_uncertainty 로 계산한다.
+항목별 절감량은 서로 겹칠 수 있으므로(예: 사용하지 않는 JS 와 서드파티 스크립트) 전체 합계는
+사이트별로 total_byte_weight 를 넘지 않도록 자른 상한값이다.
+
+사용법 (ecoweb 디렉토리에서 실행):
+    python -m app.services.savings_projection
+    python -m app.services.savings_projection --monthly-views 50000 --output /tmp/savings_projection.json
+'''
+import argparse
+import json
+import os
+from datetime import datetime
+
+import numpy as np
+from pymongo import MongoClient
+
+from config import Config
+from app.services.emissions_calculator import estimate_emissions, KOREA_AVERAGE_INTENSITY
+from app.services.emission_uncertainty import emission_bands
+
+APP_DIR = os.path.join(os.path.dirname(__file__), '..')
+DEFAULT_OUTPUT_PATH = os.path.join(APP_DIR, 'static', 'statistics', 'savings_projection.json')
+DEFAULT_MONTHLY_VIEWS = 10000
+UNKNOWN_INSTITUTION = '기타'
+
+# view_data 키 -> 화면에 표시할 이름
+# (total_unused_bytes_script 는 can_optimize_js_bytes 와 같은 내용이라 제외,
+#  duplicated_javascript 는 Lighthouse numericValue(절감 시간, ms)라 바이트가 아니므로 제외)
+OPTIMIZATIONS = {
+    'can_optimize_css_bytes': '사용하지 않는 CSS 제거',
+    'can_optimize_js_bytes': '사용하지 않는 JavaScript 제거',
+    'modern_image_formats_bytes': '차세대 이미지 형식 사용',
+    'efficient_animated_content': '애니메이션 GIF 를 동영상으로 변환',
+    'third_party_summary_wasted_bytes': '서드파티 코드 정리',
+}
+
+
+def load_savings(collection):
+    """
+    평가된 사이트의 절감 가능 바이트 행렬
+
+    Returns:
+        tuple: (기관 유형 배열, total_byte_weight 배열, (사이트 수, 최적화 항목 수) 절감 바이트 행렬)
+    """
+    projection = {'institutionType': 1, 'view_data.total_byte_weight': 1, '_id': 0}
+    projection.update({f'view_data.{key}': 1 for key in OPTIMIZATIONS})
+    institutions, weights, savings = [], [], []
+    for document in collection.find({'view_data.total_byte_weight': {'$type': 'number'}}, projection):
+        view_data = document['view_data']
+        institutions.append(document.get('institutionType') or UNKNOWN_INSTITUTION)
+        weights.append(view_data['total_byte_weight'])
+        # 값이 없거나(None) 숫자가 아닌 항목은 절감량 0
+        savings.append([view_data.get(key) if isinstance(view_data.get(key), (int, float)) else 0
+                        for key in OPTIMIZATIONS])
+    return (np.array(institutions, dtype=object),
+            np.array(weights, dtype=np.float64),
+            np.array(savings, dtype=np.float64).reshape(len(weights), len(OPTIMIZATIONS)))
+
+
+def project_savings(institutions, weights, savings, monthly_views=DEFAULT_MONTHLY_VIEWS):
+    """
+    최적화 항목별, 기관 유형별 연간 배출량 절감 예측
+
+    Args:
+        institutions: 사이트별 기관 유형 배열
+        weights: 사이트별 total_byte_weight(bytes) 배열
+        savings: (사이트 수, 최적화 항목 수) 절감 가능 바이트 행렬 (열 순서는 OPTIMIZATIONS)
+
+    Returns:
+        dict: savings_projection.json 내용
+    """
+    # 절감량이 페이지 크기보다 클 수는 없음
+    savings = np.minimum(np.maximum(savings, 0), weights[:, np.newaxis])
+    combined = np.minimum(savings.sum(axis=1), weights)
+    views_per_year = monthly_views * 12
+
+    def annual_kg(total_bytes):
+        # 배출량은 전송량에 비례하므로 합계 바이트로 한 번에 계산 (g -> kg)
+        return estimate_emissions(np.asarray(total_bytes) / 1024 ** 3)['total'] * views_per_year / 1000
+
+    def annual_kg_range(total_bytes):
+        bands = emission_bands(total_bytes / 1024 ** 3)
+        return [round(bands['p5'] * views_per_year / 1000, 2), round(bands['p95'] * views_per_year / 1000, 2)]
+
+    current_bytes = weights.sum()
+    current_kg = float(annual_kg(current_bytes))
+    optimization_bytes = savings.sum(axis=0)
+    optimizations = []
+    for index, (key, label) in enumerate(OPTIMIZATIONS.items()):
+        kg = float(annual_kg(optimization_bytes[index]))
+        optimizations.append({
+            'key': key,
+            'label': label,
+            'siteCount': int(np.count_nonzero(savings[:, index])),
+            'savedMB': round(float(optimization_bytes[index]) / 1024 ** 2, 2),
+            'annualKgCO2': round(kg, 2),
+            'annualKgCO2Range': annual_kg_range(float(optimization_bytes[index])),
+            'percentOfCurrent': round(kg / current_kg * 100, 2) if current_kg else 0,
+        })
+    optimizations.sort(key=lambda item: item['annualKgCO2'], reverse=True)
+
+    # 기관 유형별 합계 (유형 x 항목)
+    types, inverse = np.unique(institutions.astype(str), return_inverse=True)
+    type_weights = np.bincount(inverse, weights=weights, minlength=len(types))
+    type_combined = np.bincount(inverse, weights=combined, minlength=len(types))
+    type_savings = np.zeros((len(types), len(OPTIMIZATIONS)))
+    np.add.at(type_savings, inverse, savings)
+    type_current_kg = annual_kg(type_weights)
+    type_combined_kg = annual_kg(type_combined)
+    type_savings_kg = annual_kg(type_savings)
+    by_institution = [{
+        'institutionType': str(institution_type),
+        'siteCount': int(np.count_nonzero(inverse == index)),
+        'currentAnnualKgCO2': round(float(type_current_kg[index]), 2),
+        'savedAnnualKgCO2': round(float(type_combined_kg[index]), 2),
+        'savings': {key: round(float(type_savings_kg[index, column]), 2)
+                    for column, key in enumerate(OPTIMIZATIONS)},
+    } for index, institution_type in enumerate(types)]
+    by_institution.sort(key=lambda item: item['savedAnnualKgCO2'], reverse=True)
+
+    combined_kg = float(annual_kg(combined.sum()))
+    return {
+        'generatedAt': datetime.now().isoformat(timespec='seconds'),
+        'assumptions': {'monthlyViewsPerSite': monthly_views, 'intensity': KOREA_AVERAGE_INTENSITY},
+        'siteCount': int(len(weights)),
+        'current': {
+            'totalMB': round(float(current_bytes) / 1024 ** 2, 2),
+            'annualKgCO2': round(current_kg, 2),
+            'annualKgCO2Range': annual_kg_range(float(current_bytes)),
+        },
+        'combined': {
+            'savedMB': round(float(combined.sum()) / 1024 ** 2, 2),
+            'annualKgCO2': round(combined_kg, 2),
+            'annualKgCO2Range': annual_kg_range(float(combined.sum())),
+            'percentOfCurrent': round(combined_kg / current_kg * 100, 2) if current_kg else 0,
+        },
+        'optimizations': optimizations,
+        'byInstitutionType': by_institution,
+    }
+
+
+def write_projection(projection, path=DEFAULT_OUTPUT_PATH):
+    """다른 프로세스가 읽는 중에도 깨진 파일이 보이지 않도록 임시 파일에 쓴 뒤 교체"""
+    temp_path = f'{path}.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as file:
+        json.dump(projection, file, ensure_ascii=False, indent=2)
+    os.replace(temp_path, path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='전체 사이트 최적화 시 탄소 배출 절감량 예측')
+    parser.add_argument('--monthly-views', type=int, default=DEFAULT_MONTHLY_VIEWS, help='사이트별 월 조회 수 가정')
+    parser.add_argument('--output', default=DEFAULT_OUTPUT_PATH)
+    parser.add_argument('--mongo-uri', default=Config.MONGO_URI)
+    args = parser.parse_args(argv)
+
+    client = MongoClient(args.mongo_uri)
+    try:
+        institutions, weights, savings = load_savings(client[Config.DB_NAME]['lighthouse_traffic'])
+    finally:
+        client.close()
+    if not len(weights):
+        print("No audited sites with view_data")
+        return
+
+    projection = project_savings(institutions, weights, savings, args.monthly_views)
+    write_projection(projection, args.output)
+
+    print(f"\n=== 최적화 항목별 연간 절감량 ({projection['siteCount']} sites) ===")
+    for item in projection['optimizations']:
+        print(f"{item['label']}: {item['annualKgCO2']}kg CO2 ({item['percentOfCurrent']}%)")
+    print(f"전체 (상한): {projection['combined']['annualKgCO2']}kg CO2 ({projection['combined']['percentOfCurrent']}%)")
+    print(f"Saved to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,406 @@
+'''
+통계 파일(static/statistics/*.json) 증분 갱신
+
+category_total_co2.py / rank_esg.py 는 실행할 때마다 lighthouse_traffic 전체를 다시 집계한다.
+대신 집계 상태를 MongoDB 에 보관하고 updated_at 워터마크 이후에 저장된 문서만 읽어서 차이(이전 값 -> 새 값)만 반영한다.
+(audited_at 은 보관된 리포트를 다시 추출해도 원래 평가 시각이므로 워터마크로 쓰지 않음)
+지우거나 url 을 바꾼 traffic 문서(db_indexes dedupe)는 lighthouse_traffic_removed 의 기록(removed_at 워터마크)을 보고
+이전 url 의 값을 뺀다. (같은 url 의 문서가 아직 있으면 그 문서의 갱신으로 반영되므로 건너뜀)
+
+    statistics_sites  사이트별로 마지막으로 반영한 값 (canonical_url, 기관 정보, 전송량, 배출량, 히스토그램 구간)
+    statistics_state  기관 유형별 합계, 전송량 히스토그램(전체, 기관 유형별), 평균/표준편차용 합계, 상/하위 후보 목록, 워터마크
+
+분포 곡선(distribution_data.json)은 히스토그램에 app.services.distribution_kde 의 FFT KDE 를 적용해서 구한다.
+기관 유형별 곡선(by_institution)도 유형별 히스토그램으로 같이 만들며, 이 파일은 이 작업만 쓴다.
+
+상/하위 5개는 TOP_N 보다 넉넉한 후보(CANDIDATE_SIZE 개)를 유지하고, 후보가 TOP_N 보다 적어지면
+statistics_sites 의 transfer_size 인덱스로 후보만 다시 채운다. (전체를 다시 읽지 않음)
+처음 실행할 때만 워터마크가 없으므로 전체 평가를 한 번 읽는다.
+
+갱신 중 중단되어도 같은 차이가 두 번 반영되지 않도록 statistics_sites 에 쓸 내용을 상태 문서(pending)에 먼저 기록하고
+statistics_sites 에 반영한 뒤 지운다. (다음 실행 때 pending 이 남아 있으면 그것부터 반영)
+
+사용법 (ecoweb 디렉토리에서 실행):
+    python -m app.services.statistics_materializer              # interval 초마다 갱신 (계속 실행)
+    python -m app.services.statistics_materializer --once
+'''
+import argparse
+import json
+import math
+import os
+import time
+from bisect import insort
+from datetime import timedelta
+
+import numpy as np
+from pymongo import MongoClient, UpdateOne, DeleteOne, ASCENDING, DESCENDING
+
+from config import Config
+from app.services.emissions_calculator import estimate_emissions
+from app.services.distribution_kde import AVERAGE_MB, KDE_MAX_MB, KDE_POINTS, kde_from_bins, silverman_bandwidth
+
+APP_DIR = os.path.join(os.path.dirname(__file__), '..')
+DEFAULT_OUTPUT_DIR = os.path.join(APP_DIR, 'static', 'statistics')
+STATE_ID = 'statistics'
+# updated_at 은 서버 시각이지만 같은 시각에 저장 중인 문서를 놓치지 않도록 워터마크를 겹쳐서 조회
+WATERMARK_OVERLAP = timedelta(minutes=2)
+BATCH_SIZE = 1000
+
+TOP_N = 5
+CANDIDATE_SIZE = 50
+# 전송량 히스토그램 (HISTOGRAM_MAX_MB 이상은 마지막 구간에 모음)
+HISTOGRAM_BIN_MB = 0.05
+HISTOGRAM_MAX_MB = 50
+HISTOGRAM_BINS = int(HISTOGRAM_MAX_MB / HISTOGRAM_BIN_MB)
+
+TRAFFIC_PROJECTION = {'url': 1, 'canonical_url': 1, 'resource_summary': 1, 'updated_at': 1, 'institutionType': 1,
+                      'institutionCategory': 1, 'siteName': 1, '_id': 0}
+
+
+def total_transfer_size(document):
+    """resource_summary 의 total 항목 전송량(bytes). 없으면 None"""
+    for item in document.get('resource_summary') or []:
+        if item.get('resourceType') == 'total' and isinstance(item.get('transferSize'), (int, float)):
+            return item['transferSize']
+    return None
+
+
+def site_key(document):
+    """statistics_sites 의 _id (canonical_url 이 없는 예전 문서는 url)"""
+    return document.get('canonical_url') or document['url']
+
+
+def histogram_bin(transfer_size):
+    return min(int(transfer_size / 1024 ** 2 / HISTOGRAM_BIN_MB), HISTOGRAM_BINS)
+
+
+def empty_state():
+    return {
+        '_id': STATE_ID,
+        'watermark': None,
+        'removed_watermark': None,
+        'count': 0,
+        'sum_bytes': 0,
+        'sum_squares_mb': 0.0,
+        'over_average': 0,
+        'histogram': [0] * (HISTOGRAM_BINS + 1),
+        'categories': {},
+        'institution_histograms': {},
+        # [transfer_size, url, siteName, institutionCategory] 정렬된 후보 (largest 는 transfer_size 를 음수로 저장)
+        'smallest': [],
+        'largest': [],
+        'pending': [],
+    }
+
+
+class StatisticsMaterializer:
+    def __init__(self, db, output_dir=DEFAULT_OUTPUT_DIR):
+        self.traffic = db['lighthouse_traffic']
+        self.sites = db['statistics_sites']
+        self.states = db['statistics_state']
+        self.removed = db['lighthouse_traffic_removed']
+        self.output_dir = output_dir
+
+    def ensure_indexes(self):
+        self.sites.create_index([('transfer_size', ASCENDING)])
+
+    def _load_state(self):
+        state = self.states.find_one({'_id': STATE_ID}) or empty_state()
+        if state['pending']:
+            # 지난번 갱신이 statistics_sites 반영 전에 중단됨
+            self._apply_pending(state)
+        return state
+
+    def _apply_pending(self, state):
+        operations = [DeleteOne({'_id': site['_id']}) if site.get('deleted')
+                      else UpdateOne({'_id': site['_id']}, {'$set': site}, upsert=True)
+                      for site in state['pending']]
+        for start in range(0, len(operations), BATCH_SIZE):
+            self.sites.bulk_write(operations[start:start + BATCH_SIZE], ordered=False)
+        state['pending'] = []
+        self.states.update_one({'_id': STATE_ID}, {'$set': {'pending': []}})
+
+    def _changed_documents(self, watermark):
+        query = {}
+        if watermark is not None:
+            query['updated_at'] = {'$gte': watermark - WATERMARK_OVERLAP}
+        return self.traffic.find(query, TRAFFIC_PROJECTION).batch_size(BATCH_SIZE)
+
+    def _removed_documents(self, state):
+        """
+        removed_watermark 이후에 지워진 url 을 값이 없는 문서({'url': url})로 반환 (_apply 에서 삭제로 처리됨)
+
+        같은 url 의 문서가 아직 있으면(남긴 문서가 그 url 로 바뀜) 그 문서의 updated_at 갱신으로 반영되므로 제외
+        """
+        query = {}
+        if state.get('removed_watermark') is not None:
+            query['removed_at'] = {'$gte': state['removed_watermark'] - WATERMARK_OVERLAP}
+        records = list(self.removed.find(query, {'url': 1, 'removed_at': 1, '_id': 0}))
+        urls = [record['url'] for record in records]
+        live = set()
+        for start in range(0, len(urls), BATCH_SIZE):
+            chunk = urls[start:start + BATCH_SIZE]
+            for document in self.traffic.find({'$or': [{'canonical_url': {'$in': chunk}}, {'url': {'$in': chunk}}]},
+                                              {'url': 1, 'canonical_url': 1, '_id': 0}):
+                live.add(site_key(document))
+        for record in records:
+            if state.get('removed_watermark') is None or record['removed_at'] > state['removed_watermark']:
+                state['removed_watermark'] = record['removed_at']
+        return [{'url': url} for url in urls if url not in live]
+
+    def _apply(self, state, documents):
+        """평가 문서 묶음의 변경분을 state 에 반영하고 statistics_sites 에 쓸 문서 목록 반환"""
+        previous = {site['_id']: site for site in self.sites.find({'_id': {'$in': [site_key(d) for d in documents]}})}
+        sizes = [total_transfer_size(document) for document in documents]
+        # 묶음 전체의 배출량을 한 번에 계산
+        co2 = estimate_emissions(np.array([size or 0 for size in sizes], dtype=np.float64) / 1024 ** 3)['total']
+
+        pending = []
+        for document, size, site_co2 in zip(documents, sizes, co2):
+            url = site_key(document)
+            old = previous.get(url)
+            new = None
+            if size is not None:
+                new = {
+                    '_id': url,
+                    'transfer_size': size,
+                    'co2': float(site_co2),
+                    'bin': histogram_bin(size),
+                    'institutionType': document.get('institutionType'),
+                    'institutionCategory': document.get('institutionCategory'),
+                    'siteName': document.get('siteName'),
+                }
+            updated_at = document.get('updated_at')
+            if updated_at and (state['watermark'] is None or updated_at > state['watermark']):
+                state['watermark'] = updated_at
+            if old == new:
+                continue
+            if old is not None:
+                self._add(state, old, -1)
+            if new is not None:
+                self._add(state, new, 1)
+            self._update_candidates(state, url, new)
+            pending.append(new if new is not None else {'_id': url, 'deleted': True})
+            # 중복 평가 문서가 같은 묶음에 있어도 마지막 값 기준으로 차이를 계산
+            previous[url] = new
+        return pending
+
+    @staticmethod
+    def _add(state, site, sign):
+        size = site['transfer_size']
+        size_mb = size / 1024 ** 2
+        state['count'] += sign
+        state['sum_bytes'] += sign * size
+        state['sum_squares_mb'] += sign * size_mb ** 2
+        state['over_average'] += sign * (size_mb > AVERAGE_MB)
+        state['histogram'][site['bin']] += sign
+        institution_type = site.get('institutionType')
+        if institution_type:
+            category = state['categories'].setdefault(institution_type,
+                                                      {'count': 0, 'total_bytes': 0, 'total_co2': 0.0})
+            category['count'] += sign
+            category['total_bytes'] += sign * size
+            category['total_co2'] += sign * site['co2']
+            histogram = state['institution_histograms'].setdefault(institution_type, [0] * (HISTOGRAM_BINS + 1))
+            histogram[site['bin']] += sign
+            if category['count'] == 0:
+                del state['categories'][institution_type]
+                del state['institution_histograms'][institution_type]
+
+    @staticmethod
+    def _update_candidates(state, url, site):
+        """
+        후보 목록은 항상 "실제 상/하위 len(후보) 개" 를 유지한다.
+
+        후보에서 빠진 사이트의 자리는 비워두고(목록이 짧아짐), 새 값은 현재 후보 경계 안쪽일 때만 넣는다.
+        (전체 사이트 수가 CANDIDATE_SIZE 이하이면 모든 사이트가 후보)
+        """
+        for key, sign in (('smallest', 1), ('largest', -1)):
+            candidates = [entry for entry in state[key] if entry[1] != url]
+            if site is not None:
+                entry = [sign * site['transfer_size'], url, site.get('siteName'), site.get('institutionCategory')]
+                if state['count'] <= CANDIDATE_SIZE or (candidates and entry[0] <= candidates[-1][0]):
+                    insort(candidates, entry, key=lambda item: item[0])
+                    del candidates[CANDIDATE_SIZE:]
+            state[key] = candidates
+
+    def _refill_candidates(self, state):
+        """후보가 TOP_N 보다 적어지면 transfer_size 인덱스로 다시 채움"""
+        for key, sign in (('smallest', ASCENDING), ('largest', DESCENDING)):
+            if len(state[key]) >= min(TOP_N, state['count']):
+                continue
+            cursor = self.sites.find({}, {'transfer_size': 1, 'siteName': 1, 'institutionCategory': 1}) \
+                               .sort('transfer_size', sign).limit(CANDIDATE_SIZE)
+            state[key] = [[sign * site['transfer_size'], site['_id'], site.get('siteName'),
+                           site.get('institutionCategory')] for site in cursor]
+
+    def refresh(self):
+        """
+        워터마크 이후의 평가를 반영하고 통계 파일 저장
+
+        Returns:
+            int: 반영한 사이트 수
+        """
+        state = self._load_state()
+        # 기관 유형별 히스토그램이 없던 이전 상태 문서는 statistics_sites 로 한 번 채움
+        upgraded = 'institution_histograms' not in state
+        if upgraded:
+            state['institution_histograms'] = self._institution_histograms()
+        changed = 0
+        # 지워진 url 을 먼저 빼고 나서 남은 문서의 변경을 반영
+        removed = self._removed_documents(state)
+        for start in range(0, len(removed), BATCH_SIZE):
+            changed += self._commit(state, removed[start:start + BATCH_SIZE])
+        batch = []
+        for document in self._changed_documents(state['watermark']):
+            batch.append(document)
+            if len(batch) >= BATCH_SIZE:
+                changed += self._commit(state, batch)
+                batch = []
+        if batch:
+            changed += self._commit(state, batch)
+
+        if changed or upgraded or not os.path.exists(os.path.join(self.output_dir, 'category_total_co2.json')):
+            self._refill_candidates(state)
+            self.states.replace_one({'_id': STATE_ID}, state, upsert=True)
+            self.write_files(state)
+        return changed
+
+    def _institution_histograms(self):
+        histograms = {}
+        for row in self.sites.aggregate([
+            {'$match': {'institutionType': {'$type': 'string', '$ne': ''}}},
+            {'$group': {'_id': {'type': '$institutionType', 'bin': '$bin'}, 'count': {'$sum': 1}}},
+        ]):
+            histogram = histograms.setdefault(row['_id']['type'], [0] * (HISTOGRAM_BINS + 1))
+            histogram[row['_id']['bin']] = row['count']
+        return histograms
+
+    def _commit(self, state, documents):
+        pending = self._apply(state, documents)
+        if pending:
+            state['pending'] = pending
+            self.states.replace_one({'_id': STATE_ID}, state, upsert=True)
+            self._apply_pending(state)
+        return len(pending)
+
+    def write_files(self, state):
+        _write_json(os.path.join(self.output_dir, 'category_total_co2.json'), category_totals(state))
+        efficient, inefficient = top_sites(state)
+        _write_json(os.path.join(self.output_dir, 'top5_efficient_sites.json'), efficient)
+        _write_json(os.path.join(self.output_dir, 'top5_bad_sites.json'), inefficient)
+        if state['count']:
+            _write_json(os.path.join(self.output_dir, 'distribution_data.json'), distribution(state))
+
+
+def category_totals(state):
+    """category_total_co2.json 내용 (기관 유형 이름순)"""
+    return [{
+        'institutionType': institution_type,
+        'totalMB': round(category['total_bytes'] / 1024 / 1024, 2),
+        'totalCO2': round(category['total_co2'], 2),
+    } for institution_type, category in sorted(state['categories'].items())]
+
+
+def top_sites(state):
+    """(top5_efficient_sites.json, top5_bad_sites.json) 내용. transferSize 는 KB"""
+    def rows(entries, sign):
+        return [{'siteName': site_name, 'institutionCategory': category, 'transferSize': sign * size / 1024}
+                for size, url, site_name, category in entries[:TOP_N]]
+    return rows(state['smallest'], 1), rows(state['largest'], -1)
+
+
+def _histogram_kde(histogram, count, std=None):
+    """
+    히스토그램을 격자로 사용한 FFT KDE (bandwidth 는 히스토그램에서 구한 IQR 로 Silverman 규칙)
+
+    std 가 없으면 히스토그램 구간 중앙값으로 추정
+
+    Returns:
+        tuple: (KDE_POINTS 개 밀도, bandwidth)
+    """
+    counts = np.array(histogram[:HISTOGRAM_BINS], dtype=np.float64)
+    edges = np.arange(HISTOGRAM_BINS + 1) * HISTOGRAM_BIN_MB
+    centers = edges[:-1] + HISTOGRAM_BIN_MB / 2
+    if std is None:
+        binned = counts.sum()
+        mean = (counts * centers).sum() / binned if binned else 0.0
+        std = math.sqrt((counts * (centers - mean) ** 2).sum() / (binned - 1)) if binned > 1 else 0.0
+    q1, q3 = np.interp([count * 0.25, count * 0.75], np.concatenate([[0], np.cumsum(counts)]), edges)
+    bandwidth = silverman_bandwidth(std, q3 - q1, count)
+    density = kde_from_bins(counts, HISTOGRAM_BIN_MB, bandwidth, total=count)
+    return np.interp(np.linspace(0, KDE_MAX_MB, KDE_POINTS), centers, density), float(bandwidth)
+
+
+def distribution(state):
+    """distribution_data.json 내용 (distribution_kde.build_distribution 과 같은 형식)"""
+    count = state['count']
+    mean = state['sum_bytes'] / 1024 ** 2 / count
+    variance = (state['sum_squares_mb'] - count * mean ** 2) / (count - 1) if count > 1 else 0.0
+    std = math.sqrt(max(variance, 0.0))
+    x = np.linspace(0, KDE_MAX_MB, KDE_POINTS)
+    y, bandwidth = _histogram_kde(state['histogram'], count, std)
+
+    by_institution = []
+    for institution_type, histogram in sorted(state['institution_histograms'].items()):
+        category = state['categories'][institution_type]
+        group_y, group_bandwidth = _histogram_kde(histogram, category['count'])
+        by_institution.append({
+            'institutionType': institution_type,
+            'count': category['count'],
+            'mean': category['total_bytes'] / 1024 ** 2 / category['count'],
+            'bandwidth': group_bandwidth,
+            'kde_points': [{'x': float(px), 'y': float(py)} for px, py in zip(x, group_y)],
+        })
+
+    over = state['over_average']
+    return {
+        'kde_points': [{'x': float(px), 'y': float(py)} for px, py in zip(x, y)],
+        'stats': {
+            'mean': mean,
+            'std': std,
+            'total_count': count,
+            'over_4_7mb': over,
+            'under_4_7mb': count - over,
+            'over_percentage': over / count * 100,
+            'under_percentage': (count - over) / count * 100,
+            'bandwidth': bandwidth,
+        },
+        'by_institution': by_institution,
+    }
+
+
+def _write_json(path, data):
+    """웹 서버가 읽는 중에도 깨진 파일이 보이지 않도록 임시 파일에 쓴 뒤 교체"""
+    temp_path = f'{path}.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as file:
+        json.dump(data, file, ensure_ascii=False, indent=2)
+    os.replace(temp_path, path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='통계 파일(static/statistics) 증분 갱신')
+    parser.add_argument('--interval', type=float, default=60, help='갱신 주기(초)')
+    parser.add_argument('--once', action='store_true', help='한 번만 갱신하고 종료')
+    parser.add_argument('--output-dir', default=DEFAULT_OUTPUT_DIR)
+    parser.add_argument('--mongo-uri', default=Config.MONGO_URI)
+    args = parser.parse_args(argv)
+
+    client = MongoClient(args.mongo_uri)
+    try:
+        materializer = StatisticsMaterializer(client[Config.DB_NAME], args.output_dir)
+        materializer.ensure_indexes()
+        while True:
+            started = time.monotonic()
+            changed = materializer.refresh()
+            if changed:
+                print(f"Applied {changed} changed sites in {time.monotonic() - started:.1f}s")
+            if args.once:
+                break
+            time.sleep(args.interval)
+    finally:
+        client.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,344 @@
+'''
+여러 서버에서 나눠서 평가하기 위한 MongoDB 작업 큐 (audit_queue 컬렉션)
+
+각 서버(노드)의 워커는 find_one_and_update 로 URL 하나를 원자적으로 가져가며(lease)
+lease_seconds 동안 다른 노드가 같은 URL을 가져가지 못한다.
+노드는 평가 중인 URL의 lease 를 주기적으로 연장(heartbeat)하고,
+노드가 죽어서 lease 가 만료되면 다른 노드가 그 URL을 다시 가져간다.
+실패한 URL은 오류 종류별 재시도 정책(audit_journal.RETRY_POLICY)에 따라 대기 후 다시 pending 이 된다.
+
+사용법 (ecoweb 디렉토리에서 실행, 로컬 mongod 하나로도 동작):
+    python -m app.services.work_queue seed                      # 사이트 목록을 큐에 등록 (이미 있는 URL은 유지)
+    python -m app.services.work_queue work --workers 4          # 각 서버에서 실행
+    python -m app.services.work_queue status
+    python -m app.services.work_queue --mongo-uri mongodb://10.0.0.5:27017/ work --workers 8 --chrome-pool
+'''
+import argparse
+import os
+import socket
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from pymongo import MongoClient, ReturnDocument, UpdateOne, ASCENDING
+from pymongo.errors import BulkWriteError, PyMongoError
+
+from config import Config
+from app.services.batch_audit import DEFAULT_INPUT_PATH, AuditProgress, audit_once, load_sites
+from app.services.audit_journal import classify_error, retry_delay
+from app.services.audit_writer import AuditWriter
+from app.services.chrome_pool import ChromePool
+from app.services.report_archive import ReportArchive
+
+PENDING = 'pending'
+LEASED = 'leased'
+DONE = 'done'
+FAILED = 'failed'
+
+
+def _now():
+    # 여러 서버가 같은 lease 시각을 비교하므로 서버마다 다른 로컬 시간대 대신 UTC 로 저장
+    return datetime.now(timezone.utc)
+
+
+class AuditWorkQueue:
+    """
+    Args:
+        collection: audit_queue 컬렉션
+        lease_seconds (float): URL 하나를 가져간 노드가 heartbeat 없이 점유할 수 있는 시간
+        max_attempts (int): lease 만료로 다시 가져갈 수 있는 최대 횟수 (노드를 계속 죽이는 URL 방지)
+    """
+
+    def __init__(self, collection, lease_seconds=600, max_attempts=10):
+        self.collection = collection
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+
+    def ensure_indexes(self):
+        self.collection.create_index([('status', ASCENDING), ('not_before', ASCENDING)])
+        self.collection.create_index([('status', ASCENDING), ('lease_expires', ASCENDING)])
+
+    def seed(self, sites, chunk_size=1000):
+        """사이트 목록을 큐에 등록. 이미 등록된 URL은 상태를 유지. 새로 등록된 수를 반환"""
+        now = _now()
+        inserted = 0
+        for start in range(0, len(sites), chunk_size):
+            operations = [
+                UpdateOne({'_id': site['siteLink']},
+                          {'$setOnInsert': {'site': site, 'status': PENDING, 'attempts': 0,
+                                            'not_before': now, 'created_at': now}},
+                          upsert=True)
+                for site in sites[start:start + chunk_size]
+            ]
+            inserted += self.collection.bulk_write(operations, ordered=False).upserted_count
+        return inserted
+
+    def requeue(self, sites, chunk_size=1000):
+        """
+        이미 평가가 끝난 URL도 다시 pending 으로 등록 (change_detection 에서 내용이 바뀐 사이트)
+
+        다른 노드가 평가 중인(leased) URL은 건드리지 않는다. 다시 등록된 수를 반환
+        """
+        now = _now()
+        requeued = 0
+        for start in range(0, len(sites), chunk_size):
+            operations = [
+                UpdateOne({'_id': site['siteLink'], 'status': {'$ne': LEASED}},
+                          {'$set': {'site': site, 'status': PENDING, 'attempts': 0, 'not_before': now},
+                           '$unset': {'error': '', 'lease_owner': ''},
+                           '$setOnInsert': {'created_at': now}},
+                          upsert=True)
+                for site in sites[start:start + chunk_size]
+            ]
+            try:
+                result = self.collection.bulk_write(operations, ordered=False)
+                requeued += result.modified_count + result.upserted_count
+            except BulkWriteError as e:
+                # leased 인 URL은 filter 에 걸리지 않아 upsert 가 _id 중복으로 실패함 (정상)
+                errors = [error for error in e.details.get('writeErrors', []) if error.get('code') != 11000]
+                if errors:
+                    raise
+                requeued += e.details.get('nModified', 0) + e.details.get('nUpserted', 0)
+        return requeued
+
+    def claim(self, owner):
+        """평가할 URL 하나를 원자적으로 가져옴 (pending 이거나 lease 가 만료된 것). 없으면 None"""
+        now = _now()
+        self.expire_exhausted(now)
+        return self.collection.find_one_and_update(
+            {
+                '$or': [
+                    {'status': PENDING, 'not_before': {'$lte': now}},
+                    {'status': LEASED, 'lease_expires': {'$lt': now}},
+                ],
+                'attempts': {'$lt': self.max_attempts},
+            },
+            {
+                '$set': {'status': LEASED, 'lease_owner': owner, 'leased_at': now,
+                         'lease_expires': now + timedelta(seconds=self.lease_seconds)},
+                '$inc': {'attempts': 1},
+            },
+            sort=[('not_before', ASCENDING)],
+            return_document=ReturnDocument.AFTER,
+        )
+
+    def expire_exhausted(self, now=None):
+        """lease 가 만료됐지만 더 가져갈 수 없는(max_attempts) URL을 failed 로 바꿈 (leased 로 계속 남지 않도록)"""
+        now = now or _now()
+        self.collection.update_many(
+            {'status': LEASED, 'lease_expires': {'$lt': now}, 'attempts': {'$gte': self.max_attempts}},
+            {'$set': {'status': FAILED, 'finished_at': now,
+                      'error': {'class': 'lease_expired', 'reason': f'lease expired after {self.max_attempts} attempts'}},
+             '$unset': {'lease_expires': ''}},
+        )
+
+    def heartbeat(self, job_ids, owner):
+        """평가 중인 URL들의 lease 연장. 연장된 수를 반환 (lease 를 잃은 URL은 다른 노드가 가져감)"""
+        if not job_ids:
+            return 0
+        result = self.collection.update_many(
+            {'_id': {'$in': list(job_ids)}, 'status': LEASED, 'lease_owner': owner},
+            {'$set': {'lease_expires': _now() + timedelta(seconds=self.lease_seconds)}},
+        )
+        return result.modified_count
+
+    def complete(self, job_id, owner):
+        self.collection.update_one(
+            {'_id': job_id, 'lease_owner': owner},
+            {'$set': {'status': DONE, 'finished_at': _now()},
+             '$unset': {'lease_expires': '', 'error': ''}},
+        )
+
+    def fail(self, job_id, owner, attempts, error_class, reason):
+        """실패 처리. 재시도 정책상 다시 시도할 수 있으면 대기 시간 후 pending 으로 되돌림"""
+        delay = retry_delay(error_class, attempts)
+        fields = {'error': {'class': error_class, 'reason': reason[:500]}, 'finished_at': _now()}
+        if delay is None:
+            fields['status'] = FAILED
+        else:
+            fields.update(status=PENDING, not_before=_now() + timedelta(seconds=delay))
+        self.collection.update_one({'_id': job_id, 'lease_owner': owner},
+                                   {'$set': fields, '$unset': {'lease_expires': ''}})
+
+    def release(self, job_ids, owner):
+        """노드 종료 시 평가하지 못한 URL을 바로 pending 으로 되돌림 (시도 횟수도 되돌림)"""
+        if job_ids:
+            self.collection.update_many(
+                {'_id': {'$in': list(job_ids)}, 'status': LEASED, 'lease_owner': owner},
+                {'$set': {'status': PENDING, 'not_before': _now()},
+                 '$unset': {'lease_expires': ''}, '$inc': {'attempts': -1}},
+            )
+
+    def counts(self):
+        """상태별 URL 수"""
+        return {row['_id']: row['count'] for row in self.collection.aggregate(
+            [{'$group': {'_id': '$status', 'count': {'$sum': 1}}}])}
+
+    def has_unfinished(self):
+        return self.collection.count_documents(
+            {'status': {'$in': [PENDING, LEASED]}, 'attempts': {'$lt': self.max_attempts}}, limit=1) > 0
+
+
+def run_node(queue, collection_resource, collection_traffic, workers=4, timeout=180,
+             chrome_pool=None, writer=None, archive=None, poll_interval=10, exit_when_empty=True):
+    """
+    이 서버에서 workers 개의 워커로 큐의 URL을 평가
+
+    Args:
+        exit_when_empty (bool): 큐에 남은 URL이 없으면 종료. False 이면 새 URL이 등록되기를 계속 기다림
+    """
+    owner = f'{socket.gethostname()}:{os.getpid()}'
+    held = set()          # 이 노드가 평가 중인 URL (heartbeat 대상)
+    held_lock = threading.Lock()
+    stopped = threading.Event()
+    progress = AuditProgress(sum(queue.counts().get(status, 0) for status in (PENDING, LEASED)))
+
+    # MongoDB 오류(failover, 네트워크 끊김)로 스레드가 죽지 않도록 큐 작업마다 PyMongoError 를 잡고 poll_interval 후 재시도
+    def send_heartbeats():
+        interval = queue.lease_seconds / 3
+        while not stopped.wait(interval):
+            with held_lock:
+                job_ids = set(held)
+            try:
+                extended = queue.heartbeat(job_ids, owner)
+            except PyMongoError as e:
+                # lease 가 만료되기 전에 다시 연장하도록 짧게 재시도
+                print(f"Warning: heartbeat failed on {owner}: {str(e)}")
+                interval = min(poll_interval, queue.lease_seconds / 3)
+                continue
+            interval = queue.lease_seconds / 3
+            if extended < len(job_ids):
+                print(f"Warning: {len(job_ids) - extended} lease(s) lost on {owner}")
+
+    def finish(job_id):
+        # AuditWriter 의 저장 콜백으로 실행되므로 오류가 flush 로 퍼지지 않도록 여기서 처리
+        try:
+            queue.complete(job_id, owner)
+        except PyMongoError as e:
+            # 평가는 이미 저장됨. done 으로 바꾸지 못하면 lease 가 만료된 뒤 다른 노드가 다시 평가
+            print(f"Warning: could not complete {job_id}: {str(e)}")
+        with held_lock:
+            held.discard(job_id)
+
+    def fail(job, error_type, message):
+        try:
+            queue.fail(job['_id'], owner, job['attempts'], error_type, message)
+        except PyMongoError as e:
+            # 기록하지 못해도 lease 가 만료되면 다른 노드가 다시 가져감
+            print(f"Warning: could not record failure of {job['_id']}: {str(e)}")
+            stopped.wait(poll_interval)
+
+    def worker():
+        while not stopped.is_set():
+            try:
+                job = queue.claim(owner)
+                if job is None and exit_when_empty and not queue.has_unfinished():
+                    return
+            except PyMongoError as e:
+                print(f"Warning: could not claim a job on {owner}: {str(e)}")
+                stopped.wait(poll_interval)
+                continue
+            if job is None:
+                time.sleep(poll_interval)
+                continue
+
+            job_id, site = job['_id'], job['site']
+            with held_lock:
+                held.add(job_id)
+            started = time.monotonic()
+            success = False
+            try:
+                # writer 를 사용하면 실제 저장(flush) 이후에 done 처리
+                if audit_once(site, collection_resource, collection_traffic, timeout=timeout,
+                              chrome_pool=chrome_pool, writer=writer, archive=archive,
+                              on_saved=lambda job_id=job_id: finish(job_id)):
+                    success = True
+                else:
+                    fail(job, 'no_data', 'network-requests/resource-summary not found in report')
+            except Exception as e:
+                fail(job, classify_error(e), str(e))
+            finally:
+                if not success:
+                    with held_lock:
+                        held.discard(job_id)
+            progress.record(site['siteLink'], success, time.monotonic() - started)
+
+    heartbeat_thread = threading.Thread(target=send_heartbeats, daemon=True)
+    heartbeat_thread.start()
+    threads = [threading.Thread(target=worker, name=f'audit-worker-{i}') for i in range(workers)]
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    except KeyboardInterrupt:
+        print("Stopping workers... (진행 중인 평가가 끝나면 종료)")
+        stopped.set()
+        for thread in threads:
+            thread.join()
+    finally:
+        if writer is not None:
+            writer.flush()
+        stopped.set()
+        with held_lock:
+            queue.release(held, owner)
+
+    print(f"Node {owner} finished: {progress.summary()}")
+    return progress
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='MongoDB 작업 큐를 이용한 분산 Lighthouse 평가')
+    parser.add_argument('--mongo-uri', default=Config.MONGO_URI)
+    parser.add_argument('--lease-seconds', type=float, default=600)
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    seed_parser = subparsers.add_parser('seed', help='사이트 목록을 큐에 등록')
+    seed_parser.add_argument('--input', default=DEFAULT_INPUT_PATH, help='사이트 목록 (csv 또는 json)')
+
+    work_parser = subparsers.add_parser('work', help='이 서버에서 큐의 URL 평가')
+    work_parser.add_argument('--workers', type=int, default=os.cpu_count() or 4)
+    work_parser.add_argument('--timeout', type=float, default=180, help='URL 하나당 제한 시간(초)')
+    work_parser.add_argument('--chrome-pool', action='store_true', help='Chrome 을 미리 띄워두고 재사용')
+    work_parser.add_argument('--chrome-max-audits', type=int, default=50)
+    work_parser.add_argument('--write-batch-size', type=int, default=100)
+    work_parser.add_argument('--write-interval', type=float, default=10.0)
+    work_parser.add_argument('--no-archive', action='store_true', help='원본 리포트를 보관하지 않음')
+    work_parser.add_argument('--wait', action='store_true', help='큐가 비어도 종료하지 않고 새 URL을 기다림')
+
+    subparsers.add_parser('status', help='상태별 URL 수 출력')
+    args = parser.parse_args(argv)
+
+    client = MongoClient(args.mongo_uri)
+    try:
+        db = client[Config.DB_NAME]
+        queue = AuditWorkQueue(db['audit_queue'], lease_seconds=args.lease_seconds)
+        queue.ensure_indexes()
+
+        if args.command == 'seed':
+            inserted = queue.seed(load_sites(args.input))
+            print(f"Seeded {inserted} new URLs. {queue.counts()}")
+        elif args.command == 'status':
+            print(queue.counts())
+        elif args.command == 'work':
+            chrome_pool = ChromePool(args.workers, max_audits=args.chrome_max_audits) if args.chrome_pool else None
+            archive = None
+            if not args.no_archive:
+                archive = ReportArchive(db['lighthouse_reports'])
+                archive.ensure_indexes()
+            try:
+                with AuditWriter(db['lighthouse_resource'], db['lighthouse_traffic'],
+                                 batch_size=args.write_batch_size, flush_interval=args.write_interval,
+                                 grade_sketches=db['grade_sketches']) as writer:
+                    run_node(queue, db['lighthouse_resource'], db['lighthouse_traffic'],
+                             workers=args.workers, timeout=args.timeout, chrome_pool=chrome_pool,
+                             writer=writer, archive=archive, exit_when_empty=not args.wait)
+            finally:
+                if chrome_pool:
+                    chrome_pool.close()
+    finally:
+        client.close()
+
+
+if __name__ == '__main__':
+    main()
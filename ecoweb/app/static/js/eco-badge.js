@@ -1,12 +1,19 @@
 (function() {
-    // 유틸리티 함수
-    const getElement = id => document.getElementById(id);
-    const encodeUrl = encodeURIComponent(window.location.href);
+    // 사용법
+    //   <div id="eco-badge"></div>                           현재 페이지의 배지
+    //   <div class="eco-badge" data-url="https://..."></div>  다른 사이트의 배지 (기관 목록 페이지 등)
+    // 한 페이지의 배지들은 /api/badges 요청 하나로 모아서 조회한다.
+    const API_BASE = 'https://your-app.vercel.app';
+    // 서버가 Cache-Control max-age 를 주지 않으면 24시간 동안 localStorage 결과 사용
+    const DEFAULT_TTL = 86400000;
+    // 요청 하나에 담을 최대 URL 수 (서버 BADGE_BATCH_LIMIT 이하)
+    const BATCH_SIZE = 50;
+    const cacheKey = url => `eco-badge_${encodeURIComponent(url)}`;
 
     // 스타일 정의
     const badgeStyles = `
         <style>
-            #eco-badge {
+            #eco-badge, .eco-badge {
                 --primary: #00824c;
                 --secondary: #e5f6ef;
                 font-size: 15px;
@@ -16,7 +23,7 @@
                 font-family: -apple-system, BlinkMacSystemFont, sans-serif;
             }
             
-            #eco-badge .measurement {
+            #eco-badge .measurement, .eco-badge .measurement {
                 display: inline-flex;
                 justify-content: center;
                 align-items: center;
@@ -27,7 +34,7 @@
                 min-width: 8.2em;
             }
             
-            #eco-badge .link {
+            #eco-badge .link, .eco-badge .link {
                 display: inline-flex;
                 justify-content: center;
                 align-items: center;
@@ -40,7 +47,7 @@
                 font-weight: bold;
             }
             
-            #eco-badge .percentage {
+            #eco-badge .percentage, .eco-badge .percentage {
                 display: block;
                 margin-top: 0.5em;
                 font-size: 0.9em;
@@ -48,68 +55,119 @@
         </style>
     `;
 
-    // API 요청 함수
-    const fetchData = async (updateUI = true) => {
+    // 응답의 Cache-Control max-age 를 localStorage 유효 기간으로 사용
+    const getTtl = (response) => {
+        const match = /max-age=(\d+)/.exec(response.headers.get('Cache-Control') || '');
+        return match ? Number(match[1]) * 1000 : DEFAULT_TTL;
+    };
+
+    // 캐시 읽기 (이전 버전의 timestamp 형식도 지원)
+    const readCache = (url) => {
         try {
-            const response = await fetch(`https://your-app.vercel.app/api/badge?url=${encodeUrl}`);
-            if (!response.ok) throw new Error('API request failed');
-            
-            const data = await response.json();
-            if (updateUI) renderBadge(data);
-            
-            // 캐시 저장
-            data.timestamp = new Date().getTime();
-            localStorage.setItem(`eco-badge_${encodeUrl}`, JSON.stringify(data));
+            const data = JSON.parse(localStorage.getItem(cacheKey(url)));
+            if (data && !data.expires) data.expires = data.timestamp + DEFAULT_TTL;
+            return data;
         } catch (error) {
-            getElement('eco-measurement').innerHTML = '측정 실패';
-            console.error(error);
-            localStorage.removeItem(`eco-badge_${encodeUrl}`);
+            return null;
         }
     };
 
     // UI 렌더링 함수
-    const renderBadge = (data) => {
-        getElement('eco-measurement').innerHTML = 
+    const renderBadge = (badge, data) => {
+        badge.querySelector('.measurement').innerHTML = 
             `${data.carbon}g of CO<sub>2</sub>/view`;
-        getElement('eco-percentage').innerHTML = 
+        badge.querySelector('.percentage').innerHTML = 
             `상위 ${data.percentage}% 친환경 웹사이트`;
     };
 
+    const renderFailure = (badge) => {
+        badge.querySelector('.measurement').innerHTML = '측정 실패';
+    };
+
+    // API 요청 함수: 여러 URL을 한 번에 조회
+    // (브라우저 HTTP 캐시가 ETag 로 재검증하므로 바뀌지 않았으면 304 로 끝남)
+    const fetchBatch = async (urls, badgesByUrl, updateUI) => {
+        try {
+            const query = urls.map(url => `url=${encodeURIComponent(url)}`).join('&');
+            const response = await fetch(`${API_BASE}/api/badges?${query}`);
+            if (!response.ok) throw new Error('API request failed');
+
+            const { badges } = await response.json();
+            const now = new Date().getTime();
+            const expires = now + getTtl(response);
+            urls.forEach(url => {
+                const data = badges[url];
+                if (!data) {
+                    if (updateUI) badgesByUrl[url].forEach(renderFailure);
+                    localStorage.removeItem(cacheKey(url));
+                    return;
+                }
+                if (updateUI) badgesByUrl[url].forEach(badge => renderBadge(badge, data));
+
+                // 캐시 저장
+                data.timestamp = now;
+                data.expires = expires;
+                localStorage.setItem(cacheKey(url), JSON.stringify(data));
+            });
+        } catch (error) {
+            console.error(error);
+            // 캐시된 결과를 보여주고 있으면 그대로 둠
+            if (updateUI) urls.forEach(url => badgesByUrl[url].forEach(renderFailure));
+        }
+    };
+
+    const fetchAll = (urls, badgesByUrl, updateUI) => {
+        for (let i = 0; i < urls.length; i += BATCH_SIZE) {
+            fetchBatch(urls.slice(i, i + BATCH_SIZE), badgesByUrl, updateUI);
+        }
+    };
+
     // 배지 초기화
-    const initBadge = () => {
-        // DOM 요소 생성
-        const badge = getElement('eco-badge');
-        badge.innerHTML = `
-            ${badgeStyles}
-            <div class="badge-container">
-                <span id="eco-measurement" class="measurement">
-                    CO<sub>2</sub> 측정중...
-                </span>
-                <a href="https://your-domain.com" target="_blank" rel="noopener" 
-                   class="link">ECO-WEB</a>
-            </div>
-            <span id="eco-percentage" class="percentage"></span>
-        `;
+    const initBadges = () => {
+        const badges = document.querySelectorAll('#eco-badge, .eco-badge');
+        if (!badges.length) return;
+
+        // 스타일은 한 번만 추가
+        document.head.insertAdjacentHTML('beforeend', badgeStyles);
+
+        // DOM 요소 생성, URL별로 배지 묶기
+        const badgesByUrl = {};
+        badges.forEach(badge => {
+            badge.innerHTML = `
+                <div class="badge-container">
+                    <span class="measurement">
+                        CO<sub>2</sub> 측정중...
+                    </span>
+                    <a href="https://your-domain.com" target="_blank" rel="noopener" 
+                       class="link">ECO-WEB</a>
+                </div>
+                <span class="percentage"></span>
+            `;
+            const url = badge.dataset.url || window.location.href;
+            (badgesByUrl[url] = badgesByUrl[url] || []).push(badge);
+        });
 
         // 캐시된 데이터 확인
-        const cached = localStorage.getItem(`eco-badge_${encodeUrl}`);
         const now = new Date().getTime();
-
-        if (cached) {
-            const data = JSON.parse(cached);
-            renderBadge(data);
-            
-            // 24시간마다 갱신
-            if (now - data.timestamp > 86400000) {
-                fetchData(false);
+        const missing = [];
+        const expired = [];
+        Object.keys(badgesByUrl).forEach(url => {
+            const cached = readCache(url);
+            if (cached) {
+                badgesByUrl[url].forEach(badge => renderBadge(badge, cached));
+                // 유효 기간이 지났을 때만 백그라운드에서 갱신
+                if (now > cached.expires) expired.push(url);
+            } else {
+                missing.push(url);
             }
-        } else {
-            fetchData();
-        }
+        });
+
+        fetchAll(missing, badgesByUrl, true);
+        fetchAll(expired, badgesByUrl, false);
     };
 
     // 브라우저 지원 확인 및 초기화
     if ('fetch' in window) {
-        initBadge();
+        initBadges();
     }
-})();
\ No newline at end of file
+})();
@@ -1,6 +1,6 @@
-(function(){const getElement=id=>document.getElementById(id);const encodeUrl=encodeURIComponent(window.location.href);const badgeStyles=`
+(function(){const API_BASE='https://your-app.vercel.app';const DEFAULT_TTL=86400000;const BATCH_SIZE=50;const cacheKey=url=>`eco-badge_${encodeURIComponent(url)}`;const badgeStyles=`
         <style>
-            #eco-badge {
+            #eco-badge, .eco-badge {
                 --primary: #00824c;
                 --secondary: #e5f6ef;
                 font-size: 15px;
@@ -10,7 +10,7 @@
                 font-family: -apple-system, BlinkMacSystemFont, sans-serif;
             }
             
-            #eco-badge .measurement {
+            #eco-badge .measurement, .eco-badge .measurement {
                 display: inline-flex;
                 justify-content: center;
                 align-items: center;
@@ -21,7 +21,7 @@
                 min-width: 8.2em;
             }
             
-            #eco-badge .link {
+            #eco-badge .link, .eco-badge .link {
                 display: inline-flex;
                 justify-content: center;
                 align-items: center;
@@ -34,20 +34,20 @@
                 font-weight: bold;
             }
             
-            #eco-badge .percentage {
+            #eco-badge .percentage, .eco-badge .percentage {
                 display: block;
                 margin-top: 0.5em;
                 font-size: 0.9em;
             }
         </style>
-    `;const fetchData=async(updateUI=true)=>{try{const response=await fetch(`https://your-domain.com/api/badge?url=${encodeUrl}`);if(!response.ok)throw new Error("API request failed");const data=await response.json();if(updateUI)renderBadge(data);data.timestamp=(new Date).getTime();localStorage.setItem(`eco-badge_${encodeUrl}`,JSON.stringify(data))}catch(error){getElement("eco-measurement").innerHTML="측정 실패";console.error(error);localStorage.removeItem(`eco-badge_${encodeUrl}`)}};const renderBadge=data=>{getElement("eco-measurement").innerHTML=`${data.carbon}g of CO<sub>2</sub>/view`;getElement("eco-percentage").innerHTML=`상위 ${data.percentage}% 친환경 웹사이트`};const initBadge=()=>{const badge=getElement("eco-badge");badge.innerHTML=`
-            ${badgeStyles}
-            <div class="badge-container">
-                <span id="eco-measurement" class="measurement">
-                    CO<sub>2</sub> 측정중...
-                </span>
-                <a href="https://your-domain.com" target="_blank" rel="noopener" 
-                   class="link">ECO-WEB</a>
-            </div>
-            <span id="eco-percentage" class="percentage"></span>
-        `;const cached=localStorage.getItem(`eco-badge_${encodeUrl}`);const now=(new Date).getTime();if(cached){const data=JSON.parse(cached);renderBadge(data);if(now-data.timestamp>864e5){fetchData(false)}}else{fetchData()}};if("fetch"in window){initBadge()}})();
\ No newline at end of file
+    `;const getTtl=(response)=>{const match=/max-age=(\d+)/.exec(response.headers.get('Cache-Control')||'');return match?Number(match[1])*1000:DEFAULT_TTL;};const readCache=(url)=>{try{const data=JSON.parse(localStorage.getItem(cacheKey(url)));if(data&&!data.expires)data.expires=data.timestamp+DEFAULT_TTL;return data;}catch(error){return null;}};const renderBadge=(badge,data)=>{badge.querySelector('.measurement').innerHTML=`${data.carbon}g of CO<sub>2</sub>/view`;badge.querySelector('.percentage').innerHTML=`상위 ${data.percentage}% 친환경 웹사이트`;};const renderFailure=(badge)=>{badge.querySelector('.measurement').innerHTML='측정 실패';};const fetchBatch=async(urls,badgesByUrl,updateUI)=>{try{const query=urls.map(url=>`url=${encodeURIComponent(url)}`).join('&');const response=await fetch(`${API_BASE}/api/badges?${query}`);if(!response.ok)throw new Error('API request failed');const{badges}=await response.json();const now=new Date().getTime();const expires=now+getTtl(response);urls.forEach(url=>{const data=badges[url];if(!data){if(updateUI)badgesByUrl[url].forEach(renderFailure);localStorage.removeItem(cacheKey(url));return;}
+if(updateUI)badgesByUrl[url].forEach(badge=>renderBadge(badge,data));data.timestamp=now;data.expires=expires;localStorage.setItem(cacheKey(url),JSON.stringify(data));});}catch(error){console.error(error);if(updateUI)urls.forEach(url=>badgesByUrl[url].forEach(renderFailure));}};const fetchAll=(urls,badgesByUrl,updateUI)=>{for(let i=0;i<urls.length;i+=BATCH_SIZE){fetchBatch(urls.slice(i,i+BATCH_SIZE),badgesByUrl,updateUI);}};const initBadges=()=>{const badges=document.querySelectorAll('#eco-badge, .eco-badge');if(!badges.length)return;document.head.insertAdjacentHTML('beforeend',badgeStyles);const badgesByUrl={};badges.forEach(badge=>{badge.innerHTML=`
+                <div class="badge-container">
+                    <span class="measurement">
+                        CO<sub>2</sub> 측정중...
+                    </span>
+                    <a href="https://your-domain.com" target="_blank" rel="noopener" 
+                       class="link">ECO-WEB</a>
+                </div>
+                <span class="percentage"></span>
+            `;const url=badge.dataset.url||window.location.href;(badgesByUrl[url]=badgesByUrl[url]||[]).push(badge);});const now=new Date().getTime();const missing=[];const expired=[];Object.keys(badgesByUrl).forEach(url=>{const cached=readCache(url);if(cached){badgesByUrl[url].forEach(badge=>renderBadge(badge,cached));if(now>cached.expires)expired.push(url);}else{missing.push(url);}});fetchAll(missing,badgesByUrl,true);fetchAll(expired,badgesByUrl,false);};if('fetch'in window){initBadges();}})();
\ No newline at end of file
@@ -0,0 +1,79 @@
+async function createSavingsProjectionChart() {
+    try {
+        const response = await fetch('/static/statistics/savings_projection.json');
+        if (!response.ok) {
+            // 아직 예측 결과를 만들지 않은 경우 (python -m app.services.savings_projection)
+            document.getElementById('savingsProjectionCard').style.display = 'none';
+            return;
+        }
+        const data = await response.json();
+
+        // 차트 데이터 준비 (절감량이 큰 순서로 저장되어 있음)
+        const items = data.optimizations.filter(item => item.annualKgCO2 > 0);
+        const labels = items.map(item => item.label);
+        const values = items.map(item => item.annualKgCO2);
+
+        const combined = data.combined;
+        document.getElementById('savingsProjectionSummary').textContent =
+            `평가된 ${data.siteCount}개 사이트를 모두 최적화하면 연간 최대 ${combined.annualKgCO2.toLocaleString()}kg CO₂ ` +
+            `(${combined.percentOfCurrent}%) 절감 ` +
+            `(예상 범위 ${combined.annualKgCO2Range[0].toLocaleString()} ~ ${combined.annualKgCO2Range[1].toLocaleString()}kg, ` +
+            `사이트별 월 ${data.assumptions.monthlyViewsPerSite.toLocaleString()}회 조회 기준)`;
+
+        // 차트 생성
+        const ctx = document.getElementById('savingsProjectionChart').getContext('2d');
+        new Chart(ctx, {
+            type: 'bar',
+            data: {
+                labels: labels,
+                datasets: [{
+                    label: '연간 절감량',
+                    data: values,
+                    backgroundColor: '#20c997',
+                    borderColor: '#198754',
+                    borderWidth: 1
+                }]
+            },
+            options: {
+                indexAxis: 'y',  // 수평 막대 그래프
+                responsive: true,
+                plugins: {
+                    legend: {
+                        display: false
+                    },
+                    tooltip: {
+                        callbacks: {
+                            label: function(context) {
+                                const item = items[context.dataIndex];
+                                return `${item.annualKgCO2.toLocaleString()}kg CO₂ (${item.percentOfCurrent}%, ${item.siteCount}개 사이트)`;
+                            }
+                        }
+                    }
+                },
+                scales: {
+                    x: {
+                        beginAtZero: true,
+                        grid: {
+                            display: false
+                        },
+                        ticks: {
+                            callback: function(value) {
+                                return value.toLocaleString() + 'kg';
+                            }
+                        }
+                    },
+                    y: {
+                        grid: {
+                            display: false
+                        }
+                    }
+                }
+            }
+        });
+    } catch (error) {
+        console.error('Error creating savings projection chart:', error);
+    }
+}
+
+// 페이지 로드 시 차트 생성
+document.addEventListener('DOMContentLoaded', createSavingsProjectionChart);
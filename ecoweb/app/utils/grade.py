@@ -1,19 +1,18 @@
 # A~F 등급까지 매기기
 
-def grade_point(totalsize_kb):
-    if totalsize_kb <= 272.51:
-        return "A+"
-    elif totalsize_kb <= 531.15:
-        return "A"
-    elif totalsize_kb <= 975.85:
-        return "B"
-    elif totalsize_kb <= 1410.39:
-        return "C"
-    elif totalsize_kb <= 1875.01:
-        return "D"
-    elif totalsize_kb <= 2419.56:
-        return "E"
-    elif totalsize_kb >= 2419.57:
-        return "F"
+GRADES = ("A+", "A", "B", "C", "D", "E", "F")
+# A+ ~ E 의 상한(KB). F 는 마지막 상한보다 큰 경우
+# 실제 데이터에서 다시 계산한 값은 app.services.grade_thresholds 참고
+DEFAULT_THRESHOLDS = (272.51, 531.15, 975.85, 1410.39, 1875.01, 2419.56)
 
-    return None
+def grade_point(totalsize_kb, thresholds=None):
+    """
+    페이지 크기(KB)의 등급
+
+    Args:
+        thresholds: A+ ~ E 의 상한 6개 (오름차순). 없으면 DEFAULT_THRESHOLDS
+    """
+    for grade, upper in zip(GRADES, thresholds or DEFAULT_THRESHOLDS):
+        if totalsize_kb <= upper:
+            return grade
+    return GRADES[-1]
@@ -0,0 +1,139 @@
+# 스트리밍 분위수 스케치 (KLL)
+#
+# 값을 모두 저장해 정렬하는 대신 층(level)별 버퍼(compactor)에 값을 모으고,
+# 버퍼가 차면 정렬한 뒤 한 칸씩 건너 절반만 다음 층으로 올린다. (h 층의 값 하나는 원래 값 2^h 개를 대표)
+# 저장되는 값은 대략 k / (1 - CAPACITY_DECAY) 개로 일정하고, 분위수 오차는 전체 개수의 약 1.7 / k 이다.
+# 같은 k 의 스케치끼리는 층별로 이어 붙인 뒤 다시 압축하면 합쳐지므로 병렬 작업의 결과를 전체 데이터 없이 합칠 수 있다.
+#
+#   sketch = KLLSketch()
+#   sketch.update_many([120.5, 980.1, ...])
+#   sketch.merge(other_sketch)
+#   sketch.quantiles([0.05, 0.5])
+import math
+import random
+from bisect import bisect_left
+from itertools import accumulate
+
+DEFAULT_K = 200
+# 아래 층으로 갈수록 버퍼 크기를 이 비율로 줄임
+CAPACITY_DECAY = 2 / 3
+
+
+class KLLSketch:
+    def __init__(self, k=DEFAULT_K, seed=None):
+        self.k = k
+        self.compactors = [[]]
+        self.count = 0
+        self.min = None
+        self.max = None
+        self._retained = 0
+        self._random = random.Random(seed)
+
+    def _capacity(self, level):
+        depth = len(self.compactors) - level - 1
+        return max(2, int(math.ceil(self.k * CAPACITY_DECAY ** depth)))
+
+    def _max_retained(self):
+        return sum(self._capacity(level) for level in range(len(self.compactors)))
+
+    def _compress(self):
+        """버퍼가 찬 가장 낮은 층 하나를 절반으로 줄여 다음 층으로 올림"""
+        for level, items in enumerate(self.compactors):
+            if len(items) < self._capacity(level):
+                continue
+            if level + 1 == len(self.compactors):
+                self.compactors.append([])
+            items.sort()
+            # 홀수 개면 하나는 이 층에 남김
+            keep = [items.pop()] if len(items) % 2 else []
+            # 짝수/홀수 번째 중 무작위로 골라야 분위수가 한쪽으로 치우치지 않음
+            offset = self._random.randrange(2)
+            self.compactors[level + 1].extend(items[offset::2])
+            self.compactors[level] = keep
+            self._retained = sum(len(c) for c in self.compactors)
+            return
+
+    def _compact_if_full(self):
+        while self._retained >= self._max_retained():
+            self._compress()
+
+    def update(self, value):
+        value = float(value)
+        self.compactors[0].append(value)
+        self.count += 1
+        self._retained += 1
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        self._compact_if_full()
+
+    def update_many(self, values):
+        for value in values:
+            self.update(value)
+
+    def merge(self, other):
+        """other 의 값을 합침 (self 를 바꾸고 반환)"""
+        if other.k != self.k:
+            raise ValueError(f"Cannot merge sketches with different k ({self.k}, {other.k})")
+        while len(self.compactors) < len(other.compactors):
+            self.compactors.append([])
+        for level, items in enumerate(other.compactors):
+            self.compactors[level].extend(items)
+        self.count += other.count
+        if other.count:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+            self.max = other.max if self.max is None else max(self.max, other.max)
+        self._retained = sum(len(c) for c in self.compactors)
+        self._compact_if_full()
+        return self
+
+    def _weighted(self):
+        """(정렬된 값, 누적 가중치) 목록"""
+        pairs = sorted((value, 1 << level) for level, items in enumerate(self.compactors) for value in items)
+        values = [value for value, _ in pairs]
+        cumulative = list(accumulate(weight for _, weight in pairs))
+        return values, cumulative
+
+    def quantiles(self, fractions):
+        """분위수 목록 (fraction 은 0 ~ 1). 값이 없으면 None 목록"""
+        if not self.count:
+            return [None] * len(fractions)
+        values, cumulative = self._weighted()
+        total = cumulative[-1]
+        result = []
+        for fraction in fractions:
+            if fraction <= 0:
+                result.append(self.min)
+            elif fraction >= 1:
+                result.append(self.max)
+            else:
+                index = bisect_left(cumulative, fraction * total)
+                result.append(values[min(index, len(values) - 1)])
+        return result
+
+    def quantile(self, fraction):
+        return self.quantiles([fraction])[0]
+
+    def rank(self, value):
+        """value 이하인 값의 비율 (0 ~ 1)"""
+        if not self.count:
+            return 0.0
+        values, cumulative = self._weighted()
+        index = bisect_left(values, value)
+        while index < len(values) and values[index] == value:
+            index += 1
+        return cumulative[index - 1] / cumulative[-1] if index else 0.0
+
+    def to_dict(self):
+        """MongoDB 에 저장할 형태"""
+        return {'k': self.k, 'count': self.count, 'min': self.min, 'max': self.max,
+                'compactors': [list(items) for items in self.compactors]}
+
+    @classmethod
+    def from_dict(cls, data, seed=None):
+        sketch = cls(data['k'], seed=seed)
+        sketch.compactors = [list(items) for items in data['compactors']] or [[]]
+        sketch.count = data['count']
+        sketch.min = data['min']
+        sketch.max = data['max']
+        sketch._retained = sum(len(c) for c in sketch.compactors)
+        return sketch
@@ -12,3 +12,18 @@ class Config:
     MONGO_URI = 'mongodb://localhost:27017/'
     DB_NAME = 'ecoweb'
     SECRET_KEY = os.getenv('SECRET_KEY', os.urandom(12))
+    # 같은 URL의 Lighthouse 평가 결과를 재사용하는 기간(초). 0이면 항상 새로 평가
+    AUDIT_CACHE_TTL = int(os.getenv('AUDIT_CACHE_TTL', 6 * 60 * 60))
+    # 백그라운드 평가 작업: 동시에 실행할 Lighthouse 수, URL당 제한 시간(초), 작업 기록 보관 기간(초)
+    AUDIT_JOB_WORKERS = int(os.getenv('AUDIT_JOB_WORKERS', 2))
+    AUDIT_JOB_TIMEOUT = int(os.getenv('AUDIT_JOB_TIMEOUT', 180))
+    AUDIT_JOB_RETENTION = int(os.getenv('AUDIT_JOB_RETENTION', 24 * 60 * 60))
+    # /api/badge 백분위 인덱스에 새 평가를 반영하는 주기(초)
+    BADGE_INDEX_REFRESH = int(os.getenv('BADGE_INDEX_REFRESH', 30))
+    # /api/badge 응답의 Cache-Control max-age(초). eco-badge.js 의 localStorage 유효 기간으로도 사용
+    BADGE_CACHE_MAX_AGE = int(os.getenv('BADGE_CACHE_MAX_AGE', 60 * 60))
+    # /api/badges 한 번에 조회할 수 있는 최대 URL 수
+    BADGE_BATCH_LIMIT = int(os.getenv('BADGE_BATCH_LIMIT', 100))
+    # 등급 기준 스케치를 다시 읽는 주기(초), 이 개수보다 평가가 적으면 기본 등급 기준 사용
+    GRADE_THRESHOLDS_REFRESH = int(os.getenv('GRADE_THRESHOLDS_REFRESH', 5 * 60))
+    GRADE_SKETCH_MIN_COUNT = int(os.getenv('GRADE_SKETCH_MIN_COUNT', 1000))
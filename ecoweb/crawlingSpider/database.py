@@ -16,6 +16,10 @@ website_collection = db["websites"]
 traffic_collection = db["traffic"]
 logging.info("Connected to MongoDB")
 
+# find_url_in_database 조회용 인덱스 (이미 있으면 그대로 사용)
+website_collection.create_index("current_url")
+traffic_collection.create_index("url")
+
 
 def save_to_database_website(website_data):
     try: 
@@ -34,8 +38,8 @@ def save_to_database_traffic(traffic_data):
 
 def find_url_in_database(url):
     # 데이터베이스에서 찾기
-    code = website_collection.find_one('current_url' is url)
-    traffic =traffic_collection.find_one('url' is url)
+    code = website_collection.find_one({'current_url': url})
+    traffic = traffic_collection.find_one({'url': url})
 
     # 있으면 return, 없으면 None 
     if code and traffic: